@@ -1,194 +1,365 @@
+import time
+run_started = time.perf_counter()
+
 import streamlit as st
+import argparse
 import os
+import sys
+import queue
+import threading
+from collections import deque
 from dotenv import load_dotenv
-from pinecone import Pinecone, ServerlessSpec
-from sentence_transformers import SentenceTransformer
-import unicodedata
-from openai import OpenAI
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from vector_store import open_vector_store
+from query_cache import LRUCache, TTLCache, normalize_query
+from character_metadata import build_filter
+from keyword_index import KeywordIndex
+from retrieval import ANSWER_MODEL, build_prompt, chat_messages, retrieve
+from corpus import Corpus, corpus_exists
+from embeddings import BACKENDS, embedding_backend, load_model
+import metrics
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Pinecone with the correct API key and environment
-pinecone_api_key = os.getenv("PINECONE_API_KEY")
-pc = Pinecone(api_key=pinecone_api_key)
-
 index_name = "twd-fandom6"
 
-# Check if the index exists and use it
-if index_name not in pc.list_indexes().names():
-    st.error(f"Index '{index_name}' not found. Please make sure the index exists in your Pinecone account.")
-else:
-    index = pc.Index(index_name)
+# Long sections are indexed as several passage vectors per character: fetch this many
+# hits per requested result, then pool passage scores per character ('max' or 'sum')
+passage_overfetch = int(os.getenv('PASSAGE_OVERFETCH', 10))
+passage_pooling = os.getenv('PASSAGE_POOLING', 'max')
+
+# BM25 keyword index built by src/keyword_index.py. Its ranking is fused with the vector
+# ranking (reciprocal rank fusion) unless HYBRID_SEARCH=0.
+keyword_index_path = os.getenv('KEYWORD_INDEX', 'data/keyword_index')
+hybrid_search = os.getenv('HYBRID_SEARCH', '1') != '0'
+
+# Query encoder backend: torch, or onnx (int8) / onnx-fp32 through ONNX Runtime
+model_backend = embedding_backend()
+
+# Streamlit re-runs this script on every interaction, so heavy resources are created once
+# per process with st.cache_resource and shared by all sessions.
 
 # Load the pre-trained model used for upserting
-model = SentenceTransformer('all-MiniLM-L6-v2')  # Same model as in your upsert script
+@st.cache_resource(show_spinner=False)
+def get_model():
+    return load_model(model_backend)  # Same model as in your upsert script
+
+# Connect to the configured vector store (VECTOR_BACKEND=pinecone or local)
+@st.cache_resource(show_spinner=False)
+def get_index():
+    return open_vector_store(index_name)
+
+# Load the keyword index (empty if it hasn't been built yet)
+@st.cache_resource(show_spinner=False)
+def get_keyword_index():
+    return KeywordIndex(keyword_index_path)
+
+# Open the character corpus for full records by ID (None if it hasn't been built)
+@st.cache_resource(show_spinner=False)
+def get_corpus():
+    return Corpus() if corpus_exists() else None
+
+# Initialize OpenAI client
+@st.cache_resource(show_spinner=False)
+def get_openai_client():
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+# Query caches shared by all sessions: embeddings by normalised query text, search
+# results by (query, trait, top_k), and AI answers by (query, sources)
+@st.cache_resource(show_spinner=False)
+def get_query_caches():
+    return {
+        'embedding': LRUCache(int(os.getenv('EMBEDDING_CACHE_SIZE', 2048))),
+        'search': TTLCache(int(os.getenv('SEARCH_CACHE_SIZE', 512)), ttl=float(os.getenv('SEARCH_CACHE_TTL', 600))),
+        'answer': TTLCache(int(os.getenv('ANSWER_CACHE_SIZE', 256)), ttl=float(os.getenv('ANSWER_CACHE_TTL', 3600))),
+    }
+
+# Latency of the most recent searches (retrieval, time to first answer token, total)
+@st.cache_resource(show_spinner=False)
+def get_request_log():
+    return deque(maxlen=500)
+
+# Load everything up front on the first run of the process and record how long each
+# piece took; later runs get the cached timings back
+@st.cache_resource(show_spinner="Loading model and connecting to the index...")
+def warm_up():
+    timings = {}
+    for name, loader in [('model', get_model), ('index', get_index), ('keyword index', get_keyword_index), ('corpus', get_corpus), ('openai', get_openai_client)]:
+        start = time.perf_counter()
+        try:
+            loader()
+        except LookupError:
+            pass
+        timings[name] = time.perf_counter() - start
+    # The first encode call initialises the tokenizer and runtime
+    start = time.perf_counter()
+    get_model().encode('warm up')
+    timings['first encode'] = time.perf_counter() - start
+    timings['total'] = sum(timings.values())
+    print("Cold start: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+    return timings
 
 # Function to generate embeddings for queries
 def generate_embedding(query):
-    return model.encode(query).tolist()  # Convert to list for Pinecone compatibility
+    # MiniLM lower-cases its input, so the normalised text embeds the same as the original
+    key = normalize_query(query)
+
+    def encode():
+        with metrics.span('embed'):
+            return get_model().encode(key).tolist()  # Convert to list for Pinecone compatibility
 
-# Function to ensure ASCII vector IDs (optional, useful for character IDs but not needed for queries)
-def to_ascii(text):
-    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return get_query_caches()['embedding'].get_or_compute(key, encode)
 
 def search_characters(query, trait=None, top_k=5):
-    query_vector = generate_embedding(query)
-    
-    results = index.query(
-        vector=query_vector,
+    key = (normalize_query(query), normalize_query(trait), top_k)
+    return get_query_caches()['search'].get_or_compute(key, lambda: _search_characters(query, trait, top_k))
+
+def _search_characters(query, trait=None, top_k=5):
+    return retrieve(
+        get_index(),
+        generate_embedding(query),
         top_k=top_k,
-        include_metadata=True
+        metadata_filter=build_filter(trait),
+        keyword_index=get_keyword_index() if hybrid_search else None,
+        query=query,
+        corpus=get_corpus(),
+        overfetch=passage_overfetch,
+        pooling=passage_pooling,
     )
-    
-    if trait:
-        filtered_results = [r for r in results['matches'] if trait.lower() in r['metadata'].get('Overview[]', '').lower()]
-        return filtered_results[:top_k]
-    return results['matches']
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def generate_ai_response(query, search_results):
-    # Prepare the prompt with search results
-    prompt = f"Query: {query}\n\nSearch Results:\n"
-    sources = []
-    for i, result in enumerate(search_results[:3], 1):  # Use top 3 results
-        name = result['metadata'].get('Name', 'Unknown')
-        overview = result['metadata'].get('Overview[]', 'No overview available.')[:200]
-        prompt += f"[{i}] {name}: {overview}...\n"
-        sources.append({"name": name, "content": overview})
-    
-    prompt += "\nBased on the query and search results, provide a concise and informative response. Cite sources using [1], [2], [3] as appropriate:"
-
-    # Generate response using OpenAI API
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant knowledgeable about The Walking Dead TV series. Always cite your sources using [1], [2], [3] when providing information."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=200
-    )
-    
-    return response.choices[0].message.content.strip(), sources
-
-# Set page config
-st.set_page_config(page_title="The Walking Dead Character Search", layout="wide", initial_sidebar_state="collapsed")
-
-# Custom CSS for Perplexity-like styling
-st.markdown("""
-    <style>
-    .stApp {
-        background-color: #000000;
-        color: #FFFFFF;
-    }
-    .stTextInput > div > div > input {
-        background-color: #1E1E1E;
-        color: #FFFFFF;
-        border: 1px solid #333333;
-    }
-    .stButton > button {
-        background-color: #1E1E1E;
-        color: #FFFFFF;
-        border: 1px solid #333333;
-    }
-    .stMarkdown {
-        color: #CCCCCC;
-    }
-    .source-bubble {
-        display: inline-block;
-        background-color: #333333;
-        color: #FFFFFF;
-        border-radius: 20px;
-        padding: 5px 10px;
-        margin: 5px;
-        font-size: 14px;
-    }
-    .source-bubble:hover {
-        background-color: #444444;
-        cursor: pointer;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
-# Main layout
-col1, col2 = st.columns([2, 3])
-
-with col1:
-    st.markdown("<h1 style='color: #FFFFFF;'>The Walking Dead Character Search</h1>", unsafe_allow_html=True)
-    query = st.text_input("Enter your search query:", key="query_input")
-    trait = st.text_input("Enter a character trait or role (optional):", key="trait_input")
-    
-    if st.button("Search"):
-        if query:
-            results = search_characters(query, trait)
+# Function to start the AI response. The completion request is sent straight away on a
+# worker thread; the returned generator yields tokens as they arrive.
+def stream_ai_response(query, search_results):
+    prompt, sources = build_prompt(query, search_results)
+    cache = get_query_caches()['answer']
+    key = (normalize_query(query), tuple((source['name'], source['content']) for source in sources))
+    cached = cache.get(key)
+    if cached is not None:
+        metrics.count('answers', cached=True)
+        return iter([cached]), sources
+    metrics.count('answers', cached=False)
+
+    tokens = queue.Queue()
+    done = object()
+
+    def complete():
+        # Generate response using OpenAI API
+        try:
+            with metrics.span('answer', model=ANSWER_MODEL) as span:
+                started = time.perf_counter()
+                stream = get_openai_client().chat.completions.create(
+                    model=ANSWER_MODEL,
+                    messages=chat_messages(prompt),
+                    max_tokens=200,
+                    stream=True
+                )
+                first_token = None
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                            metrics.observe('answer_first_token_seconds', first_token)
+                            span.set('first_token_seconds', first_token)
+                        tokens.put(chunk.choices[0].delta.content)
+        except Exception as e:
+            tokens.put(e)
+        tokens.put(done)
+
+    # The answer span belongs to the search request that started it
+    threading.Thread(target=metrics.run_in_context(complete), daemon=True).start()
+
+    def stream_tokens():
+        parts = []
+        while True:
+            token = tokens.get()
+            if token is done:
+                break
+            if isinstance(token, Exception):
+                raise token
+            parts.append(token)
+            yield token
+        cache.put(key, ''.join(parts).strip())
+
+    return stream_tokens(), sources
+
+# Function to pass tokens through while recording time to first token and total latency
+def timed_stream(tokens, request_started, timings):
+    for token in tokens:
+        if 'first_token' not in timings:
+            timings['first_token'] = time.perf_counter() - request_started
+        yield token
+    timings['total'] = time.perf_counter() - request_started
+
+def render_results(results):
+    st.markdown("<h2 style='color: #FFFFFF;'>Search Results:</h2>", unsafe_allow_html=True)
+    for i, result in enumerate(results):
+        with st.expander(f"{result['metadata'].get('Name', 'Unknown')} (Score: {result['score']:.2f})"):
+            st.markdown("<h4 style='color: #FFFFFF;'>Overview:</h4>", unsafe_allow_html=True)
+            overview = result['metadata'].get('Overview[]', 'No overview available.')
+            st.write(overview[:200] + "..." if len(overview) > 200 else overview)
             
-            # Generate AI response
-            ai_response, sources = generate_ai_response(query, results)
+            st.markdown("<h4 style='color: #FFFFFF;'>Pre-Apocalypse:</h4>", unsafe_allow_html=True)
+            st.write(result['metadata'].get('Pre-Apocalypse[]', 'No information available.'))
             
-            # Display sources as bubbles
-            st.markdown("<h3 style='color: #FFFFFF;'>Sources:</h3>", unsafe_allow_html=True)
-            source_html = "<div>"
-            for i, source in enumerate(sources, 1):
-                source_html += f"<span class='source-bubble' data-result-id='{i-1}' title='{source['content']}'>[{i}] {source['name']}</span>"
-            source_html += "</div>"
-            st.markdown(source_html, unsafe_allow_html=True)
+            st.markdown("<h4 style='color: #FFFFFF;'>Post-Apocalypse:</h4>", unsafe_allow_html=True)
+            st.write(result['metadata'].get('Post-Apocalypse[]', 'No information available.'))
             
-            # Add JavaScript for handling source bubble clicks
-            st.markdown("""
-            <script>
-            const observer = new MutationObserver((mutations) => {
-                mutations.forEach((mutation) => {
-                    if (mutation.addedNodes.length) {
-                        mutation.addedNodes.forEach((node) => {
-                            if (node.nodeType === 1 && node.matches('.source-bubble')) {
-                                node.addEventListener('click', () => {
-                                    const resultId = node.getAttribute('data-result-id');
-                                    const expander = document.querySelector(`[data-testid="expander"][aria-controls="result_${resultId}-content"]`);
-                                    if (expander) {
-                                        expander.click();
+            st.markdown("<h4 style='color: #FFFFFF;'>Killed Victims:</h4>", unsafe_allow_html=True)
+            st.write(result['metadata'].get('Killed Victims[]', 'No information available.'))
+            
+            st.markdown("<h4 style='color: #FFFFFF;'>Trivia:</h4>", unsafe_allow_html=True)
+            st.write(result['metadata'].get('Trivia[]', 'No trivia available.'))
+
+# Command-line settings: streamlit run app.py -- --index-name my-index
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='The Walking Dead character search app.')
+    parser.add_argument('--index-name', default=index_name, help='Pinecone index name')
+    parser.add_argument('--keyword-index', default=keyword_index_path, help='Keyword index directory (KEYWORD_INDEX)')
+    parser.add_argument('--no-hybrid', action='store_true', default=not hybrid_search,
+                        help='Vector-only search (HYBRID_SEARCH=0)')
+    parser.add_argument('--embedding-backend', choices=BACKENDS, default=model_backend,
+                        help='Query encoder backend (EMBEDDING_BACKEND)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    global index_name, keyword_index_path, hybrid_search, model_backend
+    args = parse_args(argv)
+    index_name, keyword_index_path, hybrid_search = args.index_name, args.keyword_index, not args.no_hybrid
+    model_backend = args.embedding_backend
+
+    # Set page config
+    st.set_page_config(page_title="The Walking Dead Character Search", layout="wide", initial_sidebar_state="collapsed")
+
+    startup_timings = warm_up()
+    try:
+        get_index()
+    except LookupError as e:
+        st.error(str(e))
+
+    # Custom CSS for Perplexity-like styling
+    st.markdown("""
+        <style>
+        .stApp {
+            background-color: #000000;
+            color: #FFFFFF;
+        }
+        .stTextInput > div > div > input {
+            background-color: #1E1E1E;
+            color: #FFFFFF;
+            border: 1px solid #333333;
+        }
+        .stButton > button {
+            background-color: #1E1E1E;
+            color: #FFFFFF;
+            border: 1px solid #333333;
+        }
+        .stMarkdown {
+            color: #CCCCCC;
+        }
+        .source-bubble {
+            display: inline-block;
+            background-color: #333333;
+            color: #FFFFFF;
+            border-radius: 20px;
+            padding: 5px 10px;
+            margin: 5px;
+            font-size: 14px;
+        }
+        .source-bubble:hover {
+            background-color: #444444;
+            cursor: pointer;
+        }
+        </style>
+        """, unsafe_allow_html=True)
+
+    # Main layout
+    col1, col2 = st.columns([2, 3])
+
+    with col1:
+        st.markdown("<h1 style='color: #FFFFFF;'>The Walking Dead Character Search</h1>", unsafe_allow_html=True)
+        query = st.text_input("Enter your search query:", key="query_input")
+        trait = st.text_input("Enter a character trait or role (optional):", key="trait_input")
+
+        if st.button("Search"):
+            if query:
+                # One trace per search: embed, vector query, keyword search, lookup and answer spans
+                with metrics.span('search_request', query=query, trait=trait):
+                    request_started = time.perf_counter()
+                    results = search_characters(query, trait)
+                    timings = {'retrieval': time.perf_counter() - request_started}
+
+                    # Start generating the AI response; it streams in while the results render
+                    answer_tokens, sources = stream_ai_response(query, results)
+
+                    # Display sources as bubbles
+                    st.markdown("<h3 style='color: #FFFFFF;'>Sources:</h3>", unsafe_allow_html=True)
+                    source_html = "<div>"
+                    for i, source in enumerate(sources, 1):
+                        source_html += f"<span class='source-bubble' data-result-id='{i-1}' title='{source['content']}'>[{i}] {source['name']}</span>"
+                    source_html += "</div>"
+                    st.markdown(source_html, unsafe_allow_html=True)
+
+                    # Add JavaScript for handling source bubble clicks
+                    st.markdown("""
+                    <script>
+                    const observer = new MutationObserver((mutations) => {
+                        mutations.forEach((mutation) => {
+                            if (mutation.addedNodes.length) {
+                                mutation.addedNodes.forEach((node) => {
+                                    if (node.nodeType === 1 && node.matches('.source-bubble')) {
+                                        node.addEventListener('click', () => {
+                                            const resultId = node.getAttribute('data-result-id');
+                                            const expander = document.querySelector(`[data-testid="expander"][aria-controls="result_${resultId}-content"]`);
+                                            if (expander) {
+                                                expander.click();
+                                            }
+                                        });
                                     }
                                 });
                             }
                         });
-                    }
-                });
-            });
-            observer.observe(document.body, { childList: true, subtree: true });
-            </script>
-            """, unsafe_allow_html=True)
-            
-            # Display AI response
-            st.markdown("<h3 style='color: #FFFFFF;'>Answer:</h3>", unsafe_allow_html=True)
-            st.write(ai_response)
-
-with col2:
-    if query:
-        st.markdown("<h2 style='color: #FFFFFF;'>Search Results:</h2>", unsafe_allow_html=True)
-        for i, result in enumerate(results):
-            with st.expander(f"{result['metadata'].get('Name', 'Unknown')} (Score: {result['score']:.2f})"):
-                st.markdown("<h4 style='color: #FFFFFF;'>Overview:</h4>", unsafe_allow_html=True)
-                overview = result['metadata'].get('Overview[]', 'No overview available.')
-                st.write(overview[:200] + "..." if len(overview) > 200 else overview)
-                
-                st.markdown("<h4 style='color: #FFFFFF;'>Pre-Apocalypse:</h4>", unsafe_allow_html=True)
-                st.write(result['metadata'].get('Pre-Apocalypse[]', 'No information available.'))
-                
-                st.markdown("<h4 style='color: #FFFFFF;'>Post-Apocalypse:</h4>", unsafe_allow_html=True)
-                st.write(result['metadata'].get('Post-Apocalypse[]', 'No information available.'))
-                
-                st.markdown("<h4 style='color: #FFFFFF;'>Killed Victims:</h4>", unsafe_allow_html=True)
-                st.write(result['metadata'].get('Killed Victims[]', 'No information available.'))
-                
-                st.markdown("<h4 style='color: #FFFFFF;'>Trivia:</h4>", unsafe_allow_html=True)
-                st.write(result['metadata'].get('Trivia[]', 'No trivia available.'))
-
-# Sidebar
-st.sidebar.markdown("<h2 style='color: #FFFFFF;'>About</h2>", unsafe_allow_html=True)
-st.sidebar.info("This app allows you to search for characters from The Walking Dead TV series. Enter a query to find characters with similar attributes or storylines.")
-st.sidebar.markdown("<h3 style='color: #FFFFFF;'>How to use:</h3>", unsafe_allow_html=True)
-st.sidebar.markdown("1. Enter your search query in the main text box.")
-st.sidebar.markdown("2. Optionally, enter a character trait or role to refine your search.")
-st.sidebar.markdown("3. Click the 'Search' button to get results.")
-st.sidebar.markdown("4. View the AI-generated response and explore detailed character information.")
+                    });
+                    observer.observe(document.body, { childList: true, subtree: true });
+                    </script>
+                    """, unsafe_allow_html=True)
+
+                    # Show the search results as soon as retrieval is done
+                    with col2:
+                        render_results(results)
+
+                    # Stream the AI response into the page token by token
+                    st.markdown("<h3 style='color: #FFFFFF;'>Answer:</h3>", unsafe_allow_html=True)
+                    st.write_stream(timed_stream(answer_tokens, request_started, timings))
+                    get_request_log().append(timings)
+                    print("Search latency: " + ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items()))
+
+    # Sidebar
+    st.sidebar.markdown("<h2 style='color: #FFFFFF;'>About</h2>", unsafe_allow_html=True)
+    st.sidebar.info("This app allows you to search for characters from The Walking Dead TV series. Enter a query to find characters with similar attributes or storylines.")
+    st.sidebar.markdown("<h3 style='color: #FFFFFF;'>How to use:</h3>", unsafe_allow_html=True)
+    st.sidebar.markdown("1. Enter your search query in the main text box.")
+    st.sidebar.markdown("2. Optionally, enter a character trait or role to refine your search.")
+    st.sidebar.markdown("3. Click the 'Search' button to get results.")
+    st.sidebar.markdown("4. View the AI-generated response and explore detailed character information.")
+
+    # Startup timings: one-off cold start for this process vs. this (warm) script run
+    st.sidebar.markdown("<h3 style='color: #FFFFFF;'>Performance:</h3>", unsafe_allow_html=True)
+    st.sidebar.caption("Cold start: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in startup_timings.items()))
+    for name, cache in get_query_caches().items():
+        stats = cache.stats()
+        st.sidebar.caption(f"{name.capitalize()} cache: {stats['size']}/{stats['maxsize']} entries, "
+                           f"hit rate {stats['hit_rate']:.0%} ({stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evicted)")
+    request_log = list(get_request_log())
+    if request_log:
+        last = request_log[-1]
+        st.sidebar.caption(f"Last search: retrieval {last['retrieval'] * 1000:.0f} ms, "
+                           f"first token {last.get('first_token', last.get('total', 0)) * 1000:.0f} ms, "
+                           f"total {last.get('total', 0) * 1000:.0f} ms ({len(request_log)} searches logged)")
+    st.sidebar.caption(f"This run: {(time.perf_counter() - run_started) * 1000:.0f} ms")
+
+# Streamlit runs this file as __main__ on every interaction
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import filecmp
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from corpus import Corpus, build_corpus, export_json
+from upsert import load_characters
+
+# Per-file JSON (data/character_jsons) against the consolidated corpus: full load time,
+# peak memory of a streaming pass, and random access latency by character ID. Also
+# checks that exporting the corpus gives back byte-identical JSON files; exits non-zero
+# if it doesn't.
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - start) / repeat, result
+
+def peak_memory(function):
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def read_json_file(json_directory, filename):
+    with open(os.path.join(json_directory, filename), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def count_corpus_characters(corpus):
+    return sum(1 for _ in corpus)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the corpus store against per-file JSON.')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    json_directory = os.path.join(ROOT, 'data', 'character_jsons')
+    with tempfile.TemporaryDirectory() as directory:
+        corpus_directory = os.path.join(directory, 'corpus')
+        elapsed, count = timed(lambda: build_corpus(json_directory, corpus_directory), 1)
+        print(f"build corpus      {count} characters in {elapsed:.2f}s")
+
+        export_directory = os.path.join(directory, 'export')
+        files = export_json(Corpus(corpus_directory), export_directory)
+        names = sorted(f for f in os.listdir(json_directory) if f.endswith('.json'))
+        _, mismatch, errors = filecmp.cmpfiles(json_directory, export_directory, names, shallow=False)
+        print(f"export            {files} files, {len(names) - len(mismatch) - len(errors)}/{len(names)} identical")
+
+        json_load, _ = timed(lambda: load_characters(json_directory), args.repeat)
+        corpus_load, _ = timed(lambda: Corpus(corpus_directory).characters(), args.repeat)
+        print(f"load all          json {json_load * 1000:7.1f} ms   corpus {corpus_load * 1000:7.1f} ms")
+
+        corpus = Corpus(corpus_directory)
+        json_peak = peak_memory(lambda: load_characters(json_directory))
+        stream_peak = peak_memory(lambda: count_corpus_characters(corpus))
+        print(f"peak memory       load all {json_peak / 1e6:6.1f} MB   corpus stream {stream_peak / 1e6:6.1f} MB")
+
+        rng = random.Random(0)
+        entries = [rng.choice(corpus.entries) for _ in range(args.lookups)]
+        json_samples, corpus_samples = [], []
+        for entry in entries:
+            start = time.perf_counter()
+            read_json_file(json_directory, entry['file'])
+            json_samples.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            corpus.get(entry['id'])
+            corpus_samples.append(time.perf_counter() - start)
+        print(f"lookup by id      json file p50 {np.percentile(json_samples, 50) * 1e6:7.1f} us   "
+              f"corpus p50 {np.percentile(corpus_samples, 50) * 1e6:7.1f} us   "
+              f"p99 {np.percentile(corpus_samples, 99) * 1e6:7.1f} us")
+    sys.exit(1 if mismatch or errors else 0)
+
+if __name__ == '__main__':
+    main()
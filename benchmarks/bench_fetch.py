@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from fetcher import Fetcher
+from stub_server import start_stub_server
+
+# Compare the old one-request-at-a-time crawl against the concurrent Fetcher,
+# both pointed at the local stub wiki so the numbers do not depend on the network.
+
+def sequential(urls):
+    for url in urls:
+        requests.get(url)
+
+def concurrent(urls, workers, rate):
+    fetcher = Fetcher(max_workers=workers, rate_per_host=rate)
+    for _, _, _, error in fetcher.fetch_all((url, url) for url in urls):
+        if error is not None:
+            raise error
+    fetcher.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark page fetching against the local stub wiki.')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated round trip in seconds')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--rate', type=float, default=0, help='Per-host requests/sec (0 = unlimited)')
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency)
+    titles = sorted(server.pages)[:args.pages]
+    urls = [f"{server.base_url}/wiki/{title}" for title in titles]
+
+    start = time.perf_counter()
+    sequential(urls)
+    elapsed = time.perf_counter() - start
+    print(f"sequential requests.get: {len(urls) / elapsed:8.1f} pages/s ({elapsed:.2f}s)")
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        concurrent(urls, workers, args.rate)
+        elapsed = time.perf_counter() - start
+        print(f"Fetcher workers={workers:<3}: {len(urls) / elapsed:8.1f} pages/s ({elapsed:.2f}s)")
+
+    server.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from clean_csv_files import clean_all_csv_files
+from csv_to_json import convert_all_csv_to_json
+from remove_keys import DEFAULT_KEYS_TO_REMOVE, remove_keys_from_json
+from update_name_kv import update_json_files
+from delete_first_kv import remove_first_kv_pair
+
+# Runs README steps 4-8 on a copy of data/character_data with several ETL_WORKERS
+# settings, prints each step's throughput and checks the JSON output is byte-identical
+# to the committed data/character_jsons. Exits non-zero on a mismatch or file error.
+
+def run_steps(directory, workers):
+    csv_directory = os.path.join(directory, 'character_data')
+    json_directory = os.path.join(directory, 'character_jsons')
+    return [
+        clean_all_csv_files(csv_directory, workers),
+        convert_all_csv_to_json(csv_directory, json_directory, workers),
+        remove_keys_from_json(json_directory, DEFAULT_KEYS_TO_REMOVE, workers),
+        update_json_files(json_directory, workers),
+        remove_first_kv_pair(json_directory, workers),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the per-file ETL steps on a process pool.')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    expected_directory = os.path.join(ROOT, 'data', 'character_jsons')
+    failed = False
+    for workers in sorted(set(args.workers)):
+        with tempfile.TemporaryDirectory() as directory:
+            shutil.copytree(os.path.join(ROOT, 'data', 'character_data'), os.path.join(directory, 'character_data'))
+            print(f"--- {workers} workers")
+            start = time.perf_counter()
+            reports = run_steps(directory, workers)
+            elapsed = time.perf_counter() - start
+
+            json_directory = os.path.join(directory, 'character_jsons')
+            names = sorted(os.listdir(expected_directory))
+            _, mismatch, errors = filecmp.cmpfiles(expected_directory, json_directory, names, shallow=False)
+            print(f"steps 4-8: {elapsed:.2f}s, {len(names) - len(mismatch) - len(errors)}/{len(names)} JSON files identical")
+            if mismatch or errors or any(report.errors for report in reports):
+                failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
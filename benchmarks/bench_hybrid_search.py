@@ -0,0 +1,108 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from upsert import build_records, load_characters, model_name, plan_sync, sync_index
+from vector_store import LocalVectorStore
+from keyword_index import KeywordIndex, reciprocal_rank_fusion
+from corpus import Corpus, build_corpus
+from passages import collapse_matches
+from fakes import CountingModel
+
+# Query latency of vector-only vs hybrid (vector + BM25, fused with reciprocal rank
+# fusion) retrieval over data/character_jsons, using the same steps as the app's
+# _search_characters. Both use the local vector store; query embedding is timed
+# separately since it is shared. Also prints where a few exact-name queries rank their
+# expected character. Uses the real model unless --fake is given (ranks are then
+# meaningless for the vector side).
+
+QUERIES = [
+    ('Negan Lucille', 'Negan Smith'),
+    ('Terminus', 'Gareth'),
+    ('Hershel farm', 'Hershel Greene'),
+    ('Glenn Rhee', 'Glenn Rhee'),
+    ('King Ezekiel tiger Shiva', 'Ezekiel Sutton'),
+    ('Whisperers leader', '"Alpha"'),
+]
+
+def load_model(fake):
+    if fake:
+        return CountingModel()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+def vector_only(store, vector, top_k, overfetch):
+    matches = store.query(vector=vector, top_k=top_k * overfetch, include_metadata=False)['matches']
+    return [character_id for character_id, _ in collapse_matches(matches, top_k)]
+
+def hybrid(store, keyword_index, query, vector, top_k, overfetch):
+    depth = top_k * overfetch
+    matches = store.query(vector=vector, top_k=depth, include_metadata=False)['matches']
+    vector_ranked = [character_id for character_id, _ in collapse_matches(matches, depth)]
+    keyword_ranked = [character_id for character_id, _ in keyword_index.search(query, depth)]
+    return [character_id for character_id, _ in reciprocal_rank_fusion([vector_ranked, keyword_ranked])[:top_k]]
+
+def percentile_us(samples, q):
+    return np.percentile(samples, q) * 1e6
+
+def rank_of(ranking, expected):
+    return ranking.index(expected) + 1 if expected in ranking else '-'
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark hybrid vs vector-only search.')
+    parser.add_argument('--repeat', type=int, default=200, help='Timed runs per query')
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--overfetch', type=int, default=10)
+    parser.add_argument('--fake', action='store_true', help='Use a fake model instead of SentenceTransformer')
+    args = parser.parse_args()
+
+    json_directory = os.path.join(ROOT, 'data', 'character_jsons')
+    model = load_model(args.fake)
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        store = LocalVectorStore(os.path.join(directory, 'vectors'))
+        records = build_records(load_characters(json_directory))
+        hashes, to_upsert, to_delete = plan_sync(records, {})
+        sync_index(store, model, records, {}, hashes, to_upsert, to_delete)
+        print(f"Vector store: {len(store.ids)} vectors in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        build_corpus(json_directory, os.path.join(directory, 'corpus'))
+        keyword_index = KeywordIndex(os.path.join(directory, 'keywords'))
+        keyword_index.update(Corpus(os.path.join(directory, 'corpus')))
+        keyword_index.save()
+        print(f"Keyword index: {len(keyword_index.documents)} documents, {len(keyword_index.vocabulary)} terms "
+              f"in {time.perf_counter() - start:.2f}s")
+        start = time.perf_counter()
+        keyword_index = KeywordIndex(keyword_index.directory)
+        print(f"Keyword index load: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        embed, vector_samples, hybrid_samples = [], [], []
+        print(f"\n{'query':<28} {'expected':<16} {'vector':>6} {'hybrid':>6}")
+        for query, expected in QUERIES:
+            start = time.perf_counter()
+            vector = model.encode(query).tolist()
+            embed.append(time.perf_counter() - start)
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                vector_ranked = vector_only(store, vector, args.top_k, args.overfetch)
+                vector_samples.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                hybrid_ranked = hybrid(store, keyword_index, query, vector, args.top_k, args.overfetch)
+                hybrid_samples.append(time.perf_counter() - start)
+            print(f"{query:<28} {expected:<16} {rank_of(vector_ranked, expected):>6} {rank_of(hybrid_ranked, expected):>6}")
+
+        print(f"\ntop_k={args.top_k}, overfetch={args.overfetch}, {args.repeat} runs per query")
+        print(f"{'embed query':<12} p50 {percentile_us(embed, 50):9.1f} us")
+        for name, samples in [('vector only', vector_samples), ('hybrid', hybrid_samples)]:
+            print(f"{name:<12} p50 {percentile_us(samples, 50):9.1f} us   p99 {percentile_us(samples, 99):9.1f} us")
+
+if __name__ == '__main__':
+    main()
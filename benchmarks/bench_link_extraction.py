@@ -0,0 +1,131 @@
+import argparse
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from bs4 import BeautifulSoup
+from fetcher import Fetcher
+from frontier import Frontier, canonical_url, extract_links, namespace, page_title
+from scrape_characters import parse_character_links
+from fixtures import CRAWL_HTML_DIR, ROOT_CATEGORY, category_site
+from stub_server import start_stub_server
+
+# Link extraction on the saved listing and category pages in benchmarks/data/crawl: the
+# frontier's single streaming pass against building a BeautifulSoup tree (html.parser and
+# lxml) and querying it. Every extractor must return the same links, or the benchmark
+# exits non-zero. Then walks a synthetic category tree of --pages characters on the stub
+# wiki with a small queue, and reports the walk's peak traced memory per discovered page.
+# Regenerate the saved pages with `python benchmarks/fixtures.py`.
+
+BASE_URL = 'https://walkingdead.fandom.com/wiki/'
+
+def soup_links(content, page_url, parser):
+    # Reference: the listing's <td> scan from scrape_characters.py plus CSS queries for
+    # the category members and pagination, on one full tree
+    soup = BeautifulSoup(content, parser)
+    characters = []
+    for td in soup.find_all('td'):
+        a_tag = td.find('a', href=True)
+        img_tag = td.find('img')
+        if a_tag and '/wiki/' in a_tag['href'] and img_tag and a_tag.get('title'):
+            characters.append({'name': a_tag['title'], 'url': canonical_url(a_tag['href'], page_url),
+                               'image_url': img_tag.get('data-src') or img_tag.get('src')})
+    subcategories = []
+    for link in soup.select('a.category-page__member-link'):
+        url = canonical_url(link['href'], page_url)
+        if namespace(page_title(url)) == 'Category':
+            subcategories.append(url)
+        elif namespace(page_title(url)) is None and page_title(url):
+            image = link.find_parent('li').find('img')
+            characters.append({'name': link.get('title'), 'url': url,
+                               'image_url': image and (image.get('data-src') or image.get('src'))})
+    next_pages = [canonical_url(link['href'], page_url) for link in soup.select('a.category-page__pagination-next')]
+    return {'characters': characters, 'subcategories': subcategories, 'next_pages': next_pages}
+
+def load_pages():
+    pages = {}
+    for filename in sorted(os.listdir(CRAWL_HTML_DIR)):
+        if filename.endswith('.html'):
+            with open(os.path.join(CRAWL_HTML_DIR, filename), 'rb') as f:
+                pages[BASE_URL + filename[:-len('.html')].replace('Category_', 'Category:', 1)] = f.read()
+    return pages
+
+def extractors():
+    found = {'streaming': extract_links, 'bs4 html.parser': lambda content, url: soup_links(content, url, 'html.parser')}
+    try:
+        import lxml  # noqa: F401
+        found['bs4 lxml'] = lambda content, url: soup_links(content, url, 'lxml')
+    except ImportError:
+        pass
+    return found
+
+def time_extractor(extract, pages, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for url, content in pages.items():
+            extract(content, url)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def walk_memory(pages, queue_size):
+    titles = [f'Walker_{i:06d}_(TV_Series)' for i in range(pages)]
+    server = start_stub_server(pages=category_site(titles))
+    frontier = Frontier([f"{server.base_url}/wiki/{ROOT_CATEGORY}"], queue_size=queue_size)
+    fetcher = Fetcher(max_workers=1, rate_per_host=0)
+    tracemalloc.start()
+    start = time.perf_counter()
+    walker = threading.Thread(target=frontier.walk, args=(fetcher,))
+    walker.start()
+    discovered = sum(1 for _ in frontier)
+    walker.join()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    fetcher.close()
+    server.stop()
+    return frontier, discovered, elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark link extraction and the crawl frontier.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--pages', type=int, default=20000, help='Characters in the synthetic category tree')
+    parser.add_argument('--queue-size', type=int, default=64)
+    args = parser.parse_args()
+
+    pages = load_pages()
+    total_bytes = sum(len(content) for content in pages.values())
+    expected = {url: extract_links(content, url) for url, content in pages.items()}
+    links = sum(len(result['characters']) + len(result['subcategories']) + len(result['next_pages']) for result in expected.values())
+    print(f"{len(pages)} saved pages, {total_bytes / 1e6:.2f} MB, {links} links")
+
+    # The listing rows must also match the original scraper's
+    ok = True
+    for url, content in pages.items():
+        original = [{**row, 'url': canonical_url(row['url'], url)} for row in parse_character_links(content, BASE_URL[:-len('/wiki/')])]
+        if original and original != expected[url]['characters']:
+            print(f"MISMATCH scrape_characters.parse_character_links: {url}")
+            ok = False
+    for name, extract in extractors().items():
+        mismatched = [url for url, content in pages.items() if extract(content, url) != expected[url]]
+        if mismatched:
+            print(f"MISMATCH {name}: {', '.join(mismatched)}")
+            ok = False
+        elapsed = time_extractor(extract, pages, args.repeat)
+        print(f"{name:<16} {elapsed * 1000:8.1f} ms  {total_bytes / elapsed / 1e6:6.1f} MB/s  {links / elapsed:9.0f} links/s")
+
+    frontier, discovered, elapsed, peak = walk_memory(args.pages, args.queue_size)
+    stats = frontier.stats
+    print(f"\nfrontier walk     {discovered} pages from {stats['navigation_pages']} category pages in {elapsed:.1f}s, "
+          f"queue high water {stats['queue_high_water']}/{args.queue_size}, peak traced memory {peak / 1e6:.1f} MB "
+          f"({peak / max(discovered, 1):.0f} bytes/page)")
+    ok &= discovered == args.pages and stats['queue_high_water'] <= args.queue_size
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import metrics
+import scrape_character_pages
+from fetcher import Fetcher
+from scrape_character_pages import fetch_character_pages, save_character_page
+from stub_server import start_stub_server
+
+# Cost of the instrumentation (a span and a counter per call, with the exporter off and
+# on), then a crawl of the stub wiki exported to a local stand-in for an OTLP collector:
+# prints the per-stage latency breakdown from the histograms and checks that the crawl's
+# trace holds exactly the spans the README lists: a fetch, parse and save_csv span per
+# page. Also renders the same run as a Prometheus text file. Exits non-zero if the export
+# is incomplete.
+
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        with self.server.lock:
+            self.server.payloads[self.path].append(json.loads(body))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def start_collector():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CollectorHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.payloads = defaultdict(list)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def per_call(function, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls
+
+def instrumented_call():
+    with metrics.span('bench'):
+        metrics.count('bench_calls')
+
+def overhead(calls):
+    metrics.configure(None)
+    disabled = per_call(instrumented_call, calls)
+    metrics.configure(metrics.PrometheusTextfileExporter(os.path.join(tempfile.gettempdir(), 'bench_metrics.prom')))
+    enabled = per_call(instrumented_call, calls)
+    print(f"span + counter    exporter off {disabled * 1e6:6.2f} us/call   on {enabled * 1e6:6.2f} us/call")
+
+def crawl(server, workers):
+    rows = [{'name': title.replace('_', ' '), 'url': f"{server.base_url}/wiki/{title}"} for title in sorted(server.pages)]
+    import pandas as pd
+
+    fetcher = Fetcher(max_workers=workers, rate_per_host=0)
+    with metrics.span('crawl', pages=len(rows)):
+        for name, _, response in fetch_character_pages(pd.DataFrame(rows), fetcher):
+            save_character_page(name, response)
+    fetcher.close()
+    return len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark and check the metrics layer.')
+    parser.add_argument('--calls', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.01, help='Simulated wiki round trip in seconds')
+    args = parser.parse_args()
+
+    overhead(args.calls)
+
+    wiki = start_stub_server(latency=args.latency)
+    collector = start_collector()
+    endpoint = f"http://127.0.0.1:{collector.server_address[1]}"
+    with tempfile.TemporaryDirectory() as directory:
+        scrape_character_pages.output_dir = directory
+        exporter = metrics.OTLPExporter(endpoint, 'bench_metrics')
+        registry = metrics.configure(exporter)
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                pages = crawl(wiki, args.workers)
+            finally:
+                sys.stdout = stdout
+        elapsed = time.perf_counter() - start
+
+        print(f"crawl             {pages} pages in {elapsed:.2f}s with {args.workers} workers")
+        for (name, labels), histogram in sorted(registry.histograms.items(), key=lambda item: item[0]):
+            print(f"  {name:<24} {dict(labels)}  n={histogram.count:<5} mean {histogram.sum / histogram.count * 1000:8.2f} ms  "
+                  f"total {histogram.sum:7.2f}s")
+        for (name, labels), value in sorted(registry.counters.items()):
+            print(f"  {name + '_total':<24} {dict(labels)}  {value}")
+
+        prom_text = metrics.prometheus_text(registry.counters, registry.histograms)
+        metrics.flush()
+        metrics.configure(None)
+
+    wiki.stop()
+    collector.shutdown()
+
+    spans = [span for payload in collector.payloads['/v1/traces'] for resource in payload['resourceSpans']
+             for scope in resource['scopeSpans'] for span in scope['spans']]
+    by_name = defaultdict(list)
+    for span in spans:
+        by_name[span['name']].append(span)
+    crawl_trace = by_name['crawl'][0]['traceId'] if by_name['crawl'] else None
+    outside = [span for span in spans if span['traceId'] != crawl_trace]
+    print(f"prometheus file   {prom_text.count(chr(10))} lines")
+    print(f"otlp              {len(collector.payloads['/v1/metrics'])} metrics post(s), {len(spans)} spans: "
+          + ", ".join(f"{name} {len(group)}" for name, group in sorted(by_name.items()))
+          + f"; {len(outside)} outside the crawl trace")
+    complete = (set(by_name) == {'crawl', 'fetch', 'parse', 'save_csv'}
+                and all(len(by_name[name]) == pages for name in ('fetch', 'parse', 'save_csv'))
+                and not outside and collector.payloads['/v1/metrics'])
+    sys.exit(0 if complete else 1)
+
+if __name__ == '__main__':
+    main()
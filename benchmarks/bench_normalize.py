@@ -0,0 +1,112 @@
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import normalize
+from normalize import clean_csv_text, normalize_whitespace
+
+# Checks that the normalisation engine writes the same bytes as the original
+# read_csv -> per-cell apply -> to_csv cleaning, on data/character_data and on random
+# CSVs full of edge cases (numbers, non-ASCII digits, bools, padding, newlines, ragged
+# rows), then times both on the small character files and on one large table. Exits
+# non-zero on any mismatch.
+
+EDGE_CELLS = ['', ' ', 'x', 'two  words', ' padded ', 'line\nbreak', 'tab\there', '007', ' 007', '+3', '-0',
+              '1.5', '1.', '.5', '1e3', 'inf', '-Infinity', 'NaN', 'nan', 'True', 'TRUE', 'false', 'yes',
+              '12345678901234567890', '1_000', '0x10', 'a,b', 'say "hi"', ' nbsp ', 'café',
+              '٣', '-٣', '１２', '1٣', '٣.٥', '1e٣']
+
+def legacy_clean_csv_text(file_path):
+    df = pd.read_csv(file_path, keep_default_na=False)
+    for column in df.columns:
+        df[column] = df[column].apply(normalize_whitespace)
+    out = io.StringIO()
+    df.to_csv(out, index=False)
+    return out.getvalue()
+
+def random_csv(rng):
+    columns = rng.randint(1, 4)
+    header = [rng.choice(['Name', 'Overview[]', '', 'Trivia[]', 'x']) + str(i) for i in range(columns)]
+    if rng.random() < 0.1:
+        header[0] = ''
+    rows = []
+    for _ in range(rng.randint(1, 4)):
+        column_kind = rng.choice(EDGE_CELLS)
+        rows.append([column_kind if rng.random() < 0.5 else rng.choice(EDGE_CELLS) for _ in range(columns)])
+    out = io.StringIO()
+    pd.DataFrame(rows, columns=header).to_csv(out, index=False)
+    return out.getvalue()
+
+def check(paths):
+    mismatches = 0
+    for path in paths:
+        expected = legacy_clean_csv_text(path)
+        got, _ = clean_csv_text(path)
+        if got != expected:
+            mismatches += 1
+            print(f"MISMATCH {path}\n  expected {expected!r}\n  got      {got!r}")
+    return mismatches
+
+def time_files(clean, paths, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path in paths:
+            clean(path)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Check and benchmark CSV normalisation.')
+    parser.add_argument('--fuzz', type=int, default=2000, help='Random edge-case CSVs to check')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--large-rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    csv_directory = os.path.join(ROOT, 'data', 'character_data')
+    paths = [os.path.join(csv_directory, f) for f in sorted(os.listdir(csv_directory)) if f.endswith('.csv')]
+    mismatches = check(paths)
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        fuzz_paths = []
+        for i in range(args.fuzz):
+            path = os.path.join(directory, f'fuzz_{i}.csv')
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                f.write(random_csv(rng))
+            fuzz_paths.append(path)
+        mismatches += check(fuzz_paths)
+        print(f"Parity: {len(paths)} character files and {len(fuzz_paths)} random files, {mismatches} mismatches")
+
+        files = len(paths) * args.repeat
+        legacy = time_files(legacy_clean_csv_text, paths, args.repeat)
+        engine = time_files(clean_csv_text, paths, args.repeat)
+        print(f"small files  legacy {files / legacy:8.0f} files/s   engine {files / engine:8.0f} files/s  ({legacy / engine:.1f}x)")
+
+        large = pd.concat([pd.read_csv(path, keep_default_na=False) for path in paths[:50]], ignore_index=True)
+        large = large.sample(args.large_rows, replace=True, random_state=0)
+        large_path = os.path.join(directory, 'large.csv')
+        large.to_csv(large_path, index=False)
+        start = time.perf_counter()
+        expected = legacy_clean_csv_text(large_path)
+        legacy = time.perf_counter() - start
+        start = time.perf_counter()
+        got, _ = clean_csv_text(large_path)
+        engine = time.perf_counter() - start
+        if got != expected:
+            mismatches += 1
+            print("MISMATCH large table")
+        path_name = 'pandas' if os.path.getsize(large_path) > normalize.SMALL_FILE_BYTES else 'csv'
+        print(f"large table  {args.large_rows} rows  legacy {legacy:.2f}s   engine ({path_name}) {engine:.2f}s  "
+              f"({legacy / engine:.1f}x)")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from upsert import build_records, load_characters
+from vector_store import VECTOR_DTYPES, LocalVectorStore
+from passages import collapse_matches
+from embeddings import load_model
+from fakes import CountingModel
+
+# Recall vs latency of the compact embedding paths against the current fp32 path (the
+# PyTorch model and a float32 store) on data/character_jsons:
+# - model backends (EMBEDDING_BACKEND): cold start in a fresh interpreter (import, load
+#   and first encode) with its peak RSS, bulk encoding of every record, and single-query
+#   encode latency as in the app
+# - local store dtypes (LOCAL_VECTOR_DTYPE): size on disk and query latency
+# Recall is measured for every backend x dtype pair against the baseline's results, both
+# for the raw passage hits (top_k * overfetch) and for the characters the app shows
+# (top_k after collapsing passages). Queries are character names plus the opening words
+# of sampled overviews. With --fake only the dtypes are compared, since a stand-in model
+# has nothing to quantize. Exits non-zero if any pair's recall is below --min-recall.
+
+COLD_START = """
+import json, resource, sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+from embeddings import load_model
+load_model({backend!r}).encode('warm up')
+print(json.dumps({{'seconds': time.perf_counter() - start,
+                  'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+def cold_start(backend):
+    result = subprocess.run([sys.executable, '-c', COLD_START.format(src=os.path.join(ROOT, 'src'), backend=backend)],
+                            capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout.splitlines()[-1])
+
+def percentile_ms(samples, q):
+    return np.percentile(samples, q) * 1000
+
+def build_queries(characters, count, seed=0):
+    names = [character.get('Name', character_id) for character_id, character in characters.items()]
+    overviews = [' '.join(character.get('Overview[]', '').split()[:8]) for character in characters.values()]
+    rng = random.Random(seed)
+    queries = rng.sample(names, min(count // 2, len(names)))
+    queries += rng.sample([text for text in overviews if text], min(count - len(queries), len(overviews)))
+    return queries
+
+def timed_encode(model, queries):
+    vectors, samples = [], []
+    for query in queries:
+        start = time.perf_counter()
+        vectors.append(model.encode(query))
+        samples.append(time.perf_counter() - start)
+    return np.stack(vectors), samples
+
+def open_store(directory, ids, vectors, metadata, dtype):
+    store = LocalVectorStore(directory, dimension=vectors.shape[1], dtype=dtype)
+    store.upsert([(vector_id, vector, metadata[vector_id]) for vector_id, vector in zip(ids, vectors)])
+    store.save()
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in ('vectors.npy', 'scales.npy')
+               if os.path.exists(os.path.join(directory, name)))
+    return LocalVectorStore(directory, dimension=vectors.shape[1], dtype=dtype), size
+
+def search(store, queries, depth, top_k):
+    passages, characters, samples = [], [], []
+    for vector in queries:
+        start = time.perf_counter()
+        matches = store.query(vector=vector, top_k=depth, include_metadata=False)['matches']
+        samples.append(time.perf_counter() - start)
+        passages.append([match['id'] for match in matches])
+        characters.append([character_id for character_id, _ in collapse_matches(matches, top_k)])
+    return passages, characters, samples
+
+def recall(results, reference):
+    found = sum(len(set(got) & set(expected)) for got, expected in zip(results, reference))
+    return found / max(sum(len(expected) for expected in reference), 1)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark recall vs latency of quantized embeddings and vectors.')
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx-fp32', 'onnx'],
+                        help='Embedding backends to compare; the first is the baseline')
+    parser.add_argument('--dtypes', nargs='+', choices=VECTOR_DTYPES, default=list(VECTOR_DTYPES))
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--overfetch', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--min-recall', type=float, default=0.9)
+    parser.add_argument('--fake', action='store_true', help='Use a fake model and compare only the dtypes')
+    args = parser.parse_args()
+
+    characters = load_characters(os.path.join(ROOT, 'data', 'character_jsons'))
+    records = build_records(characters)
+    ids = list(records)
+    texts = [records[vector_id][0] for vector_id in ids]
+    metadata = {vector_id: records[vector_id][1] for vector_id in ids}
+    queries = build_queries(characters, args.queries)
+    print(f"{len(characters)} characters, {len(ids)} vectors, {len(queries)} queries\n")
+
+    backends = ['fake'] if args.fake else args.backends
+    encoded = {}
+    for backend in backends:
+        if backend == 'fake':
+            model = CountingModel()
+        else:
+            startup = cold_start(backend)
+            if startup is None:
+                print(f"{backend:<10} unavailable (not installed or not exported), skipped")
+                continue
+            model = load_model(backend)
+        start = time.perf_counter()
+        corpus_vectors = np.asarray(model.encode(texts, batch_size=args.batch_size), dtype=np.float32)
+        bulk = time.perf_counter() - start
+        query_vectors, samples = timed_encode(model, queries)
+        encoded[backend] = (corpus_vectors, query_vectors, samples)
+        line = f"{backend:<10} bulk encode {len(texts) / bulk:7.1f} records/s   query encode p50 {percentile_ms(samples, 50):7.2f} ms  p99 {percentile_ms(samples, 99):7.2f} ms"
+        if backend != 'fake':
+            line += f"   cold start {startup['seconds']:5.1f}s  peak RSS {startup['rss_mb']:6.0f} MB"
+        print(line)
+    if not encoded:
+        sys.exit(1)
+
+    baseline = next(iter(encoded))
+    depth = args.top_k * args.overfetch
+    failures = 0
+    print(f"\nrecall against {baseline}/float32, passages@{depth} and characters@{args.top_k}")
+    print(f"{'backend':<10} {'dtype':<8} {'size MB':>8} {'search p50':>11} {'search p99':>11} {'passages':>9} {'characters':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        reference_store, _ = open_store(os.path.join(directory, 'reference'), ids, encoded[baseline][0], metadata, 'float32')
+        reference_passages, reference_characters, _ = search(reference_store, encoded[baseline][1], depth, args.top_k)
+        for backend, (corpus_vectors, query_vectors, _) in encoded.items():
+            for dtype in args.dtypes:
+                store, size = open_store(os.path.join(directory, f'{backend}-{dtype}'), ids, corpus_vectors, metadata, dtype)
+                passages, characters, samples = search(store, query_vectors, depth, args.top_k)
+                passage_recall = recall(passages, reference_passages)
+                character_recall = recall(characters, reference_characters)
+                failures += character_recall < args.min_recall
+                print(f"{backend:<10} {dtype:<8} {size / 1e6:8.2f} {percentile_ms(samples, 50):8.3f} ms {percentile_ms(samples, 99):8.3f} ms "
+                      f"{passage_recall:9.3f} {character_recall:11.3f}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from bs4 import BeautifulSoup
+from fixtures import load_sample_pages
+from sections import PARSER, extract_sections, extract_sections_legacy, find_content_section
+
+# Parity check and micro-benchmark for section extraction over the saved HTML fixtures,
+# plus a few malformed pages like the ones the wiki serves. The reference is the original
+# scraper: html.parser plus the find_next_siblings scan. The default parser must match it
+# on every page; other parsers (HTML_PARSER=lxml) are only reported.
+
+MALFORMED_PAGES = {
+    'div_in_p': '<div class="mw-parser-output"><h2>A</h2><p>x<div>y</div>z</p><h2>B</h2><p>w</p></div>',
+    'unclosed_p': '<div class="mw-parser-output"><h2>A</h2><p>one<p>two<ul><li>three</ul><h2>B</h2><p>four</div>',
+    'stray_end_tags': '<div class="mw-parser-output"><h2>A</h2></span><p>x</b> y</p></td><dl><dt>z</dl></div>',
+    'nested_list': '<div class="mw-parser-output"><h2>A</h2><ul><li>x<ul><li>y</li></ul><p>z</p></ul></div>',
+}
+
+def available_parsers():
+    parsers = ['html.parser']
+    try:
+        import lxml  # noqa: F401
+        parsers.append('lxml')
+    except ImportError:
+        pass
+    return parsers
+
+def reference_sections(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    return extract_sections_legacy(soup.find('div', {'class': 'mw-parser-output'}))
+
+def check_parity(pages, parser):
+    failures = 0
+    for title, content in pages.items():
+        expected = reference_sections(content)
+        actual = extract_sections(find_content_section(content, parser))
+        if list(actual.items()) != list(expected.items()):
+            failures += 1
+            print(f"MISMATCH {title} ({parser})")
+    return failures
+
+def time_it(fn, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for content in pages.values():
+            fn(content)
+    return (time.perf_counter() - start) / (repeat * len(pages))
+
+def main():
+    parser = argparse.ArgumentParser(description='Check and benchmark section extraction on saved HTML.')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    pages = load_sample_pages()
+    parsers = available_parsers()
+    failures = check_parity({**pages, **MALFORMED_PAGES}, PARSER)
+    print(f"Parity: {len(pages)} pages + {len(MALFORMED_PAGES)} malformed, default parser {PARSER}, {failures} mismatches")
+    for name in parsers:
+        if name != PARSER:
+            differences = sum(extract_sections(find_content_section(content, name)) != reference_sections(content)
+                              for content in MALFORMED_PAGES.values())
+            print(f"{name} (opt-in) differs on {differences} of {len(MALFORMED_PAGES)} malformed pages")
+
+    baseline = time_it(reference_sections, pages, args.repeat)
+    print(f"{'legacy scan (html.parser)':<32} {baseline * 1000:7.2f} ms/page")
+    for name in parsers:
+        elapsed = time_it(lambda c: extract_sections(find_content_section(c, name)), pages, args.repeat)
+        print(f"{'single pass (' + name + ')':<32} {elapsed * 1000:7.2f} ms/page  ({baseline / elapsed:.1f}x)")
+
+    # Extraction alone, on an already parsed tree
+    trees = {title: find_content_section(c, 'html.parser') for title, c in pages.items()}
+    legacy = time_it(extract_sections_legacy, trees, args.repeat)
+    single = time_it(extract_sections, trees, args.repeat)
+    print(f"extraction only: legacy {legacy * 1000:.3f} ms/page, single pass {single * 1000:.3f} ms/page")
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
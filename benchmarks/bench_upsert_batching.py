@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from upsert import build_records, encode_character_data, load_characters, model_name, plan_sync, sync_index
+from fakes import CountingModel, InMemoryIndex
+
+# Records/second for the batched encode + upsert path at several batch sizes, compared
+# with the old one-encode-one-upsert-per-character loop. Records are vectors (characters
+# plus their passages) for the batched path and characters for the old loop. Upserts go to the in-memory
+# index with a simulated round trip. Uses the real model unless --fake is given.
+
+def load_model(fake):
+    if fake:
+        # ~2ms fixed cost per encode call plus ~1ms per text
+        return CountingModel(call_overhead=0.002, per_text_cost=0.001)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+def one_at_a_time(index, model, characters):
+    for character_id, character in characters.items():
+        vector, metadata = encode_character_data(character, model)
+        index.upsert([(character_id, vector.tolist(), metadata)])
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batched embedding and upsert.')
+    parser.add_argument('--records', type=int, default=256)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32, 64, 128])
+    parser.add_argument('--upsert-latency', type=float, default=0.02, help='Simulated seconds per upsert call')
+    parser.add_argument('--fake', action='store_true', help='Use a fake model instead of SentenceTransformer')
+    args = parser.parse_args()
+
+    characters = load_characters(os.path.join(ROOT, 'data', 'character_jsons'))
+    characters = dict(list(characters.items())[:args.records])
+    model = load_model(args.fake)
+
+    index = InMemoryIndex(latency=args.upsert_latency)
+    start = time.perf_counter()
+    one_at_a_time(index, model, characters)
+    elapsed = time.perf_counter() - start
+    print(f"{'one at a time':<16} {len(characters) / elapsed:8.1f} records/s  ({index.upsert_calls} upsert calls)")
+
+    records = build_records(characters)
+    for batch_size in args.batch_sizes:
+        index = InMemoryIndex(latency=args.upsert_latency)
+        hashes, to_upsert, to_delete = plan_sync(records, {})
+        start = time.perf_counter()
+        sync_index(index, model, records, {}, hashes, to_upsert, to_delete, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"{'batch=' + str(batch_size):<16} {len(records) / elapsed:8.1f} records/s  ({index.upsert_calls} upsert calls)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from vector_store import LocalVectorStore
+from fakes import InMemoryIndex
+
+# Query latency of the local NumPy vector store (in memory and memory-mapped) against
+# the per-vector Python loop of InMemoryIndex, on random 384-d vectors. Also checks
+# that argpartition top-k returns the same ids as a full sort.
+
+def percentile_us(samples, q):
+    return np.percentile(samples, q) * 1e6
+
+def time_queries(store, queries, top_k):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        store.query(vector=query, top_k=top_k, include_metadata=True)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark local vector search.')
+    parser.add_argument('--vectors', type=int, default=1200)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--top-k', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((args.vectors, 384)).astype(np.float32)
+    records = [(f'id-{i}', row.tolist(), {'Name': f'Character {i}'}) for i, row in enumerate(data)]
+    queries = rng.standard_normal((args.queries, 384)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = LocalVectorStore(directory)
+        store.upsert(records)
+        store.save()
+        stores = {
+            'local (in memory)': LocalVectorStore(directory),
+            'local (mmap)': LocalVectorStore(directory, mmap=True),
+        }
+        reference = InMemoryIndex()
+        reference.upsert(records)
+        stores['InMemoryIndex loop'] = reference
+
+        expected = [m['id'] for m in reference.query(vector=queries[0], top_k=args.top_k)['matches']]
+        for name, s in stores.items():
+            got = [m['id'] for m in s.query(vector=queries[0], top_k=args.top_k)['matches']]
+            if got != expected:
+                print(f"MISMATCH {name}: {got} != {expected}")
+                sys.exit(1)
+
+        print(f"{args.vectors} vectors, top_k={args.top_k}")
+        for name, s in stores.items():
+            samples = time_queries(s, queries, args.top_k)
+            print(f"{name:<20} p50 {percentile_us(samples, 50):9.1f} us   p99 {percentile_us(samples, 99):9.1f} us")
+
+if __name__ == '__main__':
+    main()
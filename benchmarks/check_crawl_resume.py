@@ -0,0 +1,128 @@
+import filecmp
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import requests
+from scrape_character_pages import parse_character_page
+from stub_server import start_stub_server
+
+# Runs src/scrape_character_pages.py against the stub wiki in a scratch directory. The
+# crawl is killed part way through, and each follow-up run must touch only the pages it
+# should:
+# - the re-run resumes where the killed crawl stopped
+# - --retry-failed fetches only the pages that failed (404s that now exist)
+# - --since skips fresh pages
+# - a stalled server trips the per-request timeout and the pages are logged as failed
+# Every scraped CSV must be byte-identical to the scraper's original direct to_csv write.
+
+SCRIPT = os.path.join(ROOT, 'src', 'scrape_character_pages.py')
+MISSING = ['Not_Yet_Written_1', 'Not_Yet_Written_2']
+
+def check(label, condition):
+    print(f"{'ok  ' if condition else 'FAIL'} {label}")
+    return condition
+
+def run_scraper(directory, args=(), env=None, kill_after_pages=None):
+    # Run the scraper as a separate process, optionally SIGKILLing it once the journal
+    # holds `kill_after_pages` page records
+    environment = dict(os.environ, SCRAPE_RATE_PER_HOST='0', SCRAPE_WORKERS='4', **(env or {}))
+    process = subprocess.Popen([sys.executable, SCRIPT, *args], cwd=directory, env=environment,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    if kill_after_pages is not None:
+        while process.poll() is None and len(journal_pages(directory)) < kill_after_pages:
+            time.sleep(0.01)
+        process.send_signal(signal.SIGKILL)
+    output, _ = process.communicate()
+    return output
+
+def journal_pages(directory):
+    path = os.path.join(directory, 'data', 'crawl_journal.jsonl')
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    pages = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get('event') == 'page':
+            pages.append(record)
+    return pages
+
+def write_expected_csvs(server, titles, directory):
+    os.makedirs(directory)
+    for title in titles:
+        sections = parse_character_page(title, requests.get(f"{server.base_url}/wiki/{title}"))
+        pd.DataFrame([sections]).to_csv(os.path.join(directory, f'{title}.csv'), index=False)
+
+def requests_made(server, function):
+    before = server.request_count
+    function()
+    return server.request_count - before
+
+def main():
+    server = start_stub_server(latency=0.02)
+    pages = dict(server.pages)
+    titles = sorted(pages)[:80]
+    ok = True
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, 'data'))
+        rows = [{'name': title.replace('_', ' '), 'url': f"{server.base_url}/wiki/{title}"} for title in titles + MISSING]
+        pd.DataFrame(rows).to_csv(os.path.join(directory, 'data', 'cleaned_character_data.csv'), index=False)
+        for title in MISSING:
+            server.pages.pop(title, None)
+        total = len(rows)
+
+        run_scraper(directory, kill_after_pages=30)
+        done_before = {record['url'] for record in journal_pages(directory)}
+        print(f"killed crawl after {len(done_before)} of {total} pages")
+
+        requests = requests_made(server, lambda: run_scraper(directory))
+        ok &= check(f"resumed crawl fetches only the {total - len(done_before)} pages left ({requests} requests)",
+                    requests == total - len(done_before))
+        failed = {record['url'].rsplit('/', 1)[-1] for record in journal_pages(directory) if record['status'] == 'failed'}
+        ok &= check("missing pages are logged as failed", failed == set(MISSING))
+
+        for title in MISSING:
+            server.pages[title], server.etags[title] = pages[titles[0]], server.etags[titles[0]]
+        requests = requests_made(server, lambda: run_scraper(directory, ['--retry-failed']))
+        ok &= check(f"--retry-failed fetches only the failed pages ({requests} requests)", requests == len(MISSING))
+
+        requests = requests_made(server, lambda: run_scraper(directory, ['--since', '1h']))
+        ok &= check(f"--since 1h skips pages scraped just now ({requests} requests)", requests == 0)
+
+        expected_dir = os.path.join(directory, 'expected')
+        write_expected_csvs(server, titles, expected_dir)
+        names = [f'{title}.csv' for title in titles]
+        match, _, _ = filecmp.cmpfiles(expected_dir, os.path.join(directory, 'data', 'character_data'), names, shallow=False)
+        ok &= check(f"scraped CSVs match a direct to_csv write ({len(match)}/{len(names)})", len(match) == len(names))
+
+        server.latency = 1.0
+        start = time.perf_counter()
+        run_scraper(directory, ['--since', '0s'], env={'SCRAPE_TIMEOUT': '0.2', 'SCRAPE_RETRIES': '0'})
+        elapsed = time.perf_counter() - start
+        latest = {}
+        for record in journal_pages(directory):
+            latest[record['url']] = record
+        timed_out = [record for record in latest.values() if record['status'] == 'failed' and 'timed out' in record['error'].lower()]
+        ok &= check(f"stalled requests time out and are logged as failed ({len(timed_out)}/{total} in {elapsed:.1f}s)",
+                    len(timed_out) == total)
+
+    server.stop()
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import os
+import re
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from upsert import build_records, load_characters, plan_sync, sync_index
+from vector_store import LocalVectorStore, matches_filter
+from keyword_index import KeywordIndex
+from corpus import Corpus, build_corpus
+from character_metadata import build_filter, filter_fields
+from retrieval import retrieve
+from fakes import CountingModel, InMemoryIndex
+from check_crawl_resume import check
+
+# Checks the metadata filters behind the app's trait box on data/character_jsons:
+# - matches_filter on list-valued fields ($in, $nin, $and, $or)
+# - a trait matches every character whatever form the overview uses ("soldier",
+#   "soldiers", "soldier's", "leadership"), and the query side normalises it the same way
+# - a filtered query returns a full top_k page of matching characters through
+#   LocalVectorStore, InMemoryIndex and the hybrid path with KeywordIndex
+
+TRAITS = ['soldier', 'leader', 'doctor', 'walker']
+TOP_K = 5
+
+def check_matches_filter():
+    metadata = {'status': 'alive', 'affiliations': ['hilltop', 'kingdom'], 'traits': ['leader', 'soldier']}
+    cases = [
+        ({'affiliations': {'$in': ['kingdom']}}, True),
+        ({'affiliations': {'$in': ['saviors', 'hilltop']}}, True),
+        ({'affiliations': {'$in': ['saviors']}}, False),
+        ({'affiliations': {'$nin': ['saviors']}}, True),
+        ({'affiliations': {'$nin': ['hilltop']}}, False),
+        ({'affiliations': 'hilltop'}, True),
+        ({'$and': [{'traits': {'$in': ['leader']}}, {'traits': {'$in': ['soldier']}}]}, True),
+        ({'$and': [{'traits': {'$in': ['leader']}}, {'traits': {'$in': ['doctor']}}]}, False),
+        ({'$or': [{'traits': {'$in': ['doctor']}}, {'status': {'$eq': 'alive'}}]}, True),
+        ({'missing': {'$in': ['x']}}, False),
+    ]
+    failed = [condition for condition, expected in cases if matches_filter(metadata, condition) != expected]
+    return check(f"matches_filter on list fields ({len(cases) - len(failed)}/{len(cases)} cases)", not failed)
+
+def main():
+    json_directory = os.path.join(ROOT, 'data', 'character_jsons')
+    characters = load_characters(json_directory)
+    records = build_records(characters)
+    ok = check_matches_filter()
+
+    ok &= check("traits are normalised the same way when querying",
+                build_filter("Soldiers'") == build_filter("soldier's") == build_filter('soldier')
+                and build_filter('co-leaders') == build_filter('leader'))
+    for trait in TRAITS:
+        form = re.compile(r"\b%s(?:ship)?(?:s|'s|s')?\b" % trait)
+        written = {character_id for character_id, character in characters.items() if form.search(character.get('Overview[]', '').lower())}
+        matched = {character_id for character_id, character in characters.items() if matches_filter(filter_fields(character), build_filter(trait))}
+        ok &= check(f"'{trait}' matches every character whose overview uses it ({len(matched)} matched, {len(written)} written)",
+                    written <= matched)
+
+    with tempfile.TemporaryDirectory() as directory:
+        model = CountingModel()
+        stores = {'LocalVectorStore': LocalVectorStore(os.path.join(directory, 'vectors')), 'InMemoryIndex': InMemoryIndex()}
+        hashes, to_upsert, to_delete = plan_sync(records, {})
+        for store in stores.values():
+            sync_index(store, model, records, {}, hashes, to_upsert, to_delete)
+        build_corpus(json_directory, os.path.join(directory, 'corpus'))
+        corpus = Corpus(os.path.join(directory, 'corpus'))
+        keyword_index = KeywordIndex(os.path.join(directory, 'keywords'))
+        keyword_index.update(corpus)
+
+        for trait in TRAITS:
+            metadata_filter = build_filter(trait)
+            allowed = {character_id for character_id, character in characters.items() if matches_filter(filter_fields(character), metadata_filter)}
+            vector = model.encode(f'survivor {trait}')
+            for name, store in stores.items():
+                for label, keywords in (('', None), (' + KeywordIndex', keyword_index)):
+                    results = retrieve(store, vector, top_k=TOP_K, metadata_filter=metadata_filter, keyword_index=keywords,
+                                       query=f'survivor {trait}', corpus=corpus)
+                    ids = [result['id'] for result in results]
+                    ok &= check(f"'{trait}' through {name}{label} returns a full page of matching characters",
+                                len(ids) == TOP_K and set(ids) <= allowed)
+            keyword_ids = [character_id for character_id, _ in keyword_index.search(trait, TOP_K, filter=metadata_filter)]
+            ok &= check(f"'{trait}' through KeywordIndex.search returns a full page of matching characters",
+                        len(keyword_ids) == TOP_K and set(keyword_ids) <= allowed)
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
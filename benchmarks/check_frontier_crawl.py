@@ -0,0 +1,95 @@
+import csv
+import filecmp
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from frontier import canonical_url
+from fixtures import LISTING_TITLE, ROOT_CATEGORY, character_pages, crawl_site, listing_rows
+from stub_server import start_stub_server
+from check_crawl_resume import check, journal_pages
+
+# Runs src/crawl.py against the stub wiki (the TV series listing plus a category tree with
+# pagination, subcategories and duplicate links in other URL forms) in a scratch directory:
+# - every character page is discovered once and fetched once, every navigation page once
+# - the scraped CSVs are byte-identical to scrape_character_pages.py's for the same listing
+# - the listing CSV it writes is what clean_data.py reads
+# - a killed crawl resumes without refetching finished pages, and --since fetches only
+#   the navigation pages when every character page is fresh
+
+CRAWL = os.path.join(ROOT, 'src', 'crawl.py')
+SCRAPE = os.path.join(ROOT, 'src', 'scrape_character_pages.py')
+
+def run(script, directory, args, kill_after_pages=None):
+    environment = dict(os.environ, SCRAPE_RATE_PER_HOST='0', SCRAPE_WORKERS='4')
+    process = subprocess.Popen([sys.executable, script, *args], cwd=directory, env=environment,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    if kill_after_pages is not None:
+        while process.poll() is None and len(journal_pages(directory)) < kill_after_pages:
+            time.sleep(0.01)
+        process.send_signal(signal.SIGKILL)
+    output, _ = process.communicate()
+    if kill_after_pages is None and process.returncode != 0:
+        print(output)
+    return output
+
+def requests_made(server, function):
+    before = server.request_count
+    function()
+    return server.request_count - before
+
+def main():
+    site = crawl_site()
+    pages = character_pages()
+    server = start_stub_server(latency=0.005, pages={**pages, **site})
+    seeds = ['--seed', f"{server.base_url}/wiki/{ROOT_CATEGORY}", '--seed', f"{server.base_url}/wiki/{LISTING_TITLE}"]
+    listed = {row['url'].rsplit('/wiki/', 1)[-1] for row in listing_rows()}
+    expected = {canonical_url(f"/wiki/{title}", server.base_url) for title in set(pages) | listed}
+    ok = True
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, 'data'))
+        requests = requests_made(server, lambda: run(CRAWL, directory, [*seeds, '--queue-size', '16']))
+        with open(os.path.join(directory, 'data', 'character_data_with_images.csv'), newline='', encoding='utf-8') as f:
+            urls = [row['url'] for row in csv.DictReader(f)]
+        ok &= check(f"every character page discovered once ({len(urls)} rows, {len(set(urls))} unique, {len(expected)} expected)",
+                    len(urls) == len(set(urls)) and set(urls) == expected)
+        ok &= check(f"each page fetched once ({requests} requests for {len(expected)} characters + {len(site)} navigation pages)",
+                    requests == len(expected) + len(site))
+
+        # The same pages through the original page scraper
+        run(SCRAPE, directory, ['--input', 'data/character_data_with_images.csv', '--output-dir', 'expected',
+                                '--journal', 'expected_journal.jsonl'])
+        names = sorted(os.listdir(os.path.join(directory, 'expected')))
+        match, _, _ = filecmp.cmpfiles(os.path.join(directory, 'expected'),
+                                                   os.path.join(directory, 'data', 'character_data'), names, shallow=False)
+        ok &= check(f"scraped CSVs match scrape_character_pages.py ({len(match)}/{len(names)})",
+                    names and len(match) == len(names))
+
+        import pandas as pd
+        from clean_data import clean_character_data
+        cleaned = clean_character_data(pd.read_csv(os.path.join(directory, 'data', 'character_data_with_images.csv')))
+        ok &= check(f"clean_data.py reads the listing ({len(cleaned)} rows)", len(cleaned) == len(urls))
+
+        requests = requests_made(server, lambda: run(CRAWL, directory, [*seeds, '--since', '1h']))
+        ok &= check(f"--since 1h fetches only the navigation pages ({requests} requests)", requests == len(site))
+
+        os.remove(os.path.join(directory, 'data', 'crawl_journal.jsonl'))
+        run(CRAWL, directory, seeds, kill_after_pages=150)
+        done = {record['url'] for record in journal_pages(directory)}
+        print(f"killed crawl after {len(done)} of {len(expected)} pages")
+        requests = requests_made(server, lambda: run(CRAWL, directory, seeds))
+        ok &= check(f"resumed crawl fetches only the pages left ({requests - len(site)} + {len(site)} navigation)",
+                    requests == len(expected) - len(done) + len(site))
+
+    server.stop()
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
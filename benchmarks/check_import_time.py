@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+
+# Import-time budget for the pipeline scripts. Each module is imported in a fresh
+# interpreter; the check fails if the import takes longer than its budget or pulls in a
+# dependency it shouldn't need at import time (pandas, torch, sentence-transformers,
+# openai, streamlit, onnxruntime). Every script's --help must also work, which means argument parsing
+# happens in main() before any heavy import. The numbers are the best of --repeat runs.
+
+HEAVY = ['pandas', 'torch', 'sentence_transformers', 'openai', 'streamlit', 'onnxruntime']
+
+# Budget in milliseconds per module. The JSON steps only need the standard library; the
+# scrapers need requests and bs4, the index steps numpy.
+BUDGETS = {
+    'clean_csv_files': 60,
+    'csv_to_json': 60,
+    'remove_keys': 60,
+    'update_name_kv': 60,
+    'delete_first_kv': 60,
+    'clean_data': 60,
+    'corpus': 60,
+    'crawl_journal': 60,
+    'metrics': 60,
+    'scrape_characters': 250,
+    'scrape_character_pages': 350,
+    'frontier': 250,
+    'crawl': 350,
+    'keyword_index': 250,
+    'embeddings': 250,
+    'upsert': 250,
+    'pipeline': 400,
+    'retrieval': 250,
+}
+
+# Modules without a command line
+LIBRARIES = {'crawl_journal', 'frontier', 'metrics', 'retrieval'}
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'ms': elapsed * 1000, 'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+def probe(module):
+    output = subprocess.run([sys.executable, '-c', PROBE.format(src=SRC, module=module, heavy=HEAVY)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+def help_works(module):
+    result = subprocess.run([sys.executable, os.path.join(SRC, f'{module}.py'), '--help'],
+                            capture_output=True, text=True, cwd=ROOT)
+    return result.returncode == 0 and 'usage:' in result.stdout
+
+def main():
+    parser = argparse.ArgumentParser(description='Check import time and lazy imports of the pipeline scripts.')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every budget (slow machines)')
+    args = parser.parse_args()
+
+    failures = 0
+    for module, budget in BUDGETS.items():
+        runs = [probe(module) for _ in range(args.repeat)]
+        best = min(run['ms'] for run in runs)
+        heavy = runs[0]['heavy']
+        limit = budget * args.scale
+        problems = []
+        if best > limit:
+            problems.append(f"over budget ({limit:.0f} ms)")
+        if heavy:
+            problems.append(f"imports {', '.join(heavy)}")
+        if module not in LIBRARIES and not help_works(module):
+            problems.append("--help fails")
+        failures += bool(problems)
+        print(f"{'FAIL' if problems else 'ok  '} {module:<24} {best:7.1f} ms  {'; '.join(problems)}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
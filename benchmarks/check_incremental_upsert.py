@@ -0,0 +1,77 @@
+import copy
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from upsert import build_records, load_characters, plan_sync, sync_index
+from passages import parent_of
+from vector_store import VECTOR_DTYPES, LocalVectorStore
+from fakes import CountingModel, InMemoryIndex
+
+# Exercise the incremental upsert against the in-memory index with a fake model that
+# counts encode calls: a re-run with no changes must not touch the model or the index.
+
+def run(index, model, characters, manifest):
+    records = build_records(characters)
+    hashes, to_upsert, to_delete = plan_sync(records, manifest)
+    if to_upsert or to_delete:
+        sync_index(index, model, records, manifest, hashes, to_upsert, to_delete)
+    return to_upsert, to_delete
+
+def check(label, condition):
+    print(f"{'ok  ' if condition else 'FAIL'} {label}")
+    return condition
+
+# A batch that repeats a new id must keep its last vector, as Pinecone does
+def check_repeated_ids():
+    ok = True
+    first, last = np.eye(4, dtype=np.float32)[:2]
+    for dtype in VECTOR_DTYPES:
+        with tempfile.TemporaryDirectory() as directory:
+            store = LocalVectorStore(directory, dimension=4, dtype=dtype)
+            store.upsert([('a', first, {'n': 1}), ('b', first, {}), ('a', last, {'n': 2})])
+            match = store.query(vector=last, top_k=1, include_metadata=True)['matches'][0]
+            ok &= check(f"{dtype} store keeps the last vector for a repeated id",
+                        store.ids == ['a', 'b'] and match['id'] == 'a' and match['metadata'] == {'n': 2})
+    return ok
+
+def main():
+    characters = load_characters(os.path.join(ROOT, 'data', 'character_jsons'))
+    index, model, manifest = InMemoryIndex(), CountingModel(), {}
+
+    start = time.perf_counter()
+    run(index, model, characters, manifest)
+    vector_count = len(build_records(characters))
+    print(f"initial sync: {len(characters)} characters, {vector_count} vectors in {time.perf_counter() - start:.2f}s")
+    ok = check("initial sync upserts every vector", index.describe_index_stats()['total_vector_count'] == vector_count)
+
+    calls = (model.encode_calls, index.upsert_calls, index.delete_calls)
+    start = time.perf_counter()
+    to_upsert, to_delete = run(index, model, characters, manifest)
+    print(f"no-op sync: {time.perf_counter() - start:.2f}s")
+    ok &= check("no-op re-run makes zero model or index calls",
+                not to_upsert and not to_delete and calls == (model.encode_calls, index.upsert_calls, index.delete_calls))
+
+    changed = copy.deepcopy(characters)
+    first_id = next(iter(changed))
+    changed[first_id]['Trivia[]'] = changed[first_id].get('Trivia[]', '') + ' Updated.'
+    removed_id = list(changed)[-1]
+    del changed[removed_id]
+    to_upsert, to_delete = run(index, model, changed, manifest)
+    ok &= check("only the edited character's changed vectors are re-upserted",
+                first_id in to_upsert and {parent_of(vector_id) for vector_id in to_upsert} == {first_id})
+    ok &= check("a missing character's vectors are all deleted",
+                {parent_of(vector_id) for vector_id in to_delete} == {removed_id}
+                and not any(parent_of(vector_id) == removed_id for vector_id in index.vectors))
+
+    ok &= check_repeated_ids()
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
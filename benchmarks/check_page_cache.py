@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from fetcher import Fetcher
+from page_cache import INDEX_FILE, PageCache
+from stub_server import start_stub_server
+from check_crawl_resume import check, journal_pages, requests_made, run_scraper
+
+# Exercises the on-disk page cache through the Fetcher against the stub wiki:
+# - a first fetch is a miss and stores the body; the next crawl revalidates with a 304
+# - a body file lost while its index entry remains is written back on the next full fetch
+# - a 304 for a body lost after the validators were sent is refetched once in full
+# - save() evicts the least recently used bodies down to max_bytes
+# - a killed crawl keeps the index entries of the pages it fetched
+
+class LosingCache(PageCache):
+    # Loses the body right after building the conditional headers, like an eviction
+    # racing the request
+    def conditional_headers(self, url):
+        headers = super().conditional_headers(url)
+        if headers:
+            os.remove(self._body_path(url))
+        return headers
+
+def fetch(cache, url):
+    fetcher = Fetcher(max_workers=1, rate_per_host=0, cache=cache)
+    response = fetcher.get(url)
+    fetcher.close()
+    return response
+
+def main():
+    server = start_stub_server()
+    titles = sorted(server.pages)
+    urls = [f"{server.base_url}/wiki/{title}" for title in titles]
+    url = urls[0]
+    ok = True
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache_dir = os.path.join(directory, 'cache')
+        cache = PageCache(cache_dir)
+        response = fetch(cache, url)
+        ok &= check("first fetch is a miss and stores the body",
+                    response.status_code == 200 and not response.unchanged and (cache.hits, cache.misses) == (0, 1)
+                    and os.path.exists(cache._body_path(url)))
+
+        # Each new PageCache reads the saved index, like the next crawl
+        cache = PageCache(cache_dir)
+        response = fetch(cache, url)
+        ok &= check("next crawl revalidates with a 304 and serves the cached body",
+                    response.status_code == 200 and response.unchanged and response.content == server.pages[titles[0]]
+                    and (cache.hits, cache.not_modified, cache.misses) == (1, 1, 0))
+
+        os.remove(cache._body_path(url))
+        cache = PageCache(cache_dir)
+        response = fetch(cache, url)
+        restored = os.path.exists(cache._body_path(url))
+        cache = PageCache(cache_dir)
+        fetch(cache, url)
+        ok &= check("a lost body is written back and the page is revalidated again",
+                    response.unchanged and restored and cache.not_modified == 1)
+
+        cache = LosingCache(cache_dir)
+        requests = requests_made(server, lambda: fetch(cache, url))
+        ok &= check(f"a 304 without a cached body is refetched once in full ({requests} requests)",
+                    requests == 2 and cache.misses == 1 and os.path.exists(cache._body_path(url)))
+
+        # Room for two of three pages; the first is used again, so the second is evicted
+        cache = PageCache(os.path.join(directory, 'small'))
+        sizes = [len(server.pages[title]) for title in titles[:3]]
+        cache.max_bytes = sizes[0] + max(sizes[1:])
+        for page_url in urls[:3] + urls[:1]:
+            fetcher = Fetcher(max_workers=1, rate_per_host=0, cache=cache)
+            fetcher.get(page_url)
+            time.sleep(0.01)
+        fetcher.close()
+        with open(os.path.join(directory, 'small', INDEX_FILE), 'r', encoding='utf-8') as f:
+            kept = set(json.load(f))
+        ok &= check(f"save() evicts the least recently used page ({cache.evictions} evicted)",
+                    cache.evictions == 1 and kept == {urls[0], urls[2]} and not os.path.exists(cache._body_path(urls[1])))
+        ok &= check(f"counters: {cache.report()}", (cache.hits, cache.not_modified, cache.misses) == (1, 1, 3))
+
+        # A crawl killed part way keeps the index entry of every page it journaled
+        crawl_dir = os.path.join(directory, 'crawl')
+        os.makedirs(os.path.join(crawl_dir, 'data'))
+        rows = [{'name': title.replace('_', ' '), 'url': page_url} for title, page_url in zip(titles[:60], urls[:60])]
+        pd.DataFrame(rows).to_csv(os.path.join(crawl_dir, 'data', 'cleaned_character_data.csv'), index=False)
+        server.latency = 0.02
+        run_scraper(crawl_dir, env={'PAGE_CACHE_SAVE_SECONDS': '0'}, kill_after_pages=20)
+        done = {record['url'] for record in journal_pages(crawl_dir)}
+        cached = PageCache(os.path.join(crawl_dir, 'data', '.http_cache')).entries
+        ok &= check(f"a killed crawl keeps its cache index ({len(cached)} entries for {len(done)} journaled pages)",
+                    done and done <= set(cached))
+
+    server.stop()
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
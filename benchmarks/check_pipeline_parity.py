@@ -0,0 +1,101 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from pipeline import default_stages, run_stages
+from clean_csv_files import clean_all_csv_files
+from csv_to_json import convert_all_csv_to_json
+from remove_keys import DEFAULT_KEYS_TO_REMOVE, remove_keys_from_json
+from update_name_kv import update_json_files
+from delete_first_kv import remove_first_kv_pair
+
+# Golden parity check for the fused pipeline. Each committed CSV in data/character_data
+# stands in for the scrape stage's output; running the in-memory stages over it must
+# reproduce the committed data/character_jsons file byte for byte. The committed pages
+# hold no number-like cells, so the stages are also compared with the step 4-8 scripts on
+# a committed record whose sections are replaced by cells read_csv types ('007', 'inf',
+# '1.5', 'True', '٣', ...).
+
+CSV_DIR = os.path.join(ROOT, 'data', 'character_data')
+JSON_DIR = os.path.join(ROOT, 'data', 'character_jsons')
+
+def scraped_records(csv_path):
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    return [dict(zip(rows[0], row)) for row in rows[1:]]
+
+EDGE_CELLS = ['007', ' 42 ', '+3', '-0', '12345678901234567890', '123456789012345678901234', '1.5', '1e3', '.5',
+              'inf', '-Infinity', 'nan', 'NaN', 'True', 'false', '٣', '-٣', '１２', '1_000', '0x10', '', ' padded ']
+
+# Function to run the step 4-8 scripts over records saved as the scraper saves them;
+# returns {filename: JSON text}
+def script_outputs(records, directory):
+    import pandas as pd
+
+    csv_directory, json_directory = os.path.join(directory, 'csv'), os.path.join(directory, 'json')
+    os.makedirs(csv_directory)
+    for filename, record in records.items():
+        pd.DataFrame([record]).to_csv(os.path.join(csv_directory, filename + '.csv'), index=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        clean_all_csv_files(csv_directory, workers=1)
+        convert_all_csv_to_json(csv_directory, json_directory, workers=1)
+        remove_keys_from_json(json_directory, DEFAULT_KEYS_TO_REMOVE, workers=1)
+        update_json_files(json_directory, workers=1)
+        remove_first_kv_pair(json_directory, workers=1)
+    outputs = {}
+    for filename in records:
+        with open(os.path.join(json_directory, filename + '.json'), encoding='utf-8') as f:
+            outputs[filename] = f.read()
+    return outputs
+
+def check_edge_cells(stages):
+    first = min(filename for filename in os.listdir(CSV_DIR) if filename.endswith('.csv'))
+    base = scraped_records(os.path.join(CSV_DIR, first))[0]
+    keys = [key for key in list(base)[1:] if key not in DEFAULT_KEYS_TO_REMOVE]
+    records, cells = {}, {}
+    for i, cell in enumerate(EDGE_CELLS):
+        record = dict(base)
+        record[keys[i % len(keys)]] = cell
+        record['Trivia[]'] = EDGE_CELLS[-1 - i]
+        records[f'edge_{i}'], cells[f'edge_{i}'] = record, (cell, EDGE_CELLS[-1 - i])
+    with tempfile.TemporaryDirectory() as directory:
+        expected = script_outputs(records, directory)
+    mismatches = 0
+    for filename, record in records.items():
+        actual = json.dumps([run_stages(dict(record), stages)], ensure_ascii=False, indent=4)
+        if actual != expected[filename]:
+            mismatches += 1
+            print(f"MISMATCH {filename} {cells[filename]}\n  scripts  {expected[filename]}\n  pipeline {actual}")
+    print(f"Checked {len(records)} edge-case records against the scripts, {mismatches} mismatches")
+    return mismatches
+
+def main():
+    stages = default_stages()
+    checked = mismatches = 0
+    start = time.perf_counter()
+    for filename in sorted(os.listdir(CSV_DIR)):
+        if not filename.endswith('.csv'):
+            continue
+        records = [run_stages(record, stages) for record in scraped_records(os.path.join(CSV_DIR, filename))]
+        actual = json.dumps(records, ensure_ascii=False, indent=4)
+        with open(os.path.join(JSON_DIR, filename.replace('.csv', '.json')), encoding='utf-8') as f:
+            expected = f.read()
+        checked += 1
+        if actual != expected:
+            mismatches += 1
+            print(f"MISMATCH {filename}")
+    elapsed = time.perf_counter() - start
+    print(f"Checked {checked} characters in {elapsed:.2f}s ({checked / elapsed:.0f} records/s), {mismatches} mismatches")
+    mismatches += check_edge_cells(stages)
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
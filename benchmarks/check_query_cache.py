@@ -0,0 +1,102 @@
+import os
+import random
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import query_cache
+from query_cache import LRUCache, TTLCache, normalize_query
+from check_crawl_resume import check
+
+# Behaviour of the app's query caches: LRU eviction order, TTL expiry on a fake clock,
+# and the hit/miss/eviction/expiration counters the sidebar reports.
+
+class FakeClock:
+    # Stands in for the time module in query_cache; advance() moves time.monotonic()
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+def check_lru():
+    ok = True
+    cache = LRUCache(maxsize=3)
+    for key in 'abc':
+        cache.put(key, key.upper())
+    cache.get('a')
+    cache.put('d', 'D')
+    ok &= check("the least recently used entry is evicted first (reading 'a' keeps it)",
+                list(cache.entries) == ['c', 'a', 'd'] and cache.get('b') is None)
+    cache.put('c', 'C2')
+    cache.put('e', 'E')
+    ok &= check("re-putting an entry refreshes it and replaces its value",
+                list(cache.entries) == ['d', 'c', 'e'] and cache.get('c') == 'C2')
+    stats = cache.stats()
+    ok &= check(f"LRU counters ({stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions)",
+                (stats['size'], stats['hits'], stats['misses'], stats['evictions']) == (3, 2, 1, 2)
+                and stats['hit_rate'] == 2 / 3)
+
+    computed = []
+    cache = LRUCache(maxsize=2)
+    values = [cache.get_or_compute(normalize_query(query), lambda q=query: computed.append(q) or len(computed))
+              for query in ['Rick Grimes', '  rick   GRIMES', 'Negan', 'Rick Grimes']]
+    ok &= check("get_or_compute computes once per normalised query",
+                values == [1, 1, 2, 1] and len(computed) == 2 and (cache.hits, cache.misses) == (2, 2))
+    return ok
+
+def check_ttl(clock):
+    ok = True
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.put('a', 1)
+    clock.advance(9.9)
+    ok &= check("an entry is served until its ttl", cache.get('a') == 1)
+    clock.advance(0.1)
+    ok &= check("an entry expires ttl seconds after it was stored, even if it was read",
+                cache.get('a') is None and cache.expirations == 1 and len(cache.entries) == 0)
+    cache.put('a', 2)
+    clock.advance(5)
+    cache.put('b', 3)
+    clock.advance(6)
+    ok &= check("each entry keeps its own expiry time", cache.get('a') is None and cache.get('b') == 3)
+    cache.put('c', 4)
+    cache.put('d', 5)
+    stats = cache.stats()
+    ok &= check(f"TTL counters ({stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions, "
+                f"{stats['expirations']} expirations)",
+                (stats['size'], stats['hits'], stats['misses'], stats['evictions'], stats['expirations']) == (2, 2, 2, 1, 2))
+    return ok
+
+def check_threads():
+    cache = LRUCache(maxsize=8)
+    def worker(n):
+        rng = random.Random(n)
+        for i in range(2000):
+            cache.get_or_compute(rng.randrange(12), lambda: i)
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return check(f"counters stay consistent across threads ({cache.hits} hits, {cache.misses} misses)",
+                 cache.hits and cache.hits + cache.misses == 8000 and len(cache.entries) == 8
+                 and cache.evictions <= cache.misses - 8)
+
+def main():
+    clock = FakeClock()
+    real_time, query_cache.time = query_cache.time, clock
+    try:
+        ok = check_lru()
+        ok &= check_ttl(clock)
+    finally:
+        query_cache.time = real_time
+    ok &= check_threads()
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from vector_store import matches_filter
+
+# Offline stand-ins for the embedding model, the chat API and a Pinecone index.
+
+class CountingModel:
+    # Deterministic random vectors per text; counts encode calls. `call_overhead` and
+    # `per_text_cost` (seconds) roughly model fixed per-call cost vs per-record cost.
+    def __init__(self, dimension=384, call_overhead=0.0, per_text_cost=0.0):
+        self.dimension = dimension
+        self.call_overhead = call_overhead
+        self.per_text_cost = per_text_cost
+        self.encode_calls = 0
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        self.encode_calls += 1
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        if self.call_overhead or self.per_text_cost:
+            time.sleep(self.call_overhead + self.per_text_cost * len(texts))
+        vectors = np.stack([np.random.default_rng(abs(hash(text)) % (2 ** 32)).standard_normal(self.dimension)
+                            for text in texts]).astype(np.float32)
+        return vectors[0] if single else vectors
+
+
+class FakeChatClient:
+    # Stand-in for the OpenAI client's streaming chat completions. The first chunk arrives
+    # after `first_token_latency` seconds, then one word every `token_latency` seconds.
+    def __init__(self, first_token_latency=0.0, token_latency=0.0, words=60):
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.words = words
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, stream=False, **kwargs):
+        self.calls += 1
+        words = (messages[-1]['content'].split() * self.words)[:self.words]
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=' '.join(words)))])
+        return self._stream(words)
+
+    def _stream(self, words):
+        time.sleep(self.first_token_latency)
+        for i, word in enumerate(words):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + ' '))])
+
+
+# In-memory stand-in for a Pinecone index. Implements the subset of the Index API the
+# upsert script and the app use, and counts calls so the checks can assert on network traffic.
+# `latency` adds a fixed delay to every call to stand in for the network round trip.
+
+class InMemoryIndex:
+    def __init__(self, dimension=384, latency=0.0):
+        self.dimension = dimension
+        self.latency = latency
+        self.vectors = {}
+        self.upsert_calls = 0
+        self.delete_calls = 0
+        self.query_calls = 0
+        self.fetch_calls = 0
+
+    def upsert(self, vectors):
+        self.upsert_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        for vector_id, values, metadata in vectors:
+            self.vectors[vector_id] = (np.asarray(values, dtype=np.float32), metadata)
+        return {'upserted_count': len(vectors)}
+
+    def delete(self, ids):
+        self.delete_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        for vector_id in ids:
+            self.vectors.pop(vector_id, None)
+        return {}
+
+    def query(self, vector, top_k=10, include_metadata=False, filter=None):
+        self.query_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        query = np.asarray(vector, dtype=np.float32)
+        query_norm = np.linalg.norm(query) or 1.0
+        scored = []
+        for vector_id, (values, metadata) in self.vectors.items():
+            if filter and not matches_filter(metadata, filter):
+                continue
+            score = float(values @ query / ((np.linalg.norm(values) or 1.0) * query_norm))
+            scored.append((score, vector_id, metadata))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        matches = []
+        for score, vector_id, metadata in scored[:top_k]:
+            match = {'id': vector_id, 'score': score}
+            if include_metadata:
+                match['metadata'] = metadata
+            matches.append(match)
+        return {'matches': matches}
+
+    def fetch(self, ids):
+        self.fetch_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return {'vectors': {vector_id: {'id': vector_id, 'metadata': self.vectors[vector_id][1]}
+                            for vector_id in ids if vector_id in self.vectors}}
+
+    def describe_index_stats(self):
+        return {'dimension': self.dimension, 'total_vector_count': len(self.vectors)}
+
+    def save(self):
+        pass
@@ -0,0 +1,212 @@
+import csv
+import html
+import os
+import re
+import shutil
+from urllib.parse import quote, urlencode
+
+# Offline stand-ins for wiki pages, rebuilt from the scraped per-character CSVs.
+# The markup mirrors the parts of a Fandom article the scraper looks at: infobox
+# and table-of-contents <h2> tags, then one <h2> per article section.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHARACTER_DATA_DIR = os.path.join(ROOT, 'data', 'character_data')
+
+def load_character_sections(csv_path):
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    header = rows[0]
+    values = rows[1] if len(rows) > 1 else [''] * len(header)
+    return dict(zip(header, values))
+
+def _heading(title):
+    # Article sections carry an empty edit link, which is where the trailing "[]" comes from
+    if title.endswith('[]'):
+        name = html.escape(title[:-2])
+        return (f'<h2><span class="mw-headline" id="{name}">{name}</span>'
+                f'<span class="mw-editsection"><span class="mw-editsection-bracket">[</span>'
+                f'<a href="?action=edit"></a><span class="mw-editsection-bracket">]</span></span></h2>')
+    return f'<h2><span class="mw-headline">{html.escape(title)}</span></h2>'
+
+def render_character_page(sections):
+    titles = list(sections)
+    toc_at = titles.index('Contents') if 'Contents' in titles else 0
+    infobox, body = titles[:toc_at], titles[toc_at + 1:]
+
+    parts = ['<!DOCTYPE html><html><head><title>Fixture</title></head><body>',
+             '<main class="page__main"><div id="content"><div class="mw-parser-output">']
+    if infobox:
+        parts.append('<aside class="portable-infobox">')
+        for title in infobox:
+            parts.append(f'<h2 class="pi-item pi-title">{html.escape(title)}</h2>')
+            parts.append('<div class="pi-data-value">Infobox field</div>')
+        parts.append('</aside>')
+    if 'Contents' in titles:
+        parts.append('<div id="toc" class="toc"><div class="toctitle"><h2>Contents</h2></div><ul>')
+        for title in body:
+            parts.append(f'<li><a href="#">{html.escape(title)}</a></li>')
+        parts.append('</ul></div>')
+    for title in body:
+        parts.append(_heading(title))
+        text = sections[title]
+        if not text:
+            continue
+        # Split long sections into a few paragraphs plus a list, like real articles
+        sentences = text.split('. ')
+        half = max(1, len(sentences) // 2)
+        parts.append(f'<p>{html.escape(". ".join(sentences[:half]))}</p>')
+        parts.append('<figure class="thumb"><img src="x.png"><figcaption>Caption</figcaption></figure>')
+        if sentences[half:]:
+            parts.append('<ul>' + ''.join(f'<li>{html.escape(s)}</li>' for s in sentences[half:]) + '</ul>')
+    parts.append('</div></div></main></body></html>')
+    return '\n'.join(parts)
+
+def character_pages(directory=CHARACTER_DATA_DIR):
+    # Map wiki page titles (the last URL path segment) to rendered HTML
+    pages = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.csv'):
+            sections = load_character_sections(os.path.join(directory, filename))
+            pages[filename[:-len('.csv')]] = render_character_page(sections)
+    return pages
+
+# Characters frozen into benchmarks/data/html for parity checks and parser benchmarks
+SAMPLE_CHARACTERS = [
+    'Aaron_(TV_Series)', 'Abraham_Ford_(TV_Series)', 'Carol_Peletier_(TV_Universe)',
+    'Daryl_Dixon_(TV_Universe)', 'Glenn_Rhee_(TV_Series)', 'Negan_Smith_(TV_Universe)',
+    'Rick_Grimes_(TV_Universe)', 'Characters',
+]
+SAMPLE_HTML_DIR = os.path.join(ROOT, 'benchmarks', 'data', 'html')
+
+# Frozen inputs for benchmarks/run_suite.py: a character listing page linking to the
+# sample pages above, and the sample characters' final JSON
+SUITE_DIR = os.path.join(ROOT, 'benchmarks', 'data', 'suite')
+LISTING_TITLE = 'TV_Series_Characters'
+
+def render_listing_page(rows):
+    # The listing is a table with one <td> per character: a link and a thumbnail
+    parts = ['<!DOCTYPE html><html><head><title>Fixture</title></head><body><table><tr>']
+    for row in rows:
+        title = row['url'].rsplit('/wiki/', 1)[-1]
+        parts.append(f'<td><a href="/wiki/{html.escape(title)}" title="{html.escape(row["name"])}">'
+                     f'<img data-src="{html.escape(row["image_url"])}" src="data:,"></a></td>')
+    parts.append('</tr></table></body></html>')
+    return '\n'.join(parts)
+
+# Category pages in the Fandom layout, for the frontier crawler (src/frontier.py): site
+# chrome full of links the crawler must ignore, subcategories and characters as
+# category-page__member-link anchors, and a "Next page" link to ?from=<first title of
+# the next page> when a category has more members than fit on one page
+CRAWL_HTML_DIR = os.path.join(ROOT, 'benchmarks', 'data', 'crawl')
+ROOT_CATEGORY = 'Category:Characters'
+CATEGORY_PAGE_SIZE = 200
+
+CHROME = ''.join(f'<li><a href="/wiki/{target}" title="{target}">{target}</a></li>' for target in [
+    'Main_Page', 'Special:Random', 'Special:RecentChanges', 'File:Logo.png', 'Template:Characters',
+    'User:Admin', 'Help:Contents', 'Category:TV_Series', 'Category:Browse', 'The_Walking_Dead_(TV_Series)',
+    'Fear_The_Walking_Dead', 'Comic_Series', 'Video_Game', 'Novel_Series', 'Webisodes', 'Locations',
+    'Episodes', 'Deaths', 'Community', 'Forum:Index'] * 8)
+
+def category_page_key(title, start=None):
+    # The stub server's key for a category page; later pages are selected by ?from=
+    return title if start is None else f"{title}?{urlencode({'from': start})}"
+
+def render_category_page(title, members, subcategories=(), next_from=None):
+    # `members` are (href, name, image_url); `subcategories` are category titles
+    parts = ['<!DOCTYPE html><html><head><title>Fixture</title></head><body>',
+             f'<nav class="global-navigation"><ul>{CHROME}</ul></nav>',
+             f'<main class="page__main"><h1>{html.escape(title)}</h1><div class="category-page__members">',
+             '<ul class="category-page__members-for-char">']
+    for subcategory in subcategories:
+        parts.append(f'<li class="category-page__member"><a href="/wiki/{quote(subcategory, safe=":()")}" '
+                     f'class="category-page__member-link" title="{html.escape(subcategory)}">{html.escape(subcategory)}</a></li>')
+    for href, name, image_url in members:
+        parts.append(f'<li class="category-page__member"><div class="category-page__member-left">'
+                     f'<img src="data:," data-src="{html.escape(image_url)}" class="category-page__member-thumbnail"></div>'
+                     f'<a href="{html.escape(href)}" class="category-page__member-link" title="{html.escape(name)}">{html.escape(name)}</a></li>')
+    parts.append('</ul></div>')
+    if next_from is not None:
+        parts.append(f'<div class="category-page__pagination"><a href="/wiki/{quote(title, safe=":()")}?{urlencode({"from": next_from})}" '
+                     'class="category-page__pagination-next wds-button">Next page</a></div>')
+    parts.append(f'<footer><ul>{CHROME}</ul></footer></main></body></html>')
+    return '\n'.join(parts)
+
+def category_site(titles, images=None, page_size=CATEGORY_PAGE_SIZE):
+    # Pages for a category tree over the given character titles: Category:Characters holds
+    # one subcategory per title suffix ("(TV_Series)", "(TV_Universe)", ...) and also lists
+    # some characters directly, through other URL forms for the same page, so the crawler
+    # has duplicates to drop. Returns {stub server key: HTML}.
+    images = images or {}
+    groups = {}
+    for title in sorted(titles):
+        match = re.search(r'\(([^)]*)\)$', title)
+        groups.setdefault(f"Category:{match.group(1) if match else 'Other'}_Characters", []).append(title)
+
+    pages = {}
+    for category, members in groups.items():
+        for start in range(0, len(members), page_size):
+            chunk = members[start:start + page_size]
+            following = members[start + page_size] if start + page_size < len(members) else None
+            rows = [(f'/wiki/{title}', title.replace('_', ' '), images.get(title, 'data:,')) for title in chunk]
+            pages[category_page_key(category, chunk[0] if start else None)] = render_category_page(category, rows, next_from=following)
+
+    variants = ['/wiki/{}', '/wiki/{}#Appearance', '/index.php?title={}', '/wiki/{}?action=history']
+    direct = [(variants[i % len(variants)].format(title.replace('(', '%28').replace(')', '%29')), title.replace('_', ' '),
+               images.get(title, 'data:,')) for i, title in enumerate(sorted(titles)[:40])]
+    pages[ROOT_CATEGORY] = render_category_page(ROOT_CATEGORY, direct, subcategories=sorted(groups))
+    return pages
+
+def listing_rows():
+    with open(os.path.join(ROOT, 'data', 'character_data_with_images.csv'), newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+def crawl_site():
+    # The wiki as the frontier crawler sees it: the TV series listing, the category tree
+    # over every character page and the character pages themselves
+    rows = listing_rows()
+    titles = sorted(filename[:-len('.csv')] for filename in os.listdir(CHARACTER_DATA_DIR) if filename.endswith('.csv'))
+    images = {row['url'].rsplit('/wiki/', 1)[-1]: row['image_url'] for row in rows}
+    pages = category_site(titles, images)
+    pages[LISTING_TITLE] = render_listing_page(rows)
+    return pages
+
+def write_crawl_fixtures():
+    # Frozen navigation pages for benchmarks/bench_link_extraction.py
+    os.makedirs(CRAWL_HTML_DIR, exist_ok=True)
+    pages = crawl_site()
+    for key in (ROOT_CATEGORY, 'Category:TV_Series_Characters', LISTING_TITLE):
+        with open(os.path.join(CRAWL_HTML_DIR, f"{key.replace(':', '_')}.html"), 'w', encoding='utf-8') as f:
+            f.write(pages[key])
+
+def suite_listing_rows():
+    titles = set(SAMPLE_CHARACTERS) - {'Characters'}
+    return [row for row in listing_rows() if row['url'].rsplit('/wiki/', 1)[-1] in titles]
+
+def write_suite_fixtures():
+    os.makedirs(os.path.join(SUITE_DIR, 'json'), exist_ok=True)
+    with open(os.path.join(SUITE_DIR, f'{LISTING_TITLE}.html'), 'w', encoding='utf-8') as f:
+        f.write(render_listing_page(suite_listing_rows()))
+    for title in SAMPLE_CHARACTERS:
+        json_path = os.path.join(ROOT, 'data', 'character_jsons', f'{title}.json')
+        if os.path.exists(json_path):
+            shutil.copyfile(json_path, os.path.join(SUITE_DIR, 'json', f'{title}.json'))
+
+def load_sample_pages(directory=SAMPLE_HTML_DIR):
+    pages = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.html'):
+            with open(os.path.join(directory, filename), 'rb') as f:
+                pages[filename[:-len('.html')]] = f.read()
+    return pages
+
+if __name__ == '__main__':
+    os.makedirs(SAMPLE_HTML_DIR, exist_ok=True)
+    for title in SAMPLE_CHARACTERS:
+        sections = load_character_sections(os.path.join(CHARACTER_DATA_DIR, f'{title}.csv'))
+        with open(os.path.join(SAMPLE_HTML_DIR, f'{title}.html'), 'w', encoding='utf-8') as f:
+            f.write(render_character_page(sections))
+    print(f"Wrote {len(SAMPLE_CHARACTERS)} fixture pages to {SAMPLE_HTML_DIR}")
+    write_suite_fixtures()
+    print(f"Wrote the benchmark suite's listing page and JSON to {SUITE_DIR}")
+    write_crawl_fixtures()
+    print(f"Wrote the crawler's listing and category pages to {CRAWL_HTML_DIR}")
@@ -0,0 +1,372 @@
+import argparse
+import contextlib
+import cProfile
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from fetcher import Fetcher
+from scrape_characters import parse_character_links
+from clean_data import clean_character_data
+from scrape_character_pages import fetch_character_pages, save_character_page
+from clean_csv_files import clean_all_csv_files
+from csv_to_json import convert_all_csv_to_json
+from remove_keys import DEFAULT_KEYS_TO_REMOVE, remove_keys_from_json
+from update_name_kv import update_json_files
+from delete_first_kv import remove_first_kv_pair
+from corpus import Corpus, build_corpus
+from keyword_index import KeywordIndex
+from upsert import build_records, plan_sync, sync_index
+from embeddings import embedding_backend, load_model as load_embedding_model
+from vector_store import LocalVectorStore
+from retrieval import ANSWER_MODEL, build_prompt, chat_messages, retrieve
+from fakes import CountingModel, FakeChatClient
+from fixtures import LISTING_TITLE, SUITE_DIR, load_sample_pages, render_listing_page
+from stub_server import start_stub_server
+
+# End-to-end benchmark of the README steps and the app's query path on the frozen sample
+# in benchmarks/data (character pages in html/, listing page and final JSON in suite/),
+# with the wiki, the embedding model and the chat API replaced by local stand-ins.
+#
+# Steps 1-8 run on the sample HTML served by the stub wiki; steps 9-11 and the query
+# path run on the sample JSON, so parser changes don't move their numbers. --scale
+# copies the sample under new names to make the corpus bigger.
+#
+# Per stage: wall time, peak RSS and records/s. Query path: p50/p99 of embed, search
+# (vector + BM25 + corpus lookup, as in the app with its caches cold), and answer (time
+# to first token and total). Results go to a JSON file; --compare flags stages that got
+# slower than an earlier result file.
+
+QUERIES = ['Negan Lucille', 'Terminus', 'Hershel farm', 'Glenn Rhee', 'who leads the Saviors',
+           'Daryl crossbow', 'Carol Sophia', 'Rick sheriff deputy coma', 'Abraham Washington', 'Aaron recruiter']
+
+
+def current_rss():
+    # Resident set size in bytes (Linux); elsewhere the process-wide peak from getrusage
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class RssSampler:
+    # Samples RSS on a background thread so a stage's peak is caught, not just its end
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = current_rss()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+@contextlib.contextmanager
+def profiled(name, profiler, profile_dir):
+    if profiler is None:
+        yield
+        return
+    os.makedirs(profile_dir, exist_ok=True)
+    name = name.replace(' ', '_')
+    if profiler == 'cprofile':
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(os.path.join(profile_dir, f'{name}.prof'))
+    else:
+        from pyinstrument import Profiler
+
+        profile = Profiler()
+        profile.start()
+        try:
+            yield
+        finally:
+            profile.stop()
+            with open(os.path.join(profile_dir, f'{name}.html'), 'w', encoding='utf-8') as f:
+                f.write(profile.output_html())
+
+def run_stage(results, name, function, args):
+    start_rss = current_rss()
+    with RssSampler() as sampler, profiled(name, args.profile, args.profile_dir):
+        start = time.perf_counter()
+        # The scripts print a line per file; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            records = function()
+        elapsed = time.perf_counter() - start
+    result = {
+        'stage': name,
+        'wall_s': elapsed,
+        'peak_rss_mb': sampler.peak / 1e6,
+        'rss_growth_mb': (sampler.peak - start_rss) / 1e6,
+        'records': records,
+        'records_per_s': records / elapsed if elapsed else 0.0,
+    }
+    results.append(result)
+    print(f"{name:<14} {elapsed:8.3f}s  {result['records_per_s']:9.1f} records/s  "
+          f"peak RSS {result['peak_rss_mb']:7.1f} MB (+{result['rss_growth_mb']:.1f})  [{records} records]")
+
+
+# Frozen sample, copied --scale times under suffixed titles and names
+
+def scaled_pages(scale):
+    pages = {title: body.decode('utf-8') for title, body in load_sample_pages().items()
+             if title not in ('Characters', 'Edge_cases')}
+    return {(title if k == 0 else f'{title}_{k}'): body for k in range(scale) for title, body in pages.items()}
+
+def scaled_listing(scale):
+    with open(os.path.join(SUITE_DIR, f'{LISTING_TITLE}.html'), 'rb') as f:
+        rows = parse_character_links(f.read(), base_url='')
+    return render_listing_page([
+        {'name': row['name'] if k == 0 else f"{row['name']} {k}",
+         'url': row['url'] if k == 0 else f"{row['url']}_{k}",
+         'image_url': row['image_url']}
+        for k in range(scale) for row in rows])
+
+def write_scaled_json(directory, scale):
+    os.makedirs(directory, exist_ok=True)
+    json_directory = os.path.join(SUITE_DIR, 'json')
+    for filename in sorted(os.listdir(json_directory)):
+        with open(os.path.join(json_directory, filename), 'r', encoding='utf-8') as f:
+            characters = json.load(f)
+        for k in range(scale):
+            copies = [dict(c, Name=c.get('Name', filename) if k == 0 else f"{c.get('Name', filename)} {k}")
+                      for c in characters]
+            name = filename if k == 0 else filename.replace('.json', f'_{k}.json')
+            with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+                json.dump(copies, f, ensure_ascii=False, indent=4)
+
+
+def load_model(name):
+    if name == 'fake':
+        return CountingModel()
+    # The real model runs on the configured EMBEDDING_BACKEND
+    return load_embedding_model()
+
+def run_pipeline_stages(results, args, server, model):
+    listing_url = f"{server.base_url}/wiki/{LISTING_TITLE}"
+    os.makedirs('data/character_data', exist_ok=True)
+
+    def listing():
+        fetcher = Fetcher(max_workers=1, rate_per_host=0)
+        links = parse_character_links(fetcher.get(listing_url).content, base_url=server.base_url)
+        fetcher.close()
+        pd.DataFrame(links).to_csv('data/character_data_with_images.csv', index=False)
+        return len(links)
+
+    def clean_listing():
+        df = clean_character_data(pd.read_csv('data/character_data_with_images.csv'))
+        df.to_csv('data/cleaned_character_data.csv', index=False)
+        return len(df)
+
+    def scrape_pages():
+        fetcher = Fetcher(max_workers=args.fetch_workers, rate_per_host=0)
+        pages = 0
+        for name, _, response in fetch_character_pages(pd.read_csv('data/cleaned_character_data.csv'), fetcher):
+            save_character_page(name, response)
+            pages += 1
+        fetcher.close()
+        return pages
+
+    stages = [
+        ('1 listing', listing),
+        ('2 clean_data', clean_listing),
+        ('3 scrape', scrape_pages),
+        ('4 clean_csv', lambda: clean_all_csv_files('data/character_data', args.workers).records),
+        ('5 csv_to_json', lambda: convert_all_csv_to_json('data/character_data', 'data/character_jsons', args.workers).records),
+        ('6 remove_keys', lambda: remove_keys_from_json('data/character_jsons', DEFAULT_KEYS_TO_REMOVE, args.workers).records),
+        ('7 update_name', lambda: update_json_files('data/character_jsons', args.workers).records),
+        ('8 delete_first', lambda: remove_first_kv_pair('data/character_jsons', args.workers).records),
+    ]
+
+    # Steps 9-11 start again from the frozen JSON
+    write_scaled_json('sample_jsons', args.scale)
+
+    def keyword_index():
+        index = KeywordIndex('data/keyword_index')
+        index.update(Corpus('data/corpus'))
+        index.save()
+        return len(index.documents)
+
+    def upsert():
+        store = LocalVectorStore('data/vector_store')
+        records = build_records(Corpus('data/corpus').characters())
+        hashes, to_upsert, to_delete = plan_sync(records, {})
+        sync_index(store, model, records, {}, hashes, to_upsert, to_delete)
+        store.save()
+        return len(records)
+
+    stages += [
+        ('9 corpus', lambda: build_corpus('sample_jsons', 'data/corpus')),
+        ('10 keywords', keyword_index),
+        ('11 upsert', upsert),
+    ]
+    for name, function in stages:
+        if args.stages and name.split()[1] not in args.stages:
+            continue
+        run_stage(results, name, function, args)
+
+def percentiles(samples):
+    return {'p50_ms': float(np.percentile(samples, 50) * 1000), 'p99_ms': float(np.percentile(samples, 99) * 1000),
+            'n': len(samples)}
+
+def run_query_path(args, model):
+    store = LocalVectorStore('data/vector_store')
+    keyword_index = KeywordIndex('data/keyword_index')
+    corpus = Corpus('data/corpus')
+    client = FakeChatClient(args.answer_latency, args.token_latency)
+    timings = {'embed': [], 'search': [], 'answer_first_token': [], 'answer_total': []}
+
+    with profiled('query', args.profile, args.profile_dir):
+        for i in range(args.queries):
+            query = QUERIES[i % len(QUERIES)]
+            start = time.perf_counter()
+            vector = model.encode(query).tolist()
+            timings['embed'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            results = retrieve(store, vector, top_k=5, keyword_index=keyword_index, query=query, corpus=corpus)
+            timings['search'].append(time.perf_counter() - start)
+
+            prompt, _ = build_prompt(query, results)
+            start = time.perf_counter()
+            stream = client.chat.completions.create(model=ANSWER_MODEL, messages=chat_messages(prompt),
+                                                    max_tokens=200, stream=True)
+            first = None
+            for chunk in stream:
+                if first is None and chunk.choices[0].delta.content:
+                    first = time.perf_counter() - start
+            timings['answer_first_token'].append(first or 0.0)
+            timings['answer_total'].append(time.perf_counter() - start)
+
+    query_results = {name: percentiles(samples) for name, samples in timings.items()}
+    for name, result in query_results.items():
+        print(f"query {name:<19} p50 {result['p50_ms']:8.3f} ms   p99 {result['p99_ms']:8.3f} ms")
+    return query_results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+# Function to print how this run compares with an earlier result file; returns the
+# number of stages or query timings that got slower by more than `threshold`
+def compare(previous_path, current, threshold):
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    rows = []
+    before = {stage['stage']: stage['wall_s'] for stage in previous.get('stages', [])}
+    for stage in current['stages']:
+        if stage['stage'] in before:
+            rows.append((stage['stage'], before[stage['stage']], stage['wall_s']))
+    for name, result in current.get('query', {}).items():
+        if name in previous.get('query', {}):
+            rows.append((f'query {name}', previous['query'][name]['p50_ms'] / 1000, result['p50_ms'] / 1000))
+
+    regressions = 0
+    print(f"\nCompared with {previous_path} (commit {str(previous.get('git_commit'))[:10]}):")
+    if previous.get('settings') != current['settings']:
+        print("  (settings differ between the two runs, so the numbers are not like for like)")
+    for name, old, new in rows:
+        ratio = new / old if old else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"  {name:<26} {old * 1000:10.3f} ms -> {new * 1000:10.3f} ms  ({ratio:5.2f}x){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every pipeline stage and the query path on the frozen sample.')
+    parser.add_argument('--scale', type=int, default=20, help='Copies of the sample (7 characters each)')
+    parser.add_argument('--workers', type=int, default=1, help='Process pool size for steps 4-8')
+    parser.add_argument('--fetch-workers', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.0, help='Simulated wiki round trip in seconds')
+    parser.add_argument('--model', choices=['fake', 'real'], default='fake',
+                        help='fake: deterministic random vectors; real: sentence-transformers')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--answer-latency', type=float, default=0.0, help='Simulated time to first answer token')
+    parser.add_argument('--token-latency', type=float, default=0.0, help='Simulated time between answer tokens')
+    parser.add_argument('--stages', nargs='+', help='Only run these stages (e.g. scrape upsert); later stages need earlier output')
+    parser.add_argument('--profile', choices=['cprofile', 'pyinstrument'], help='Write a profile per stage')
+    parser.add_argument('--profile-dir', default=os.path.join(ROOT, 'bench_profiles'))
+    parser.add_argument('--output', default=os.path.join(ROOT, 'bench_results.json'))
+    parser.add_argument('--compare', help='Earlier result file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Slowdown ratio above which --compare flags a regression')
+    args = parser.parse_args()
+    if args.profile == 'pyinstrument':
+        try:
+            import pyinstrument  # noqa: F401
+        except ImportError:
+            parser.error('pyinstrument is not installed (pip install pyinstrument)')
+    args.profile_dir = os.path.abspath(args.profile_dir)
+    args.output = os.path.abspath(args.output)
+
+    model = load_model(args.model)
+    server = start_stub_server(latency=args.latency, pages=dict(scaled_pages(args.scale), **{LISTING_TITLE: scaled_listing(args.scale)}))
+    stages = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        # The scripts use paths relative to the repository root; run them in a scratch copy
+        os.chdir(directory)
+        try:
+            run_pipeline_stages(stages, args, server, model)
+            query = run_query_path(args, model) if not args.stages else {}
+        finally:
+            os.chdir(cwd)
+            server.stop()
+
+    settings = {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'profile_dir')}
+    if args.model == 'real':
+        settings['embedding_backend'] = embedding_backend()
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'settings': settings,
+        'stages': stages,
+        'query': query,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {args.output}")
+    if args.profile:
+        print(f"Profiles in {args.profile_dir}")
+
+    if args.compare:
+        regressions = compare(args.compare, results, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
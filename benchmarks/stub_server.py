@@ -0,0 +1,105 @@
+import hashlib
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+
+from fixtures import character_pages
+
+# Local HTTP stand-in for walkingdead.fandom.com. Serves rendered fixture pages under
+# /wiki/<title> with an optional artificial delay to simulate the round trip to the wiki.
+# A page with a query string (category pagination) is stored as "<title>?<sorted query>".
+# Like the real wiki it sends an ETag and answers matching conditional requests with 304.
+
+class StubWikiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, pages, latency=0.0, port=0):
+        self.pages = {title: body.encode('utf-8') for title, body in pages.items()}
+        self.etags = {title: '"%s"' % hashlib.sha1(body).hexdigest() for title, body in self.pages.items()}
+        self.latency = latency
+        self.request_count = 0
+        self.count_lock = threading.Lock()
+        super().__init__(('127.0.0.1', port), StubWikiHandler)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def handle_error(self, request, client_address):
+        # Clients that time out or get killed mid-response are expected, not errors
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubWikiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with server.count_lock:
+            server.request_count += 1
+        if server.latency:
+            time.sleep(server.latency)
+
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)
+        title = path[len('/wiki/'):] if path.startswith('/wiki/') else None
+        if title is not None and parts.query:
+            title = f"{title}?{urlencode(sorted(parse_qsl(parts.query)))}"
+        body = server.pages.get(title)
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        etag = server.etags[title]
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(latency=0.0, port=0, pages=None):
+    return StubWikiServer(pages if pages is not None else character_pages(), latency=latency, port=port).start()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve fixture character pages on localhost.')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to sleep before each response')
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency, port=args.port)
+    print(f"Serving {len(server.pages)} pages at {server.base_url}/wiki/<title>")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
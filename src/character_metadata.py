@@ -0,0 +1,79 @@
+import re
+
+# Structured, filterable fields derived from a character's JSON sections. They are stored
+# as vector metadata so trait/status/affiliation filters run inside the index instead of
+# on the app side after the query.
+
+# Free-text sections of a character, embedded by upsert.py and keyword-indexed by keyword_index.py
+TEXT_FIELDS = ['Overview[]', 'Pre-Apocalypse[]', 'Post-Apocalypse[]', 'Death[]', 'Killed Victims[]', 'Appearances[]', 'Trivia[]']
+
+# Groups and communities from the TV series, as written on the wiki
+AFFILIATIONS = ['Alexandria', 'Hilltop', 'Kingdom', 'Saviors', 'Whisperers', 'Terminus', 'Woodbury',
+                'Oceanside', 'Commonwealth', 'Sanctuary', 'Highwaymen', 'Scavengers', 'Wolves',
+                'Claimers', 'Civic Republic', 'Grady Memorial Hospital', 'Prison']
+
+# Words too common to be useful as traits
+STOPWORDS = {
+    'the', 'and', 'was', 'for', 'his', 'her', 'him', 'she', 'they', 'them', 'their', 'with', 'that',
+    'this', 'from', 'had', 'has', 'have', 'but', 'not', 'who', 'after', 'also', 'into', 'when', 'which',
+    'were', 'are', 'been', 'being', 'its', 'out', 'one', 'would', 'there', 'about', 'more', 'some',
+    'other', 'then', 'than', 'what', 'while', 'very', 'most', 'only', 'even', 'such', 'over',
+}
+
+# Words; hyphenated words are split, so "co-leader" also gives "leader"
+TERM_PATTERN = re.compile(r"[a-z][a-z']+")
+AFFILIATION_PATTERNS = [(name.lower(), re.compile(r'\b' + re.escape(name) + r'\b')) for name in AFFILIATIONS]
+
+# Function to reduce a word to a light stem: no possessive, plurals as the singular and
+# "-ship" dropped ("soldier's", "soldiers" -> "soldier", "allies" -> "ally", "leadership" -> "leader")
+def stem(term):
+    if term.endswith("'s"):
+        term = term[:-2]
+    term = term.strip("'")
+    if len(term) > 4 and term.endswith('ies'):
+        term = term[:-3] + 'y'
+    elif term.endswith(('sses', 'xes', 'zes', 'ches', 'shes')):
+        term = term[:-2]
+    elif term.endswith('s') and not term.endswith(('ss', 'us', 'is')):
+        term = term[:-1]
+    if len(term) >= 7 and term.endswith('ship'):
+        term = term[:-4]
+    return term
+
+# Function to split text into lower-case trait terms (both when indexing and querying)
+def trait_terms(text):
+    terms = []
+    for word in TERM_PATTERN.findall((text or '').lower()):
+        if word.strip("'") in STOPWORDS:
+            continue
+        term = stem(word)
+        if len(term) >= 3 and term not in STOPWORDS and term not in terms:
+            terms.append(term)
+    return terms
+
+def character_status(character):
+    # Characters who have died have a Death section
+    return 'deceased' if character.get('Death[]') else 'alive'
+
+def character_affiliations(character):
+    text = ' '.join([character.get('Overview[]', ''), character.get('Post-Apocalypse[]', '')])
+    return [name for name, pattern in AFFILIATION_PATTERNS if pattern.search(text)]
+
+# Function to build the filterable metadata fields for one character
+def filter_fields(character):
+    return {
+        'status': character_status(character),
+        'affiliations': character_affiliations(character),
+        'traits': trait_terms(character.get('Overview[]', '')),
+    }
+
+# Function to build a Pinecone-style metadata filter; None when nothing is filtered
+def build_filter(trait=None, status=None, affiliation=None):
+    clauses = [{'traits': {'$in': [term]}} for term in trait_terms(trait)]
+    if status:
+        clauses.append({'status': {'$eq': status.lower()}})
+    if affiliation:
+        clauses.append({'affiliations': {'$in': [affiliation.lower()]}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {'$and': clauses}
@@ -1,29 +1,31 @@
-import os
-import pandas as pd
+import argparse
+from file_runner import atomic_open, run_directory
+from normalize import clean_csv_text, normalize_whitespace
 
-def clean_csv_file(file_path):
-    try:
-        # Read the CSV file
-        df = pd.read_csv(file_path, keep_default_na=False)
-
-        # Clean each cell by removing extra newlines
-        for column in df.columns:
-            df[column] = df[column].apply(lambda x: ' '.join(str(x).split()))
+# Pipeline stage: the same cleaning as clean_csv_file, applied to an in-memory row
+def clean_record(record):
+    return {key: normalize_whitespace(value) for key, value in record.items()}
 
-        # Save the cleaned CSV back to the file
-        df.to_csv(file_path, index=False)
-        print(f"Cleaned {file_path}")
+def clean_csv_file(file_path):
+    # Clean each cell by removing extra newlines (csv module for small files, pandas for large)
+    text, rows = clean_csv_text(file_path)
 
-    except Exception as e:
-        print(f"Error cleaning {file_path}: {e}")
+    # Save the cleaned CSV back to the file
+    with atomic_open(file_path, newline='') as f:
+        f.write(text)
+    return rows
 
-def clean_all_csv_files(directory):
-    for filename in os.listdir(directory):
-        if filename.endswith('.csv'):
-            file_path = os.path.join(directory, filename)
-            clean_csv_file(file_path)
+def clean_all_csv_files(directory, workers=None):
+    report = run_directory(directory, '.csv', clean_csv_file, workers, label='Cleaned CSV files')
+    print(report.summary())
+    return report
 
-# Specify the directory containing the CSV files
-csv_directory = 'data/character_data'
-clean_all_csv_files(csv_directory)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Collapse whitespace in every cell of the character CSVs, in place.')
+    parser.add_argument('--directory', default='data/character_data', help='Directory of CSV files')
+    parser.add_argument('--workers', type=int, help='Worker processes (default ETL_WORKERS or the CPU count)')
+    args = parser.parse_args(argv)
+    clean_all_csv_files(args.directory, args.workers)
 
+if __name__ == '__main__':
+    main()
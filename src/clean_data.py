@@ -1,45 +1,55 @@
-import pandas as pd
+import argparse
+from normalize import normalize_urls
 
-# Load the scraped data from the CSV file in the 'data' directory (one level up)
-df = pd.read_csv('./data/character_data_with_images.csv')
+# Function to clean the scraped character listing (names, missing values, URLs)
+def clean_character_data(df):
+    # 1. Clean Character Names
+    # Remove any extra spaces or newline characters from the character names
+    df['name'] = df['name'].str.strip()
 
-# Print initial data
-print("Initial Data:")
-print(df.head())
+    # 2. Handle Missing or Empty Values
+    # Optionally, drop rows with missing 'name' or 'url' since they are essential
+    df.dropna(subset=['name', 'url'], inplace=True)
 
-# Step 2: Clean the data
+    # If the image URL is missing, set it to a placeholder or mark it for later
+    df['image_url'] = df['image_url'].fillna('https://example.com/placeholder.png')
 
-# 1. Clean Character Names
-# Remove any extra spaces or newline characters from the character names
-df['name'] = df['name'].str.strip()
+    # 3. Validate and Clean URLs
+    # Ensure URLs are well-formed (start with 'http' or 'https'), a whole column at a time
+    df['url'] = normalize_urls(df['url'])
+    df['image_url'] = normalize_urls(df['image_url'])
+    return df
 
-# 2. Handle Missing or Empty Values
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Clean the scraped character listing.')
+    parser.add_argument('--input', default='./data/character_data_with_images.csv', help='Listing CSV from scrape_characters.py')
+    parser.add_argument('--output', default='./data/cleaned_character_data.csv', help='Where to write the cleaned CSV')
+    args = parser.parse_args(argv)
 
-# Check for missing values in the 'name', 'url', and 'image_url' columns
-print("\nMissing values before cleaning:")
-print(df.isnull().sum())
+    import pandas as pd
 
-# Optionally, drop rows with missing 'name' or 'url' since they are essential
-df.dropna(subset=['name', 'url'], inplace=True)
+    # Load the scraped listing
+    df = pd.read_csv(args.input)
 
-# If the image URL is missing, set it to a placeholder or mark it for later
-df['image_url'].fillna('https://example.com/placeholder.png', inplace=True)
+    # Print initial data
+    print("Initial Data:")
+    print(df.head())
 
-# 3. Validate and Clean URLs
-# Ensure URLs are well-formed (start with 'http' or 'https')
-def validate_url(url):
-    if not url.startswith('http'):
-        return 'https://example.com/invalid-url'
-    return url
+    # Check for missing values in the 'name', 'url', and 'image_url' columns
+    print("\nMissing values before cleaning:")
+    print(df.isnull().sum())
 
-df['url'] = df['url'].apply(validate_url)
-df['image_url'] = df['image_url'].apply(validate_url)
+    # Step 2: Clean the data
+    df = clean_character_data(df)
 
-# Step 3: Save the cleaned data into the 'data' directory
-df.to_csv('./data/cleaned_character_data.csv', index=False)
+    # Step 3: Save the cleaned data into the 'data' directory
+    df.to_csv(args.output, index=False)
 
-# Print cleaned data
-print("\nCleaned Data:")
-print(df.head())
-print("\nMissing values after cleaning:")
-print(df.isnull().sum())
+    # Print cleaned data
+    print("\nCleaned Data:")
+    print(df.head())
+    print("\nMissing values after cleaning:")
+    print(df.isnull().sum())
+
+if __name__ == '__main__':
+    main()
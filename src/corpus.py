@@ -0,0 +1,180 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from file_runner import write_json_atomic
+
+# Consolidated character corpus: one JSON Lines file plus a byte-offset index, written
+# once by the last ETL stage and read by the keyword index, upsert.py and the app
+# instead of opening one small JSON file per character.
+#
+# On disk (data/corpus, CORPUS_DIR overrides):
+#   characters.jsonl  one line per character: {"file": <json file name>, "character": {...}}
+#   index.json        [{'id', 'file', 'offset', 'length', 'hash'}, ...], one per line; the
+#                     hash is of the line, so readers can tell which characters changed
+#
+# Lines are in JSON file name order. IDs are the ASCII vector IDs used by upsert.py; when
+# two files hold characters with the same ID, the later one wins (as in load_characters).
+# export_json writes the per-file layout of data/character_jsons back out.
+
+DATA_FILE = 'characters.jsonl'
+INDEX_FILE = 'index.json'
+
+def corpus_path():
+    return os.getenv('CORPUS_DIR', 'data/corpus')
+
+# Function to ensure ASCII IDs, matching the vector IDs written by upsert.py
+def to_ascii(text):
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+
+def character_id(character, filename):
+    return to_ascii(character.get('Name', filename))
+
+
+class CorpusWriter:
+    # Writes a new corpus next to the old one and swaps it in on close, so readers never
+    # see a half-written corpus
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, DATA_FILE)
+        self.file = open(self.data_path + '.tmp', 'wb')
+        self.entries = []
+        self.offset = 0
+
+    def add(self, filename, characters):
+        for character in characters:
+            line = json.dumps({'file': filename, 'character': character}, ensure_ascii=False).encode('utf-8') + b'\n'
+            self.file.write(line)
+            self.entries.append({
+                'id': character_id(character, filename),
+                'file': filename,
+                'offset': self.offset,
+                'length': len(line),
+                'hash': hashlib.sha256(line).hexdigest(),
+            })
+            self.offset += len(line)
+
+    def close(self):
+        self.file.close()
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(self.data_path + '.tmp', self.data_path)
+        os.replace(index_path + '.tmp', index_path)
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.data_path + '.tmp')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class Corpus:
+    def __init__(self, directory=None):
+        self.directory = directory or corpus_path()
+        self.data_path = os.path.join(self.directory, DATA_FILE)
+        with open(os.path.join(self.directory, INDEX_FILE), 'r', encoding='utf-8') as f:
+            self.entries = json.load(f)
+        self.positions = {entry['id']: entry for entry in self.entries}
+        self.file = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, character_id):
+        return character_id in self.positions
+
+    def ids(self):
+        return list(self.positions)
+
+    def read_entry(self, entry):
+        # One seek and read per lookup; the lock lets app sessions share one handle
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.data_path, 'rb')
+            self.file.seek(entry['offset'])
+            line = self.file.read(entry['length'])
+        return json.loads(line)['character']
+
+    # Function to look up one character by ID (None if it isn't in the corpus)
+    def get(self, character_id):
+        entry = self.positions.get(character_id)
+        return self.read_entry(entry) if entry is not None else None
+
+    def get_many(self, character_ids):
+        return {character_id: self.get(character_id) for character_id in character_ids if character_id in self}
+
+    # Function to stream (file name, character) pairs in file order, one line at a time
+    def __iter__(self):
+        with open(self.data_path, 'rb') as f:
+            for line in f:
+                record = json.loads(line)
+                yield record['file'], record['character']
+
+    def characters(self):
+        # Characters keyed by ID, like upsert.load_characters
+        return {character_id(character, filename): character for filename, character in self}
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def corpus_exists(directory=None):
+    return os.path.exists(os.path.join(directory or corpus_path(), INDEX_FILE))
+
+# Function to pack a directory of per-character JSON files into a corpus
+def build_corpus(json_directory, directory=None):
+    filenames = sorted(f for f in os.listdir(json_directory) if f.endswith('.json'))
+    with CorpusWriter(directory or corpus_path()) as writer:
+        for filename in filenames:
+            with open(os.path.join(json_directory, filename), 'r', encoding='utf-8') as f:
+                writer.add(filename, json.load(f))
+    return len(writer.entries)
+
+# Function to write the corpus back out as one JSON file per source file, in the same
+# format as the ETL scripts (indent=4)
+def export_json(corpus, json_directory):
+    os.makedirs(json_directory, exist_ok=True)
+    current, characters, files = None, [], 0
+    for filename, character in corpus:
+        if filename != current and current is not None:
+            write_json_atomic(characters, os.path.join(json_directory, current))
+            characters, files = [], files + 1
+        current = filename
+        characters.append(character)
+    if current is not None:
+        write_json_atomic(characters, os.path.join(json_directory, current))
+        files += 1
+    return files
+
+def main(argv=None):
+    # python src/corpus.py           pack data/character_jsons into the corpus
+    # python src/corpus.py export    write data/character_jsons from the corpus
+    parser = argparse.ArgumentParser(description='Pack the per-file character JSON into the corpus, or export it back.')
+    parser.add_argument('command', nargs='?', choices=['build', 'export'], default='build')
+    parser.add_argument('--json-dir', default='data/character_jsons', help='Per-file JSON directory')
+    parser.add_argument('--corpus-dir', default=None, help='Corpus directory (default CORPUS_DIR or data/corpus)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        files = export_json(Corpus(args.corpus_dir), args.json_dir)
+        print(f"Exported {files} JSON files to {args.json_dir}")
+    else:
+        count = build_corpus(args.json_dir, args.corpus_dir)
+        print(f"Wrote {count} characters to {args.corpus_dir or corpus_path()}")
+
+if __name__ == '__main__':
+    main()
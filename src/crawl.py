@@ -0,0 +1,96 @@
+import argparse
+import csv
+import os
+import re
+import threading
+from frontier import Frontier
+from page_cache import page_cache_from_env
+from scrape_characters import url as listing_url
+from scrape_character_pages import add_crawl_arguments, begin_crawl, fetch_pages, make_fetcher, save_character_page
+from file_runner import atomic_open
+import metrics
+
+# Frontier crawl: discovers character pages from several seed pages (character listings
+# and Category: pages, with their pagination and subcategories) and scrapes them with the
+# same page scraper and crawl journal as scrape_character_pages.py. Discovery runs on its
+# own thread and feeds the scraper through a bounded queue, so pages are scraped while
+# the categories are still being walked. Every discovered page is also written to the
+# listing CSV, the input clean_data.py expects.
+
+# Crawl settings (override through the environment)
+max_depth = int(os.getenv('CRAWL_MAX_DEPTH', 2))
+queue_size = int(os.getenv('CRAWL_QUEUE_SIZE', 256))
+
+listing_output = './data/character_data_with_images.csv'
+
+# Function to get the seed pages: CRAWL_SEEDS (comma or whitespace separated), default
+# the TV series listing that scrape_characters.py reads
+def seeds_from_env():
+    seeds = os.getenv('CRAWL_SEEDS', '').strip()
+    return re.split(r'[\s,]+', seeds) if seeds else [listing_url]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Discover character pages from seed listings and categories, and scrape them.')
+    parser.add_argument('--seed', action='append', dest='seeds', metavar='URL',
+                        help='Seed page, repeatable (default CRAWL_SEEDS or the TV series listing)')
+    parser.add_argument('--max-depth', type=int, default=max_depth, help='Subcategory levels to follow (CRAWL_MAX_DEPTH)')
+    parser.add_argument('--max-pages', type=int, default=0, help='Stop after discovering this many pages (0 for no limit)')
+    parser.add_argument('--queue-size', type=int, default=queue_size, help='Discovered pages waiting to be scraped (CRAWL_QUEUE_SIZE)')
+    parser.add_argument('--listing-output', default=listing_output, help='CSV of every discovered page')
+    add_crawl_arguments(parser)
+    args = parser.parse_args(argv)
+    seeds = args.seeds or seeds_from_env()
+
+    # Ensure the directory for storing text files exists
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+
+    journal = begin_crawl(args)
+    page_cache = page_cache_from_env()
+    fetcher = make_fetcher(page_cache, args.workers, args.rate, args.retries, args.timeout)
+    frontier = Frontier(seeds, max_depth=args.max_depth, max_pages=args.max_pages, queue_size=args.queue_size)
+    print(f"Crawling from {len(seeds)} seed page(s)")
+
+    # The crawl is one trace: discover spans from the walker, fetch/parse/save per page
+    with metrics.span('crawl', seeds=len(seeds)):
+        walker = threading.Thread(target=metrics.run_in_context(frontier.walk), args=(fetcher,), daemon=True)
+        walker.start()
+        due = 0
+        try:
+            with atomic_open(args.listing_output, newline='') as listing:
+                writer = csv.writer(listing)
+                writer.writerow(['name', 'url', 'image_url'])
+
+                # Record every discovered page, but only scrape the ones the journal says are due
+                def due_pages():
+                    nonlocal due
+                    for name, url, image_url in frontier:
+                        writer.writerow([name, url, image_url])
+                        if journal.is_due(url):
+                            due += 1
+                            yield name, url
+
+                for character_name, character_url, response in fetch_pages(due_pages(), fetcher, journal):
+                    status, detail = save_character_page(character_name, response, args.output_dir)
+                    journal.record(character_url, character_name, status, detail)
+        finally:
+            frontier.stop()
+            walker.join()
+            fetcher.close()
+
+    failed = journal.complete()
+    journal.close()
+    stats = frontier.stats
+    print(f"Discovered {stats['characters']} pages from {stats['navigation_pages']} listing and category pages "
+          f"({stats['duplicates']} duplicate links, {stats['off_site']} off-site); {due} were due")
+    if frontier.errors:
+        print(f"{len(frontier.errors)} listing or category pages could not be read")
+    if page_cache is not None:
+        print(page_cache.report())
+    if failed:
+        print(f"{len(failed)} pages failed; re-run with --retry-failed to retry only those")
+    print(f"Listing saved to {args.listing_output}")
+    print("Crawl complete.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from file_runner import atomic_open
+
+# Append-only journal of the character page crawl (data/crawl_journal.jsonl, CRAWL_JOURNAL
+# overrides the path). One JSON line per event:
+#   {"event": "start", "time", "cutoff", "retry_failed"}    a crawl begins
+#   {"event": "page", "url", "name", "status", "time", "hash"|"error"}
+#   {"event": "complete", "time", "failed"}                 every due page was attempted
+#
+# Page status is saved, unchanged or skipped (done: the page needs nothing more) or failed.
+# A page is due in a crawl if its last done record is older than the crawl's cutoff: the
+# crawl's start time for a full crawl, or start time minus --since. So a crawl that was
+# killed resumes by skipping what it already did, failed pages are always due again,
+# and --retry-failed crawls only the pages whose latest attempt failed.
+#
+# Each line is flushed as it is written; a torn last line from a killed run is ignored.
+
+DONE = ('saved', 'unchanged', 'skipped')
+UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+DURATION = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*$')
+
+def journal_path():
+    return os.getenv('CRAWL_JOURNAL', 'data/crawl_journal.jsonl')
+
+# Function to turn '90', '45m', '12h', '7d' or '2w' into seconds
+def parse_duration(text):
+    match = DURATION.match(text.lower())
+    if not match:
+        raise ValueError(f"Invalid duration {text!r} (expected e.g. 45m, 12h, 7d)")
+    return float(match.group(1)) * UNITS[match.group(2)]
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class CrawlJournal:
+    def __init__(self, path=None):
+        self.path = path or journal_path()
+        self.lock = threading.Lock()
+        self.pages = {}         # url -> latest page record
+        self.last_done = {}     # url -> time of the latest done record
+        self.crawl = None       # latest start record
+        self.completed = False
+        self.lines = 0
+        self.file = None
+        self._load()
+
+    def _load(self):
+        try:
+            f = open(self.path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply(record)
+                self.lines += 1
+
+    def _apply(self, record):
+        event = record.get('event')
+        if event == 'page':
+            url = record['url']
+            # An unchanged page keeps the hash of the output written for it earlier
+            if record['status'] == 'unchanged' and url in self.pages:
+                record.setdefault('hash', self.pages[url].get('hash'))
+            self.pages[url] = record
+            if record['status'] in DONE:
+                self.last_done[url] = record['time']
+        elif event == 'start':
+            self.crawl = record
+            self.completed = False
+        elif event == 'complete':
+            self.completed = True
+
+    def _append(self, record):
+        with self.lock:
+            if self.file is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self.file = open(self.path, 'a', encoding='utf-8')
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.file.flush()
+            self.lines += 1
+            self._apply(record)
+
+    # Function to tell whether the last crawl stopped before attempting every due page
+    def resumable(self):
+        return self.crawl is not None and not self.completed
+
+    # Function to begin a new crawl; with `since` (seconds) only pages last scraped longer
+    # ago than that are due
+    def start(self, since=None, retry_failed=False):
+        # Keep the log from growing without bound: only the latest record per URL matters
+        # once a new crawl starts
+        if self.lines > 2 * len(self.pages) + 100:
+            self.compact()
+        now = time.time()
+        self._append({'event': 'start', 'time': now, 'cutoff': now - since if since else now,
+                      'retry_failed': retry_failed})
+
+    def is_due(self, url):
+        if self.crawl.get('retry_failed'):
+            record = self.pages.get(url)
+            return record is not None and record['status'] == 'failed'
+        return self.last_done.get(url, float('-inf')) < self.crawl['cutoff']
+
+    # Function to log the outcome for one page: `detail` is the output hash for saved
+    # pages and the error message for failed ones
+    def record(self, url, name, status, detail=None):
+        record = {'event': 'page', 'url': url, 'name': name, 'status': status, 'time': time.time()}
+        if detail is not None:
+            record['error' if status == 'failed' else 'hash'] = detail
+        self._append(record)
+
+    def complete(self):
+        failed = self.failed()
+        self._append({'event': 'complete', 'time': time.time(), 'failed': len(failed)})
+        return failed
+
+    def failed(self):
+        with self.lock:
+            return [record for record in self.pages.values() if record['status'] == 'failed']
+
+    def compact(self):
+        with self.lock:
+            self.close()
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with atomic_open(self.path) as f:
+                for record in self.pages.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.lines = len(self.pages)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
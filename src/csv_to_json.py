@@ -1,37 +1,59 @@
+import argparse
+import io
 import os
-import pandas as pd
-import json
+from functools import partial
+from file_runner import run_directory, write_json_atomic
+from normalize import FallBack, csv_cell_value
 
-def convert_csv_to_json(csv_file_path, json_file_path):
+def _header(i, key):
+    return key if key != '' else f'Unnamed: {i}'
+
+# Pipeline stage: a row as it would come back from a to_csv/read_csv round trip. Cells
+# read_csv may turn into floats ('1.5', 'inf') take the real round trip through pandas.
+def csv_record(record):
     try:
-        # Read the CSV file
-        df = pd.read_csv(csv_file_path, keep_default_na=False)
+        return {_header(i, key): csv_cell_value(value) if isinstance(value, str) else value
+                for i, (key, value) in enumerate(record.items())}
+    except FallBack:
+        import pandas as pd
 
-        # Convert the DataFrame to a dictionary
-        data_dict = df.to_dict(orient='records')
+        text = pd.DataFrame([record]).to_csv(index=False)
+        return pd.read_csv(io.StringIO(text), keep_default_na=False).to_dict(orient='records')[0]
 
-        # Write the dictionary to a JSON file
-        with open(json_file_path, 'w', encoding='utf-8') as json_file:
-            json.dump(data_dict, json_file, ensure_ascii=False, indent=4)
+def convert_csv_to_json(csv_file_path, json_file_path):
+    import pandas as pd
 
-        print(f"Converted {csv_file_path} to {json_file_path}")
+    # Read the CSV file
+    df = pd.read_csv(csv_file_path, keep_default_na=False)
 
-    except Exception as e:
-        print(f"Error converting {csv_file_path}: {e}")
+    # Convert the DataFrame to a dictionary
+    data_dict = df.to_dict(orient='records')
 
-def convert_all_csv_to_json(csv_directory, json_directory):
-    if not os.path.exists(json_directory):
-        os.makedirs(json_directory)
+    # Write the dictionary to a JSON file
+    write_json_atomic(data_dict, json_file_path)
+    return len(data_dict)
 
-    for filename in os.listdir(csv_directory):
-        if filename.endswith('.csv'):
-            csv_file_path = os.path.join(csv_directory, filename)
-            json_file_name = filename.replace('.csv', '.json')
-            json_file_path = os.path.join(json_directory, json_file_name)
-            convert_csv_to_json(csv_file_path, json_file_path)
+# Function to convert one CSV file into the JSON file of the same name in json_directory
+def convert_csv_file(csv_file_path, json_directory):
+    json_file_name = os.path.basename(csv_file_path).replace('.csv', '.json')
+    return convert_csv_to_json(csv_file_path, os.path.join(json_directory, json_file_name))
 
-# Specify the directories
-csv_directory = 'data/character_data'
-json_directory = 'data/character_jsons'
-convert_all_csv_to_json(csv_directory, json_directory)
+def convert_all_csv_to_json(csv_directory, json_directory, workers=None):
+    if not os.path.exists(json_directory):
+        os.makedirs(json_directory)
 
+    report = run_directory(csv_directory, '.csv', partial(convert_csv_file, json_directory=json_directory),
+                           workers, label='Converted CSV files to JSON')
+    print(report.summary())
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert each character CSV into a JSON file.')
+    parser.add_argument('--csv-dir', default='data/character_data', help='Directory of CSV files')
+    parser.add_argument('--json-dir', default='data/character_jsons', help='Directory to write JSON files to')
+    parser.add_argument('--workers', type=int, help='Worker processes (default ETL_WORKERS or the CPU count)')
+    args = parser.parse_args(argv)
+    convert_all_csv_to_json(args.csv_dir, args.json_dir, args.workers)
+
+if __name__ == '__main__':
+    main()
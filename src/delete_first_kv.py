@@ -1,27 +1,27 @@
-import os
-import json
+import argparse
+from functools import partial
+from file_runner import run_directory, transform_json_file
 
-def remove_first_kv_pair(directory):
-    # Iterate over all files in the given directory
-    for filename in os.listdir(directory):
-        if filename.endswith('.json'):
-            file_path = os.path.join(directory, filename)
-            
-            # Open and load the JSON file
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-            
-            # Process each entry in the JSON data
-            for entry in data:
-                # Remove the first key-value pair
-                if entry:
-                    first_key = next(iter(entry))
-                    del entry[first_key]
-            
-            # Save the modified data back to the file
-            with open(file_path, 'w', encoding='utf-8') as file:
-                json.dump(data, file, ensure_ascii=False, indent=4)
+# Pipeline stage: remove the first key-value pair of one entry
+def delete_first_kv(entry):
+    if entry:
+        first_key = next(iter(entry))
+        del entry[first_key]
+    return entry
 
-# Example usage
-directory_path = 'data/character_jsons'
-remove_first_kv_pair(directory_path)
\ No newline at end of file
+def remove_first_kv_pair(directory, workers=None):
+    # Process each JSON file in the given directory on the process pool
+    report = run_directory(directory, '.json', partial(transform_json_file, transform=delete_first_kv),
+                           workers, label='Removed first key')
+    print(report.summary())
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Remove the first key-value pair of every entry, in place.')
+    parser.add_argument('--directory', default='data/character_jsons', help='Directory of JSON files')
+    parser.add_argument('--workers', type=int, help='Worker processes (default ETL_WORKERS or the CPU count)')
+    args = parser.parse_args(argv)
+    remove_first_kv_pair(args.directory, args.workers)
+
+if __name__ == '__main__':
+    main()
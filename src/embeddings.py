@@ -0,0 +1,122 @@
+import argparse
+import os
+import numpy as np
+
+# Sentence embedding model shared by the upsert and the app, with the inference backend
+# chosen by EMBEDDING_BACKEND:
+#   torch      (default) sentence-transformers on PyTorch, fp32
+#   onnx       ONNX Runtime on an int8 (dynamically quantized) export of the same model
+#   onnx-fp32  ONNX Runtime on the unquantized export
+# The ONNX backends need only onnxruntime, tokenizers and numpy, so serving nodes don't
+# have to install torch. The export is made once, on a machine that has torch:
+#   python src/embeddings.py export
+# which writes model.onnx, model_int8.onnx and tokenizer.json to ONNX_MODEL_DIR
+# (default data/onnx/all-MiniLM-L6-v2). ONNX_THREADS caps the runtime's threads.
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+DIMENSION = 384
+MAX_SEQ_LENGTH = 256  # sentence-transformers' setting for this model
+BACKENDS = ('torch', 'onnx', 'onnx-fp32')
+
+def embedding_backend():
+    return os.getenv('EMBEDDING_BACKEND', 'torch')
+
+def onnx_model_dir():
+    return os.getenv('ONNX_MODEL_DIR', f'data/onnx/{MODEL_NAME}')
+
+
+class OnnxEmbedder:
+    # Same output as SentenceTransformer(MODEL_NAME).encode: the model's pipeline is BERT,
+    # mean pooling over the attention mask, then L2 normalisation
+    def __init__(self, directory, quantized=True, threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        path = os.path.join(directory, 'model_int8.onnx' if quantized else 'model.onnx')
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} not found. Export the model with `python src/embeddings.py export`.")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(os.path.join(directory, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token='[PAD]')
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        vectors = np.empty((len(texts), DIMENSION), dtype=np.float32)
+        # Longest first, so each batch pads to texts of similar length
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        for start in range(0, len(texts), batch_size):
+            batch = order[start:start + batch_size]
+            encodings = self.tokenizer.encode_batch([texts[i] for i in batch])
+            input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+            attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+            feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+            if 'token_type_ids' in self.input_names:
+                feeds['token_type_ids'] = np.zeros_like(input_ids)
+            hidden = self.session.run(None, feeds)[0]
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            vectors[batch] = pooled / np.maximum(norms, 1e-12)
+        return vectors[0] if single else vectors
+
+
+# Function to load the embedding model for the configured backend
+def load_model(backend=None):
+    backend = backend or embedding_backend()
+    if backend == 'torch':
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(MODEL_NAME)
+    if backend in ('onnx', 'onnx-fp32'):
+        threads = int(os.getenv('ONNX_THREADS', 0)) or None
+        return OnnxEmbedder(onnx_model_dir(), quantized=backend == 'onnx', threads=threads)
+    raise ValueError(f"Unknown embedding backend {backend!r} (expected one of {', '.join(BACKENDS)})")
+
+# Function to export the model to ONNX and quantize its weights to int8. Needs torch,
+# transformers and onnxruntime; only the output files are needed at serving time.
+def export_onnx(directory, opset=14):
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    hub_name = f'sentence-transformers/{MODEL_NAME}'
+    os.makedirs(directory, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(hub_name)
+    tokenizer.save_pretrained(directory)  # includes tokenizer.json (the fast tokenizer)
+    model = AutoModel.from_pretrained(hub_name).eval()
+
+    sample = tokenizer(['export sample'], return_tensors='pt')
+    inputs = ['input_ids', 'attention_mask', 'token_type_ids']
+    outputs = ['last_hidden_state', 'pooler_output']
+    fp32_path = os.path.join(directory, 'model.onnx')
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[name] for name in inputs), fp32_path,
+                          input_names=inputs, output_names=outputs, opset_version=opset,
+                          dynamic_axes={**{name: {0: 'batch', 1: 'sequence'} for name in inputs},
+                                        'last_hidden_state': {0: 'batch', 1: 'sequence'},
+                                        'pooler_output': {0: 'batch'}})
+
+    # Dynamic quantization: int8 weights, activations quantized on the fly per batch
+    int8_path = os.path.join(directory, 'model_int8.onnx')
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    for path in (fp32_path, int8_path):
+        print(f"Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export the embedding model for the ONNX Runtime backend.')
+    parser.add_argument('command', choices=['export'])
+    parser.add_argument('--output-dir', default=None, help='Output directory (default ONNX_MODEL_DIR)')
+    parser.add_argument('--opset', type=int, default=14)
+    args = parser.parse_args(argv)
+
+    export_onnx(args.output_dir or onnx_model_dir(), args.opset)
+
+if __name__ == '__main__':
+    main()
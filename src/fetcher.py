@@ -0,0 +1,122 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import metrics
+
+# Status codes worth retrying - the wiki returns these when it is overloaded
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class RateLimiter:
+    # Hands out evenly spaced time slots so a host never sees more than `rate` requests per second
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Fetcher:
+    # Concurrent page fetcher: one pooled session and one rate limiter per host,
+    # transient failures are retried with exponential backoff. With a PageCache attached,
+    # requests are conditional and responses carry an `unchanged` flag.
+    def __init__(self, max_workers=8, rate_per_host=5.0, retries=3, backoff=0.5, timeout=30, cache=None):
+        self.max_workers = max_workers
+        self.rate_per_host = rate_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.sessions = {}
+        self.limiters = {}
+        self.lock = threading.Lock()
+
+    def _make_session(self):
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=["GET"],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=self.max_workers)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _host_state(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.sessions:
+                self.sessions[host] = self._make_session()
+                self.limiters[host] = RateLimiter(self.rate_per_host)
+            return self.sessions[host], self.limiters[host]
+
+    def get(self, url, **kwargs):
+        session, limiter = self._host_state(url)
+        limiter.wait()
+        kwargs.setdefault('timeout', self.timeout)
+        with metrics.span('fetch', url=url) as span:
+            if self.cache is None:
+                response = session.get(url, **kwargs)
+            else:
+                headers = kwargs.get('headers', {})
+                kwargs['headers'] = {**self.cache.conditional_headers(url), **headers}
+                response = self.cache.update(url, session.get(url, **kwargs))
+                if response.status_code == 304:
+                    # The cached body was lost after the validators were sent: fetch it again in full
+                    limiter.wait()
+                    kwargs['headers'] = headers
+                    response = self.cache.update(url, session.get(url, **kwargs))
+            span.set('http.status_code', response.status_code)
+        unchanged = getattr(response, 'unchanged', False)
+        metrics.count('pages_fetched', status=response.status_code, unchanged=unchanged)
+        metrics.count('bytes_fetched', len(response.content))
+        return response
+
+    def _fetch_job(self, key, url):
+        try:
+            return key, url, self.get(url), None
+        except requests.RequestException as e:
+            metrics.count('fetch_errors', error=type(e).__name__)
+            return key, url, None, e
+
+    def fetch_all(self, jobs):
+        # Fetch (key, url) pairs concurrently, yielding (key, url, response, error) as each one finishes.
+        # Only a bounded number of requests is in flight, so `jobs` may be a lazy iterator.
+        jobs = iter(jobs)
+        in_flight = set()
+        # Fetch spans on the pool's threads belong to the caller's span (e.g. the crawl)
+        fetch_job = metrics.run_in_context(self._fetch_job)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                for key, url in jobs:
+                    in_flight.add(executor.submit(fetch_job, key, url))
+                    if len(in_flight) >= self.max_workers * 2:
+                        break
+                if not in_flight:
+                    return
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def close(self):
+        for session in self.sessions.values():
+            session.close()
+        if self.cache is not None:
+            self.cache.save()
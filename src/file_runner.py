@@ -0,0 +1,104 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+# Shared runner for the per-file ETL scripts (steps 4-8). Each file in a directory is
+# handed to `process_file(path)` on a process pool; the function returns the number of
+# records it handled. Outputs are written through atomic_open, so an error or a killed
+# worker never leaves a half-written file behind. Errors are collected per file and
+# reported at the end together with the throughput.
+
+# Worker processes (ETL_WORKERS); 1 runs everything in this process
+def default_workers():
+    return int(os.getenv('ETL_WORKERS', os.cpu_count() or 1))
+
+# Function to open a temp file next to `path` and rename it over `path` once the block
+# finishes without an exception. The temp name includes the pid so parallel workers
+# never share one.
+@contextmanager
+def atomic_open(path, mode='w', encoding='utf-8', newline=None):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, mode, encoding=encoding, newline=newline) as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def write_json_atomic(data, path):
+    with atomic_open(path) as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+# Function to apply `transform` to every entry of one JSON file and write it back
+def transform_json_file(file_path, transform):
+    with open(file_path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    for entry in data:
+        transform(entry)
+    write_json_atomic(data, file_path)
+    return len(data)
+
+
+class RunReport:
+    def __init__(self, label, files, workers):
+        self.label = label
+        self.files = files
+        self.workers = workers
+        self.succeeded = 0
+        self.records = 0
+        self.bytes = 0
+        self.errors = []    # [(path, message)]
+        self.elapsed = 0.0
+
+    def summary(self):
+        elapsed = self.elapsed or 1e-9
+        lines = [f"{self.label}: {self.succeeded}/{self.files} files, {self.records} records in {self.elapsed:.2f}s "
+                 f"({self.files / elapsed:.1f} files/s, {self.records / elapsed:.1f} records/s, "
+                 f"{self.bytes / elapsed / 1e6:.1f} MB/s, {self.workers} workers)"]
+        for path, message in self.errors:
+            lines.append(f"  Error in {path}: {message}")
+        return '\n'.join(lines)
+
+
+def _run_one(process_file, path):
+    # Runs in the worker: never raise, so one bad file can't stop the rest
+    try:
+        return path, process_file(path) or 0, None
+    except Exception as e:
+        return path, 0, f"{type(e).__name__}: {e}"
+
+def _run_chunk(process_file, paths):
+    return [_run_one(process_file, path) for path in paths]
+
+# Function to run `process_file` over every file in `directory` ending with `suffix`.
+# `process_file` must be picklable (a module-level function or a functools.partial of one).
+def run_directory(directory, suffix, process_file, workers=None, label=None):
+    paths = [os.path.join(directory, filename) for filename in sorted(os.listdir(directory))
+             if filename.endswith(suffix)]
+    workers = max(1, min(workers or default_workers(), len(paths) or 1))
+    report = RunReport(label or getattr(process_file, '__name__', 'run'), len(paths), workers)
+    report.bytes = sum(os.path.getsize(path) for path in paths)
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = _run_chunk(process_file, paths)
+    else:
+        # A few chunks per worker keeps the pool busy without one task per small file
+        size = max(1, len(paths) // (workers * 4))
+        chunks = [paths[i:i + size] for i in range(0, len(paths), size)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [result for chunk in pool.map(_run_chunk, [process_file] * len(chunks), chunks)
+                       for result in chunk]
+    report.elapsed = time.perf_counter() - start
+
+    for path, records, error in results:
+        if error is None:
+            report.succeeded += 1
+            report.records += records
+        else:
+            report.errors.append((path, error))
+    return report
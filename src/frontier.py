@@ -0,0 +1,237 @@
+import hashlib
+import queue
+import threading
+from collections import deque
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urljoin, urlsplit, urlunsplit
+
+import requests
+import metrics
+
+# Frontier for crawling character pages from several seed pages. Seeds are either
+# character listings (a table with one <td> per character, like TV_Series_Characters) or
+# Category: pages. Category pages are followed through their pagination ("Next page")
+# and their subcategories, up to a maximum depth. Every character link is reduced to a
+# canonical URL and handed out once, through a bounded queue that the page scraper drains.
+#
+# Memory stays bounded: pages are parsed in one streaming pass (no tree is built), the
+# seen set holds an 8-byte hash per URL instead of the URL, and the walker blocks when
+# the queue is full, so discovery never runs more than `queue_size` pages ahead of the
+# scraper. Only the navigation pages still to visit are kept in full.
+
+# Characters MediaWiki leaves unescaped in page URLs
+URL_SAFE = ";@$!*(),/~:"
+# Query parameters that select a different page (category pagination); others are dropped
+PAGE_PARAMS = ('from',)
+# Namespaced titles that are never character pages
+NAMESPACES = {'Category', 'File', 'Image', 'Template', 'Special', 'User', 'User_talk', 'User_blog', 'Talk',
+              'Help', 'Forum', 'Board', 'Message_Wall', 'MediaWiki', 'Module', 'Thread', 'Project'}
+
+# Function to reduce a link to the one URL used for its page: absolute, no fragment,
+# MediaWiki's escaping, index.php?title=X as /wiki/X, and only page-selecting parameters.
+# Returns None for links that aren't http(s).
+def canonical_url(href, page_url):
+    parts = urlsplit(urljoin(page_url, href.strip()))
+    if parts.scheme not in ('http', 'https'):
+        return None
+    path = unquote(parts.path)
+    params = dict(parse_qsl(parts.query))
+    if path.endswith('/index.php') and 'title' in params:
+        path = '/wiki/' + params.pop('title')
+    query = urlencode(sorted((key, value) for key, value in params.items() if key in PAGE_PARAMS))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), quote(path.replace(' ', '_'), safe=URL_SAFE), query, ''))
+
+# Function to get the wiki title from a canonical URL ('' for anything outside /wiki/)
+def page_title(url):
+    path = unquote(urlsplit(url).path)
+    return path[len('/wiki/'):] if path.startswith('/wiki/') else ''
+
+def namespace(title):
+    prefix, colon, _ = title.partition(':')
+    return prefix if colon and prefix in NAMESPACES else None
+
+def url_key(url):
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class LinkParser(HTMLParser):
+    # Collects, in one pass over the page:
+    # - listing cells: for every <td>, its first link and first image (the same rule as
+    #   scrape_characters.parse_character_links)
+    # - category members: <a class="category-page__member-link">, with the thumbnail
+    #   of their <li class="category-page__member">
+    # - pagination: <a class="category-page__pagination-next">
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.open_cells = []    # [position, href, title, has_image, image_url]
+        self.cells = []
+        self.members = []       # (href, title, image_url)
+        self.next_pages = []
+        self.member_image = None
+        self.position = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'td':
+            self.open_cells.append([self.position, None, None, False, None])
+            self.position += 1
+        elif tag == 'a':
+            attributes = dict(attrs)
+            href = attributes.get('href')
+            if href is None:
+                return
+            for cell in self.open_cells:
+                if cell[1] is None:
+                    cell[1], cell[2] = href, attributes.get('title')
+            classes = (attributes.get('class') or '').split()
+            if 'category-page__member-link' in classes:
+                self.members.append((href, attributes.get('title'), self.member_image))
+            elif 'category-page__pagination-next' in classes:
+                self.next_pages.append(href)
+        elif tag == 'img':
+            attributes = dict(attrs)
+            image_url = attributes.get('data-src') or attributes.get('src')
+            for cell in self.open_cells:
+                if not cell[3]:
+                    cell[3], cell[4] = True, image_url
+            self.member_image = image_url
+        elif tag == 'li' and 'category-page__member' in (dict(attrs).get('class') or '').split():
+            self.member_image = None
+
+    def handle_endtag(self, tag):
+        if tag == 'td' and self.open_cells:
+            self.cells.append(self.open_cells.pop())
+
+    def close(self):
+        super().close()
+        self.cells.extend(self.open_cells)
+        self.open_cells = []
+        self.cells.sort()
+
+# Function to pull the links the frontier needs from one page. Returns a dict with
+# 'characters' ({name, url, image_url} per character link, in page order), 'subcategories'
+# and 'next_pages' (canonical URLs).
+def extract_links(content, page_url):
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+    parser = LinkParser()
+    parser.feed(content)
+    parser.close()
+
+    characters, subcategories = [], []
+    for _, href, title, has_image, image_url in parser.cells:
+        if href and '/wiki/' in href and has_image and title:
+            url = canonical_url(href, page_url)
+            if url:
+                characters.append({'name': title, 'url': url, 'image_url': image_url})
+    for href, title, image_url in parser.members:
+        url = canonical_url(href, page_url)
+        if url is None:
+            continue
+        kind = namespace(page_title(url))
+        if kind == 'Category':
+            subcategories.append(url)
+        elif kind is None and page_title(url):
+            characters.append({'name': title or page_title(url).replace('_', ' '), 'url': url, 'image_url': image_url})
+    next_pages = [url for url in (canonical_url(href, page_url) for href in parser.next_pages) if url]
+    return {'characters': characters, 'subcategories': subcategories, 'next_pages': next_pages}
+
+
+DONE = object()
+
+class Frontier:
+    # Breadth-first walk of the navigation pages reachable from the seeds. walk() runs on
+    # its own thread and puts (name, url, image_url) for each new character page on a
+    # bounded queue; iterating the frontier drains that queue until the walk is over.
+    def __init__(self, seeds, max_depth=2, max_pages=0, queue_size=256):
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.hosts = {urlsplit(seed).netloc.lower() for seed in seeds}
+        self.seen = set()
+        self.navigation = deque()
+        self.pages = queue.Queue(maxsize=queue_size)
+        self.stopped = threading.Event()
+        self.stats = {'navigation_pages': 0, 'characters': 0, 'duplicates': 0, 'off_site': 0, 'queue_high_water': 0}
+        self.errors = []
+        for seed in seeds:
+            self._add_navigation(canonical_url(seed, seed), 0)
+
+    def _first_visit(self, url):
+        key = url_key(url)
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        return True
+
+    def _on_site(self, url):
+        if urlsplit(url).netloc in self.hosts:
+            return True
+        self.stats['off_site'] += 1
+        return False
+
+    def _add_navigation(self, url, depth):
+        if url and self._on_site(url) and self._first_visit(url):
+            self.navigation.append((url, depth))
+
+    def _put(self, item):
+        # Blocks while the scraper is behind; gives up if the consumer has stopped
+        while not self.stopped.is_set():
+            try:
+                self.pages.put(item, timeout=0.1)
+                self.stats['queue_high_water'] = max(self.stats['queue_high_water'], self.pages.qsize())
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _visit(self, fetcher, url, depth):
+        try:
+            with metrics.span('discover', url=url, depth=depth):
+                response = fetcher.get(url)
+                if response.status_code != 200:
+                    raise ValueError(f"HTTP {response.status_code}")
+                links = extract_links(response.content, url)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Error reading {url}: {e}")
+            self.errors.append((url, str(e)))
+            return True
+        self.stats['navigation_pages'] += 1
+        metrics.count('navigation_pages')
+
+        for next_page in links['next_pages']:
+            self._add_navigation(next_page, depth)
+        if depth < self.max_depth:
+            for subcategory in links['subcategories']:
+                self._add_navigation(subcategory, depth + 1)
+        for character in links['characters']:
+            if not self._on_site(character['url']):
+                continue
+            if not self._first_visit(character['url']):
+                self.stats['duplicates'] += 1
+                continue
+            if not self._put((character['name'], character['url'], character['image_url'])):
+                return False
+            self.stats['characters'] += 1
+            metrics.count('characters_discovered')
+            if self.max_pages and self.stats['characters'] >= self.max_pages:
+                return False
+        return True
+
+    # Function to run the walk; always ends the queue so the consumer finishes too
+    def walk(self, fetcher):
+        try:
+            while self.navigation and not self.stopped.is_set():
+                url, depth = self.navigation.popleft()
+                if not self._visit(fetcher, url, depth):
+                    break
+        finally:
+            self._put(DONE)
+
+    def stop(self):
+        self.stopped.set()
+
+    def __iter__(self):
+        while True:
+            item = self.pages.get()
+            if item is DONE:
+                return
+            yield item
@@ -0,0 +1,194 @@
+import argparse
+import json
+import math
+import os
+import re
+import numpy as np
+from character_metadata import TEXT_FIELDS, filter_fields
+from vector_store import matches_filter
+from corpus import Corpus
+
+# BM25 keyword index over the character corpus (src/corpus.py), used next to the vector
+# index so exact names and episode titles ("Negan Lucille", "Terminus") rank well.
+#
+# On disk (data/keyword_index):
+#   postings.npz  doc_ids (uint32) and term frequencies (uint16) for all terms, end to end
+#   index.json    vocabulary (term -> [start, end) into the postings), documents with
+#                 their length, corpus line hash and filter fields
+#
+# Rebuilding only re-tokenises characters whose corpus line changed.
+
+K1 = 1.2
+B = 0.75
+RRF_K = 60
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Name tokens count this many times, so a query naming a character ranks that character
+# above the many pages that merely mention them
+NAME_WEIGHT = 5
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall((text or '').lower())
+
+def term_frequencies(character):
+    counts = {}
+    for token in tokenize(character.get('Name', '')):
+        counts[token] = counts.get(token, 0) + NAME_WEIGHT
+    for field in TEXT_FIELDS:
+        for token in tokenize(character.get(field, '')):
+            counts[token] = counts.get(token, 0) + 1
+    return counts
+
+
+class KeywordIndex:
+    def __init__(self, directory='data/keyword_index'):
+        self.directory = directory
+        self.documents = []     # [{'id', 'file', 'hash', 'length', 'fields'}]
+        self.vocabulary = {}    # term -> (start, end)
+        self.doc_ids = np.empty(0, dtype=np.uint32)
+        self.tfs = np.empty(0, dtype=np.uint16)
+        self.lengths = np.empty(0, dtype=np.float32)
+        self.average_length = 0.0
+        self.load()
+
+    def _paths(self):
+        return os.path.join(self.directory, 'index.json'), os.path.join(self.directory, 'postings.npz')
+
+    def load(self):
+        meta_path, postings_path = self._paths()
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        postings = np.load(postings_path)
+        self.documents = meta['documents']
+        self.vocabulary = {term: tuple(span) for term, span in meta['vocabulary'].items()}
+        self.doc_ids = postings['doc_ids']
+        self.tfs = postings['tfs']
+        self._update_lengths()
+
+    def _update_lengths(self):
+        self.lengths = np.array([doc['length'] for doc in self.documents], dtype=np.float32)
+        self.average_length = float(self.lengths.mean()) if len(self.lengths) else 0.0
+
+    def _document_terms(self):
+        # Invert the postings back into per-document term frequencies
+        terms = [dict() for _ in self.documents]
+        for term, (start, end) in self.vocabulary.items():
+            for doc, tf in zip(self.doc_ids[start:end].tolist(), self.tfs[start:end].tolist()):
+                terms[doc][term] = tf
+        return terms
+
+    def update(self, corpus):
+        # Re-tokenise only new or changed characters; returns (changed, removed) counts
+        existing = {(doc['file'], doc['hash']): (doc, terms) for doc, terms in zip(self.documents, self._document_terms())}
+        documents, doc_terms = [], []
+        changed = 0
+        for entry in corpus.entries:
+            key = (entry['file'], entry['hash'])
+            if key in existing:
+                doc, terms = existing.pop(key)
+                documents.append(doc)
+                doc_terms.append(terms)
+                continue
+            changed += 1
+            character = corpus.read_entry(entry)
+            terms = term_frequencies(character)
+            fields = filter_fields(character)
+            fields['Name'] = character.get('Name', entry['file'])
+            documents.append({
+                'id': entry['id'],
+                'file': entry['file'],
+                'hash': entry['hash'],
+                'length': sum(terms.values()),
+                'fields': fields,
+            })
+            doc_terms.append(terms)
+        self._build(documents, doc_terms)
+        return changed, len(existing)
+
+    def _build(self, documents, doc_terms):
+        postings = {}
+        for doc, terms in enumerate(doc_terms):
+            for term, tf in terms.items():
+                postings.setdefault(term, []).append((doc, tf))
+        vocabulary, doc_ids, tfs = {}, [], []
+        for term in sorted(postings):
+            start = len(doc_ids)
+            for doc, tf in postings[term]:
+                doc_ids.append(doc)
+                tfs.append(min(tf, 65535))
+            vocabulary[term] = (start, len(doc_ids))
+        self.documents = documents
+        self.vocabulary = vocabulary
+        self.doc_ids = np.array(doc_ids, dtype=np.uint32)
+        self.tfs = np.array(tfs, dtype=np.uint16)
+        self._update_lengths()
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        meta_path, postings_path = self._paths()
+        with open(postings_path + '.tmp', 'wb') as f:
+            np.savez(f, doc_ids=self.doc_ids, tfs=self.tfs)
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'documents': self.documents, 'vocabulary': self.vocabulary}, f, ensure_ascii=False)
+        os.replace(postings_path + '.tmp', postings_path)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def search(self, query, top_k=10, filter=None):
+        # BM25 over the query's terms; returns [(character id, score), ...] best first
+        n = len(self.documents)
+        if n == 0:
+            return []
+        scores = np.zeros(n, dtype=np.float32)
+        for term in set(tokenize(query)):
+            span = self.vocabulary.get(term)
+            if span is None:
+                continue
+            docs = self.doc_ids[span[0]:span[1]]
+            tf = self.tfs[span[0]:span[1]].astype(np.float32)
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = K1 * (1 - B + B * self.lengths[docs] / self.average_length)
+            scores[docs] += idf * tf * (K1 + 1) / (tf + norm)
+        if filter:
+            allowed = np.fromiter((matches_filter(doc['fields'], filter) for doc in self.documents), dtype=bool, count=n)
+            scores[~allowed] = 0
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > top_k:
+            hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+        hits = hits[np.argsort(-scores[hits], kind='stable')]
+        results, seen = [], set()
+        for doc in hits:
+            character_id = self.documents[doc]['id']
+            if character_id not in seen:
+                seen.add(character_id)
+                results.append((character_id, float(scores[doc])))
+        return results
+
+
+# Function to fuse several rankings of IDs with reciprocal rank fusion. Scores are scaled
+# so an ID ranked first in every list scores 1.0.
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    scores = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, 1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    best = len(rankings) / (k + 1)
+    return sorted(((item_id, score / best) for item_id, score in scores.items()),
+                  key=lambda item: item[1], reverse=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or refresh the BM25 keyword index from the corpus.')
+    parser.add_argument('--corpus-dir', default=None, help='Corpus directory (default CORPUS_DIR or data/corpus)')
+    parser.add_argument('--index-dir', default='data/keyword_index', help='Keyword index directory')
+    args = parser.parse_args(argv)
+
+    index = KeywordIndex(args.index_dir)
+    changed, removed = index.update(Corpus(args.corpus_dir))
+    index.save()
+    print(f"Keyword index: {len(index.documents)} documents, {len(index.vocabulary)} terms "
+          f"({changed} characters re-indexed, {removed} removed)")
+
+if __name__ == '__main__':
+    main()
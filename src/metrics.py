@@ -0,0 +1,338 @@
+import atexit
+import contextvars
+import os
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from file_runner import atomic_open
+
+# Counters, latency histograms and spans for the crawl, upsert and query paths, with a
+# pluggable exporter chosen by METRICS_EXPORTER:
+#   none        (default) everything below is a no-op
+#   prometheus  writes a Prometheus text file (node_exporter textfile collector format)
+#               to METRICS_TEXTFILE, default data/metrics/<script>.prom
+#   otlp        posts metrics and spans as OTLP/HTTP JSON to OTEL_EXPORTER_OTLP_ENDPOINT
+#               (default http://localhost:4318), e.g. an OpenTelemetry collector
+#
+# Every span also feeds a `<name>_seconds` histogram, so the Prometheus file gets the
+# per-stage latency breakdown and the collector additionally gets the span tree (one
+# trace per crawl, upsert run or search request). Values are cumulative since the
+# process started and are exported every METRICS_EXPORT_INTERVAL seconds and at exit.
+#
+# Configuration is read on first use, so scripts can call load_dotenv() first.
+
+PREFIX = 'twd_'
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MAX_PENDING_SPANS = 10000
+
+def service_name():
+    script = os.path.splitext(os.path.basename(sys.argv[0] if sys.argv and sys.argv[0] else 'python'))[0]
+    return os.getenv('METRICS_SERVICE', script or 'python')
+
+def label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def copy(self):
+        histogram = Histogram(self.buckets)
+        histogram.counts, histogram.sum, histogram.count = list(self.counts), self.sum, self.count
+        return histogram
+
+
+class Registry:
+    # In-process metric state shared by all threads
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start_ns = time.time_ns()
+        self.counters = {}
+        self.histograms = {}
+        self.spans = deque(maxlen=MAX_PENDING_SPANS)
+
+    def inc(self, name, value, labels):
+        key = (name, label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels):
+        key = (name, label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def add_span(self, finished):
+        with self.lock:
+            self.spans.append(finished)
+
+    # Function to copy the metrics and take the finished spans, for one export
+    def collect(self):
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: histogram.copy() for key, histogram in self.histograms.items()}
+            spans = list(self.spans)
+            self.spans.clear()
+        return counters, histograms, spans
+
+
+# Exporters
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+def prometheus_text(counters, histograms):
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f'# TYPE {PREFIX}{name}_total counter')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{PREFIX}{name}_total{format_labels(labels)} {value}')
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f'# TYPE {PREFIX}{name} histogram')
+        for (metric, labels), histogram in sorted(histograms.items(), key=lambda item: item[0]):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                cumulative += count
+                lines.append(f'{PREFIX}{name}_bucket{format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{PREFIX}{name}_sum{format_labels(labels)} {histogram.sum}')
+            lines.append(f'{PREFIX}{name}_count{format_labels(labels)} {histogram.count}')
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusTextfileExporter:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def export(self, registry):
+        counters, histograms, _ = registry.collect()
+        with atomic_open(self.path) as f:
+            f.write(prometheus_text(counters, histograms))
+
+
+def otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def otlp_attributes(pairs):
+    return [{'key': key, 'value': otlp_value(value)} for key, value in pairs]
+
+class OTLPExporter:
+    # OTLP/HTTP with the JSON encoding, which collectors accept on /v1/metrics and /v1/traces
+    def __init__(self, endpoint, service, timeout=5.0):
+        self.endpoint = endpoint.rstrip('/')
+        self.resource = {'attributes': otlp_attributes([('service.name', service)])}
+        self.scope = {'name': 'twd-fandom'}
+        self.timeout = timeout
+        self.failing = False
+
+    def metrics_payload(self, registry, counters, histograms):
+        now = str(time.time_ns())
+        start = str(registry.start_ns)
+        metrics = {}
+        for (name, labels), value in sorted(counters.items()):
+            metric = metrics.setdefault(name + '_total', {
+                'name': PREFIX + name + '_total',
+                'sum': {'dataPoints': [], 'aggregationTemporality': 2, 'isMonotonic': True}})
+            metric['sum']['dataPoints'].append({'attributes': otlp_attributes(labels), 'startTimeUnixNano': start,
+                                                'timeUnixNano': now, 'asDouble': float(value)})
+        for (name, labels), histogram in sorted(histograms.items(), key=lambda item: item[0]):
+            metric = metrics.setdefault(name, {
+                'name': PREFIX + name, 'unit': 's' if name.endswith('_seconds') else '',
+                'histogram': {'dataPoints': [], 'aggregationTemporality': 2}})
+            metric['histogram']['dataPoints'].append({
+                'attributes': otlp_attributes(labels), 'startTimeUnixNano': start, 'timeUnixNano': now,
+                'count': str(histogram.count), 'sum': histogram.sum,
+                'bucketCounts': [str(count) for count in histogram.counts],
+                'explicitBounds': list(histogram.buckets)})
+        return {'resourceMetrics': [{'resource': self.resource,
+                                     'scopeMetrics': [{'scope': self.scope, 'metrics': list(metrics.values())}]}]}
+
+    def traces_payload(self, spans):
+        return {'resourceSpans': [{'resource': self.resource, 'scopeSpans': [{'scope': self.scope, 'spans': [{
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'parentSpanId': span.parent_id or '',
+            'name': span.name,
+            'kind': 1,
+            'startTimeUnixNano': str(span.start_ns),
+            'endTimeUnixNano': str(span.end_ns),
+            'attributes': otlp_attributes(span.attributes.items()),
+            'status': {'code': 2, 'message': span.error} if span.error else {'code': 1},
+        } for span in spans]}]}]}
+
+    def post(self, path, payload):
+        import requests
+
+        response = requests.post(self.endpoint + path, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+    def export(self, registry):
+        counters, histograms, spans = registry.collect()
+        try:
+            if spans:
+                self.post('/v1/traces', self.traces_payload(spans))
+            self.post('/v1/metrics', self.metrics_payload(registry, counters, histograms))
+            if self.failing:
+                print(f"Metrics export to {self.endpoint} recovered")
+            self.failing = False
+        except Exception as e:
+            # Instrumentation must never break the pipeline; report once per outage
+            if not self.failing:
+                print(f"Metrics export to {self.endpoint} failed: {e}")
+            self.failing = True
+
+def exporter_from_env():
+    kind = os.getenv('METRICS_EXPORTER', 'none').lower()
+    if kind in ('', 'none', '0'):
+        return None
+    if kind == 'prometheus':
+        return PrometheusTextfileExporter(os.getenv('METRICS_TEXTFILE', f'data/metrics/{service_name()}.prom'))
+    if kind == 'otlp':
+        return OTLPExporter(os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT', 'http://localhost:4318'), service_name())
+    raise ValueError(f"Unknown METRICS_EXPORTER {kind!r} (expected none, prometheus or otlp)")
+
+
+# Spans
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+class Span:
+    # Times a block. Nested spans (also across threads started with run_in_context) share
+    # the trace of the outermost one.
+    def __init__(self, registry, name, attributes):
+        self.registry = registry
+        self.name = name
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        parent = _current_span.get()
+        self.trace_id = parent.trace_id if parent else f'{random.getrandbits(128):032x}'
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = f'{random.getrandbits(64):016x}'
+        self.start_ns = time.time_ns()
+        self.started = time.perf_counter()
+        self.token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        self.end_ns = self.start_ns + int(elapsed * 1e9)
+        _current_span.reset(self.token)
+        if exc_type is not None:
+            self.error = f'{exc_type.__name__}: {exc}'
+        self.registry.observe(f'{self.name}_seconds', elapsed, {'status': 'error' if self.error else 'ok'})
+        self.registry.add_span(self)
+        return False
+
+class NullSpan:
+    def set(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_SPAN = NullSpan()
+
+
+# Module state, set up on first use
+
+_lock = threading.Lock()
+_registry = None
+_exporter = None
+_configured = False
+
+def _setup():
+    global _registry, _exporter, _configured
+    with _lock:
+        if _configured:
+            return
+        _exporter = exporter_from_env()
+        if _exporter is not None:
+            _registry = Registry()
+            atexit.register(flush)
+            interval = float(os.getenv('METRICS_EXPORT_INTERVAL', 15))
+            if interval > 0:
+                threading.Thread(target=_export_periodically, args=(interval,), daemon=True).start()
+        _configured = True
+
+def _export_periodically(interval):
+    while True:
+        time.sleep(interval)
+        flush()
+
+def enabled():
+    if not _configured:
+        _setup()
+    return _registry is not None
+
+# Function to add to a counter, e.g. count('pages_fetched', status=200)
+def count(name, value=1, /, **labels):
+    if enabled():
+        _registry.inc(name, value, labels)
+
+# Function to record one value in a histogram (seconds, unless the name says otherwise)
+def observe(name, value, /, **labels):
+    if enabled():
+        _registry.observe(name, value, labels)
+
+# Function to time a block: `with span('fetch', url=url): ...`. Attributes go on the
+# trace only, not on the histogram, so they can be high-cardinality (URLs, names).
+def span(name, /, **attributes):
+    if not enabled():
+        return NULL_SPAN
+    return Span(_registry, name, attributes)
+
+# Function to wrap `function` so it runs under the caller's current span, for work handed
+# to another thread (thread pools and threads don't inherit context variables). Each call
+# gets its own copy of the context, so the wrapper can run on several threads at once.
+def run_in_context(function):
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(function, *args, **kwargs)
+
+def flush():
+    if _exporter is not None:
+        with _lock:
+            _exporter.export(_registry)
+
+# Function to replace the exporter (and start from empty metrics); used by benchmarks
+def configure(exporter):
+    global _registry, _exporter, _configured
+    with _lock:
+        _exporter = exporter
+        _registry = Registry() if exporter is not None else None
+        _configured = True
+    return _registry
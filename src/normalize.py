@@ -0,0 +1,127 @@
+import csv
+import io
+import os
+import re
+
+# Whitespace and URL normalisation shared by clean_csv_files.py and clean_data.py, and
+# the one model of read_csv's type inference (csv_to_json.py's pipeline stage uses it too).
+#
+# CSV files are cleaned in one of two ways, chosen by file size:
+#   small files  csv module: no DataFrame, read_csv's type inference redone per column
+#   large files  pandas, one list comprehension per column instead of a per-cell apply
+# Both give the same bytes as read_csv(keep_default_na=False) -> apply -> to_csv. When
+# the csv path meets a cell whose read_csv conversion it doesn't model (floats, inf/nan,
+# ragged rows, duplicate headers, ...), it falls back to pandas, which is only imported
+# then.
+
+# Files up to this size take the csv module path
+SMALL_FILE_BYTES = 256 * 1024
+
+# read_csv only parses ASCII digits ('٣' and '１２' stay strings), while \d and int() accept any
+INT_PATTERN = re.compile(r'[+-]?[0-9]{1,18}')
+# Cells read_csv may turn into floats; the csv path leaves those columns to pandas
+FLOAT_LIKE = re.compile(r'(?i)[+-]?(([0-9]+\.?[0-9]*|\.[0-9]+)(e[+-]?[0-9]+)?|inf|infinity|nan)')
+BOOL_VALUES = {'True': 'True', 'TRUE': 'True', 'true': 'True',
+               'False': 'False', 'FALSE': 'False', 'false': 'False'}
+
+INVALID_URL = 'https://example.com/invalid-url'
+
+# Collapse runs of whitespace (including newlines) in a single cell
+def normalize_whitespace(value):
+    return ' '.join(str(value).split())
+
+# Function to normalise a whole column at once. Without pyarrow, .str.replace runs re.sub
+# per cell and is about 3x slower than split/join; pyarrow's regex \s misses Unicode
+# spaces that str.split() removes. So string columns go through one comprehension.
+def normalize_series(series):
+    import pandas as pd
+    from pandas.api.types import infer_dtype
+
+    if infer_dtype(series, skipna=False) == 'string':
+        return pd.Series([' '.join(value.split()) for value in series.tolist()],
+                         index=series.index, dtype=series.dtype, name=series.name)
+    return series.map(normalize_whitespace)
+
+def normalize_frame(df):
+    for column in df.columns:
+        df[column] = normalize_series(df[column])
+    return df
+
+# Function to replace URLs that don't start with 'http' by a placeholder
+def normalize_urls(series, placeholder=INVALID_URL):
+    return series.where(series.str.startswith('http', na=False), placeholder)
+
+
+class FallBack(Exception):
+    pass
+
+def _header(names):
+    # read_csv names empty headers 'Unnamed: i' and renames duplicates
+    header = [name if name != '' else f'Unnamed: {i}' for i, name in enumerate(names)]
+    if len(set(header)) != len(header) or any(name != '' and not name.strip() for name in names):
+        raise FallBack()
+    return header
+
+def _column_values(cells):
+    # The column as read_csv types it, rendered with str() as the apply did
+    stripped = [cell.strip(' ') for cell in cells]
+    if all(INT_PATTERN.fullmatch(cell) for cell in stripped):
+        return [str(int(cell)) for cell in stripped]
+    if all(cell in BOOL_VALUES for cell in stripped):
+        return [BOOL_VALUES[cell] for cell in stripped]
+    if all(FLOAT_LIKE.fullmatch(cell) for cell in stripped):
+        raise FallBack()
+    if any(cell.strip() != cell.strip(' ') and FLOAT_LIKE.fullmatch(cell.strip()) for cell in cells):
+        raise FallBack()
+    return cells
+
+# Function to type a cell that is alone in its column (a one-row CSV, like each scraped
+# page) as read_csv(keep_default_na=False) does: an int, a bool, or the string unchanged.
+# Raises FallBack for cells read_csv may turn into floats.
+def csv_cell_value(cell):
+    stripped = cell.strip(' ')
+    if INT_PATTERN.fullmatch(stripped):
+        return int(stripped)
+    if stripped in BOOL_VALUES:
+        return BOOL_VALUES[stripped] == 'True'
+    if FLOAT_LIKE.fullmatch(cell.strip()):
+        raise FallBack()
+    return cell
+
+def _clean_csv_text(text):
+    if text.startswith('\ufeff'):
+        raise FallBack()
+    rows = [row for row in csv.reader(io.StringIO(text, newline='')) if row]
+    if not rows:
+        raise FallBack()
+    header, body = _header(rows[0]), rows[1:]
+    if not body or any(len(row) != len(header) for row in body):
+        raise FallBack()
+    # read_csv skips whitespace-only lines, which in a one-column file may be data
+    if len(header) == 1 and any(not row[0].strip() for row in body):
+        raise FallBack()
+    columns = [[normalize_whitespace(value) for value in _column_values(list(cells))] for cells in zip(*body)]
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator=os.linesep)
+    writer.writerow(header)
+    writer.writerows(zip(*columns))
+    return out.getvalue(), len(body)
+
+def _clean_csv_pandas(file_path):
+    import pandas as pd
+
+    df = normalize_frame(pd.read_csv(file_path, keep_default_na=False))
+    out = io.StringIO()
+    df.to_csv(out, index=False)
+    return out.getvalue(), len(df)
+
+# Function to clean every cell of a CSV file; returns (csv text, row count)
+def clean_csv_text(file_path):
+    if os.path.getsize(file_path) <= SMALL_FILE_BYTES:
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            text = f.read()
+        try:
+            return _clean_csv_text(text)
+        except FallBack:
+            pass
+    return _clean_csv_pandas(file_path)
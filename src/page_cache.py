@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# On-disk HTTP cache for crawled pages. Each URL keeps its last body together with the
+# ETag / Last-Modified validators and a SHA-256 of the body, so a re-crawl can send
+# conditional requests and tell the caller when a page has not changed.
+
+INDEX_FILE = 'index.json'
+# Seconds between index checkpoints during a crawl, so a killed crawl keeps most of its entries
+SAVE_INTERVAL = 10
+
+
+class PageCache:
+    def __init__(self, directory='data/.http_cache', max_bytes=512 * 1024 * 1024, save_interval=SAVE_INTERVAL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.save_interval = save_interval
+        self.last_saved = time.monotonic()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.not_modified = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self.entries = self._load_index()
+
+    def _index_path(self):
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _body_path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.html')
+
+    def conditional_headers(self, url):
+        with self.lock:
+            entry = self.entries.get(url)
+        if entry is None or not os.path.exists(self._body_path(url)):
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def update(self, url, response):
+        # Record a fetched response. Sets `response.unchanged`; a 304 is turned back into
+        # a 200 carrying the cached body so callers can treat it like any other page.
+        response.unchanged = False
+        if response.status_code == 304:
+            try:
+                with open(self._body_path(url), 'rb') as f:
+                    body = f.read()
+            except OSError:
+                # Validators outlived the body - Fetcher.get refetches without them, and
+                # that full response is counted as the miss
+                with self.lock:
+                    self.entries.pop(url, None)
+                return response
+            response._content = body
+            response.status_code = 200
+            response.unchanged = True
+            with self.lock:
+                self.hits += 1
+                self.not_modified += 1
+                if url in self.entries:
+                    self.entries[url]['last_used'] = time.time()
+            return response
+
+        if response.status_code != 200:
+            return response
+
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        with self.lock:
+            previous = self.entries.get(url)
+            unchanged = previous is not None and previous['sha256'] == digest
+            self.entries[url] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'sha256': digest,
+                'size': len(body),
+                'last_used': time.time(),
+            }
+            if unchanged:
+                self.hits += 1
+            else:
+                self.misses += 1
+        # Also rewrite a body that went missing, or the page would never be revalidated again
+        body_path = self._body_path(url)
+        if not unchanged or not os.path.exists(body_path):
+            with open(body_path, 'wb') as f:
+                f.write(body)
+        response.unchanged = unchanged
+        self._checkpoint()
+        return response
+
+    def _checkpoint(self):
+        if time.monotonic() - self.last_saved >= self.save_interval:
+            self._write_index()
+
+    def evict(self):
+        # Drop least recently used bodies until the cache fits in max_bytes
+        with self.lock:
+            total = sum(entry['size'] for entry in self.entries.values())
+            for url, entry in sorted(self.entries.items(), key=lambda item: item[1]['last_used']):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self._body_path(url))
+                except OSError:
+                    pass
+                del self.entries[url]
+                total -= entry['size']
+                self.evictions += 1
+
+    def save(self):
+        self.evict()
+        self._write_index()
+
+    def _write_index(self):
+        with self.lock:
+            self.last_saved = time.monotonic()
+            tmp_path = self._index_path() + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self._index_path())
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return (f"Page cache: {self.hits} hits ({self.not_modified} not modified), {self.misses} misses, "
+                f"{self.evictions} evictions, hit rate {rate:.0%}")
+
+
+def page_cache_from_env():
+    # Enabled by default; set PAGE_CACHE_DIR to an empty string to crawl without a cache
+    directory = os.getenv('PAGE_CACHE_DIR', 'data/.http_cache')
+    if not directory:
+        return None
+    max_mb = float(os.getenv('PAGE_CACHE_MAX_MB', 512))
+    save_interval = float(os.getenv('PAGE_CACHE_SAVE_SECONDS', SAVE_INTERVAL))
+    return PageCache(directory, max_bytes=int(max_mb * 1024 * 1024), save_interval=save_interval)
@@ -0,0 +1,50 @@
+import re
+
+# Passage-level indexing. all-MiniLM-L6-v2 only reads the first 256 word-piece tokens of
+# its input, so long sections are split into overlapping passages that are embedded as
+# separate vectors. Passage IDs are "<character id>#<section>-<n>", which lets the query
+# side map a hit back to its character without fetching metadata.
+
+# Words per passage and overlap between neighbouring passages. Wiki prose averages about
+# 1.3 word-piece tokens per word, so 180 words stays under the 256 token limit.
+PASSAGE_WORDS = 180
+PASSAGE_OVERLAP = 40
+
+SEPARATOR = '#'
+
+def split_passages(text, max_words=PASSAGE_WORDS, overlap=PASSAGE_OVERLAP):
+    words = (text or '').split()
+    if not words:
+        return []
+    step = max_words - overlap
+    passages = []
+    for start in range(0, len(words), step):
+        passages.append(' '.join(words[start:start + max_words]))
+        if start + max_words >= len(words):
+            break
+    return passages
+
+def section_slug(section):
+    return re.sub(r'[^A-Za-z0-9]+', '-', section).strip('-').lower()
+
+def passage_id(parent_id, section, n):
+    return f"{parent_id}{SEPARATOR}{section_slug(section)}-{n}"
+
+def parent_of(vector_id):
+    return vector_id.split(SEPARATOR, 1)[0]
+
+# Function to collapse passage hits into per-character scores: 'max' keeps the best
+# passage's score, 'sum' rewards characters with many matching passages
+def collapse_matches(matches, top_k, pooling='max'):
+    scores = {}
+    for match in matches:
+        parent = parent_of(match['id'])
+        score = match['score']
+        if parent not in scores:
+            scores[parent] = score
+        elif pooling == 'sum':
+            scores[parent] += score
+        else:
+            scores[parent] = max(scores[parent], score)
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return ranked[:top_k]
@@ -0,0 +1,117 @@
+import argparse
+import os
+from functools import partial
+from clean_csv_files import clean_record
+from csv_to_json import csv_record
+from remove_keys import DEFAULT_KEYS_TO_REMOVE, drop_keys
+from update_name_kv import update_name
+from delete_first_kv import delete_first_kv
+from page_cache import page_cache_from_env
+from keyword_index import KeywordIndex
+from file_runner import write_json_atomic
+from corpus import Corpus, CorpusWriter, corpus_exists, corpus_path
+from scrape_character_pages import make_fetcher, fetch_character_pages, parse_character_page
+import metrics
+
+# Single-pass version of README steps 3-8: every scraped page goes through the per-record
+# stages of the individual scripts in memory and is written to the corpus (and data/character_jsons) once.
+
+# Steps 4-8 as record transforms, in README order
+def default_stages(keys_to_remove=DEFAULT_KEYS_TO_REMOVE):
+    return [
+        csv_record,     # the scraped row as clean_csv_files.py reads it from CSV
+        clean_record,   # clean_csv_files.py
+        csv_record,     # csv_to_json.py reads the cleaned CSV back
+        partial(drop_keys, keys_to_remove=keys_to_remove),  # remove_keys.py
+        update_name,    # update_name_kv.py
+        delete_first_kv,  # delete_first_kv.py
+    ]
+
+def run_stages(record, stages):
+    for stage in stages:
+        record = stage(record)
+    return record
+
+def json_filename(name):
+    # Same file name the CSV steps end up with
+    return f"{name.replace(' ', '_')}.json"
+
+def write_json(records, json_file_path):
+    write_json_atomic(records, json_file_path)
+
+# Function to run the pipeline into the corpus. Pages that are unchanged or fail keep
+# their records from the previous corpus. With json_directory set, changed characters are
+# also written out as per-file JSON.
+def run_pipeline(df, fetcher, corpus_directory, stages, json_directory=None):
+    records = {}
+    if corpus_exists(corpus_directory):
+        for filename, character in Corpus(corpus_directory):
+            records.setdefault(filename, []).append(character)
+    if json_directory and not os.path.exists(json_directory):
+        os.makedirs(json_directory)
+
+    for name, _, response in fetch_character_pages(df, fetcher):
+        filename = json_filename(name)
+        if getattr(response, 'unchanged', False) and filename in records:
+            print(f"{name}'s page is unchanged, keeping it")
+            metrics.count('pages_saved', result='unchanged')
+            continue
+        try:
+            with metrics.span('parse', character=name):
+                sections = parse_character_page(name, response)
+            if sections is None:
+                metrics.count('pages_saved', result='skipped')
+                continue
+            with metrics.span('transform', character=name):
+                records[filename] = [run_stages(sections, stages)]
+                if json_directory:
+                    write_json(records[filename], os.path.join(json_directory, filename))
+            print(f"Saved {name}")
+            metrics.count('pages_saved', result='saved')
+        except Exception as e:
+            print(f"Error processing {name}: {e}")
+            metrics.count('pages_saved', result='failed')
+
+    with CorpusWriter(corpus_directory) as writer:
+        for filename in sorted(records):
+            writer.add(filename, records[filename])
+    return len(writer.entries)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run README steps 3-10 in one pass: scrape, transform, write the corpus and keyword index.')
+    parser.add_argument('--input', default='./data/cleaned_character_data.csv', help='Cleaned listing CSV (output of steps 1-2)')
+    parser.add_argument('--corpus-dir', default=corpus_path(), help='Corpus directory (CORPUS_DIR)')
+    # Per-file JSON export next to the corpus; EXPORT_JSON=0 writes the corpus only
+    parser.add_argument('--json-dir', default='data/character_jsons', help='Directory for the per-file JSON export')
+    parser.add_argument('--no-json', action='store_true', default=os.getenv('EXPORT_JSON', '1') == '0',
+                        help='Only write the corpus (EXPORT_JSON=0)')
+    parser.add_argument('--keys', nargs='+', default=DEFAULT_KEYS_TO_REMOVE, metavar='KEY', help='Keys to remove (step 6)')
+    parser.add_argument('--keyword-index', default='data/keyword_index', help='Keyword index directory')
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+
+    # Load the CSV with character links (output of steps 1-2)
+    df = pd.read_csv(args.input)
+    json_directory = None if args.no_json else args.json_dir
+
+    page_cache = page_cache_from_env()
+    fetcher = make_fetcher(page_cache)
+    try:
+        with metrics.span('crawl', pages=len(df)):
+            count = run_pipeline(df, fetcher, args.corpus_dir, default_stages(args.keys), json_directory)
+    finally:
+        fetcher.close()
+    if page_cache is not None:
+        print(page_cache.report())
+    print(f"Corpus: {count} characters in {args.corpus_dir}")
+
+    # Refresh the BM25 keyword index from the new corpus (step 10)
+    keyword_index = KeywordIndex(args.keyword_index)
+    changed, removed = keyword_index.update(Corpus(args.corpus_dir))
+    keyword_index.save()
+    print(f"Keyword index: {changed} characters re-indexed, {removed} removed")
+    print("Pipeline complete.")
+
+if __name__ == '__main__':
+    main()
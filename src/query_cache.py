@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Size-bounded caches for the app's query path. All of them are thread-safe so one
+# instance can be shared by every Streamlit session in the process.
+
+MISSING = object()
+
+# Queries that differ only in case or spacing share cache entries
+def normalize_query(text):
+    return ' '.join((text or '').lower().split())
+
+
+class LRUCache:
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            value = self._lookup(key)
+            if value is MISSING:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _lookup(self, key):
+        return self.entries.get(key, MISSING)
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = self._wrap(value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def _wrap(self, value):
+        return value
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+class TTLCache(LRUCache):
+    # LRU cache whose entries also expire `ttl` seconds after they were stored
+    def __init__(self, maxsize=512, ttl=600):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self.expirations = 0
+
+    def _wrap(self, value):
+        return (time.monotonic() + self.ttl, value)
+
+    def _lookup(self, key):
+        entry = self.entries.get(key, MISSING)
+        if entry is MISSING:
+            return MISSING
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self.entries[key]
+            self.expirations += 1
+            return MISSING
+        return value
+
+    def stats(self):
+        stats = super().stats()
+        stats['expirations'] = self.expirations
+        return stats
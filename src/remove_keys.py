@@ -1,30 +1,33 @@
-import os
-import json
+import argparse
+from functools import partial
+from file_runner import run_directory, transform_json_file
 
-def remove_keys_from_json(directory, keys_to_remove):
-    # Iterate over all files in the given directory
-    for filename in os.listdir(directory):
-        if filename.endswith('.json'):
-            file_path = os.path.join(directory, filename)
-            
-            # Open and load the JSON file
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-            
-            # Process each entry in the JSON data
-            for entry in data:
-                # Remove specified keys if they exist
-                for key in keys_to_remove:
-                    if key in entry:
-                        del entry[key]
-            
-            # Write the modified data back to the JSON file
-            with open(file_path, 'w', encoding='utf-8') as file:
-                json.dump(data, file, ensure_ascii=False, indent=4)
+# Keys that are always empty or not useful for search
+DEFAULT_KEYS_TO_REMOVE = ["Fate", "Contents", "Relationships[]", "Gallery[]"]
 
-# Specify the directory and keys to remove
-json_directory = 'data/character_jsons'
-keys_to_remove = ["Fate", "Contents", "Relationships[]", "Gallery[]"]
+# Pipeline stage: remove the specified keys from one entry if they exist
+def drop_keys(entry, keys_to_remove):
+    for key in keys_to_remove:
+        if key in entry:
+            del entry[key]
+    return entry
 
-# Call the function
-remove_keys_from_json(json_directory, keys_to_remove)
\ No newline at end of file
+def remove_keys_from_json(directory, keys_to_remove, workers=None):
+    # Process each JSON file in the given directory on the process pool
+    transform = partial(drop_keys, keys_to_remove=keys_to_remove)
+    report = run_directory(directory, '.json', partial(transform_json_file, transform=transform),
+                           workers, label='Removed keys')
+    print(report.summary())
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Remove keys from every entry of the character JSON files, in place.')
+    parser.add_argument('--directory', default='data/character_jsons', help='Directory of JSON files')
+    parser.add_argument('--keys', nargs='+', default=DEFAULT_KEYS_TO_REMOVE, metavar='KEY',
+                        help=f"Keys to remove (default: {' '.join(DEFAULT_KEYS_TO_REMOVE)})")
+    parser.add_argument('--workers', type=int, help='Worker processes (default ETL_WORKERS or the CPU count)')
+    args = parser.parse_args(argv)
+    remove_keys_from_json(args.directory, args.keys, args.workers)
+
+if __name__ == '__main__':
+    main()
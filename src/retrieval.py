@@ -0,0 +1,66 @@
+from keyword_index import reciprocal_rank_fusion
+from passages import collapse_matches
+import metrics
+
+# The app's query path without Streamlit: vector search, optional BM25 fusion, record
+# lookup, and the chat prompt built from the results. benchmarks/run_suite.py times the
+# same functions.
+
+ANSWER_MODEL = "gpt-3.5-turbo"
+SYSTEM_PROMPT = "You are a helpful assistant knowledgeable about The Walking Dead TV series. Always cite your sources using [1], [2], [3] when providing information."
+
+# Function to find the top_k characters for a query. With a keyword index the vector and
+# BM25 rankings are fused; with a corpus, full records are read locally and only
+# characters missing from it are fetched from the index.
+def retrieve(index, query_vector, top_k=5, metadata_filter=None, keyword_index=None, query=None,
+             corpus=None, overfetch=10, pooling='max'):
+    # The trait filter runs inside the index, so a filtered query still returns top_k matches
+    with metrics.span('vector_query', top_k=top_k * overfetch):
+        results = index.query(
+            vector=query_vector,
+            top_k=top_k * overfetch,
+            include_metadata=False,
+            filter=metadata_filter
+        )
+
+    # Collapse passage hits back to characters, fuse with the BM25 ranking under the same
+    # filter, then look up the top characters' full records
+    if keyword_index is not None:
+        depth = top_k * overfetch
+        vector_ranked = collapse_matches(results['matches'], depth, pooling)
+        with metrics.span('keyword_search'):
+            keyword_ranked = keyword_index.search(query, depth, filter=metadata_filter)
+        ranked = reciprocal_rank_fusion([[character_id for character_id, _ in vector_ranked],
+                                         [character_id for character_id, _ in keyword_ranked]])[:top_k]
+    else:
+        ranked = collapse_matches(results['matches'], top_k, pooling)
+    if not ranked:
+        return []
+    ids = [character_id for character_id, _ in ranked]
+    with metrics.span('record_lookup', ids=len(ids)):
+        characters = corpus.get_many(ids) if corpus is not None else {}
+        missing = [character_id for character_id in ids if character_id not in characters]
+        if missing:
+            for character_id, vector in index.fetch(ids=missing)['vectors'].items():
+                characters[character_id] = vector['metadata']
+    return [{'id': character_id, 'score': score, 'metadata': characters[character_id]}
+            for character_id, score in ranked if character_id in characters]
+
+def build_prompt(query, search_results):
+    # Prepare the prompt with search results
+    prompt = f"Query: {query}\n\nSearch Results:\n"
+    sources = []
+    for i, result in enumerate(search_results[:3], 1):  # Use top 3 results
+        name = result['metadata'].get('Name', 'Unknown')
+        overview = result['metadata'].get('Overview[]', 'No overview available.')[:200]
+        prompt += f"[{i}] {name}: {overview}...\n"
+        sources.append({"name": name, "content": overview})
+
+    prompt += "\nBased on the query and search results, provide a concise and informative response. Cite sources using [1], [2], [3] as appropriate:"
+    return prompt, sources
+
+def chat_messages(prompt):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
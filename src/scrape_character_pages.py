@@ -1,67 +1,163 @@
+import argparse
 import os
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+import time
+from fetcher import Fetcher
+from page_cache import page_cache_from_env
+from sections import find_content_section, extract_sections
+from crawl_journal import CrawlJournal, content_hash, parse_duration
+from file_runner import atomic_open
+import metrics
 
-# Load the CSV with character links
-df = pd.read_csv('./data/cleaned_character_data.csv')
-
-# Ensure the directory for storing text files exists
+# Directory for storing the per-character CSV files
 output_dir = './data/character_data'
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
 
-# Function to scrape character page and save it as a text file
-def scrape_and_save_character_page(name, url):
-    try:
-        # Fetch the character page content
-        response = requests.get(url)
-        if response.status_code != 200:
-            print(f"Failed to retrieve page for {name}. Status code: {response.status_code}")
-            return
+# Crawl settings (override through the environment)
+max_workers = int(os.getenv('SCRAPE_WORKERS', 8))
+requests_per_second = float(os.getenv('SCRAPE_RATE_PER_HOST', 5))
+max_retries = int(os.getenv('SCRAPE_RETRIES', 3))
+# Seconds to wait for the connection and for each read; a stalled request fails instead of hanging the crawl
+request_timeout = float(os.getenv('SCRAPE_TIMEOUT', 30))
 
-        # Parse the page with BeautifulSoup
-        soup = BeautifulSoup(response.content, 'html.parser')
+def make_fetcher(cache=None, workers=None, rate=None, retries=None, timeout=None):
+    return Fetcher(max_workers=workers or max_workers,
+                   rate_per_host=requests_per_second if rate is None else rate,
+                   retries=max_retries if retries is None else retries,
+                   timeout=timeout or request_timeout, cache=cache)
 
-        # Focus on the content inside the mw-parser-output div
-        content_section = soup.find('div', {'class': 'mw-parser-output'})
-        if not content_section:
-            print(f"No content section found for {name}")
-            return
+# Function to fetch every listed character page concurrently, yielding
+# (name, url, response) as each page arrives. Failed requests are logged to the journal, if given.
+def fetch_character_pages(df, fetcher, journal=None):
+    # The listing repeats characters, so each page is only requested once
+    unique_rows = df.drop_duplicates(subset=['name', 'url'])
+    jobs = ((row['name'], row['url']) for _, row in unique_rows.iterrows())
+    return fetch_pages(jobs, fetcher, journal)
 
-        # Initialize a dictionary to store section content
-        sections = {}
+# Function to fetch (name, url) jobs concurrently; `jobs` may be a lazy iterator
+def fetch_pages(jobs, fetcher, journal=None):
+    for character_name, character_url, response, error in fetcher.fetch_all(jobs):
+        print(f"Scraping page for {character_name}...")
+        if error is not None:
+            print(f"Error scraping {character_name}: {error}")
+            if journal is not None:
+                journal.record(character_url, character_name, 'failed', str(error))
+            continue
+        yield character_name, character_url, response
 
-        # Iterate over all <h2> tags to find sections
-        for header in content_section.find_all('h2'):
-            section_title = header.get_text().strip()
-            section_content = []
+# Function to parse a fetched character page into a {section title: text} dictionary
+def parse_character_page(name, response):
+    if response.status_code != 200:
+        print(f"Failed to retrieve page for {name}. Status code: {response.status_code}")
+        return None
 
-            # Get the next siblings until the next <h2> or end of the section
-            for sibling in header.find_next_siblings():
-                if sibling.name == 'h2':
-                    break
-                if sibling.name in ['p', 'ul', 'dl']:
-                    section_content.append(sibling.get_text(separator='\n').strip())
+    # Parse the page and focus on the content inside the mw-parser-output div
+    content_section = find_content_section(response.content)
+    if not content_section:
+        print(f"No content section found for {name}")
+        return None
 
-            # Store the section content in the dictionary
-            sections[section_title] = '\n'.join(section_content)
+    # Split the content into sections, one per <h2>
+    return extract_sections(content_section)
 
-        # Save the sections to a CSV file
-        output_path = os.path.join(output_dir, f"{name.replace(' ', '_')}.csv")
-        pd.DataFrame([sections]).to_csv(output_path, index=False)
-        
-        print(f"Successfully saved {name}'s page content to {output_path}")
+# Function to parse a fetched character page and save it as a CSV file. Returns
+# (status, detail) for the crawl journal: ('saved', hash of the CSV), ('unchanged', None),
+# ('skipped', None) when the page has no content, or ('failed', error message).
+def save_character_page(name, response, output_directory=None):
+    try:
+        # Skip parsing when the page is the same as last crawl and its CSV is still there
+        output_path = os.path.join(output_directory or output_dir, f"{name.replace(' ', '_')}.csv")
+        if getattr(response, 'unchanged', False) and os.path.exists(output_path):
+            print(f"{name}'s page is unchanged, keeping {output_path}")
+            result = ('unchanged', None)
+        elif response.status_code != 200:
+            print(f"Failed to retrieve page for {name}. Status code: {response.status_code}")
+            result = ('failed', f"HTTP {response.status_code}")
+        else:
+            with metrics.span('parse', character=name):
+                sections = parse_character_page(name, response)
+            if sections is None:
+                result = ('skipped', None)
+            else:
+                # Save the sections to a CSV file; written atomically so a killed crawl
+                # never leaves a truncated CSV behind
+                import pandas as pd
+
+                with metrics.span('save_csv', character=name):
+                    text = pd.DataFrame([sections]).to_csv(index=False)
+                    with atomic_open(output_path, newline='') as f:
+                        f.write(text)
+                print(f"Successfully saved {name}'s page content to {output_path}")
+                result = ('saved', content_hash(text))
 
     except Exception as e:
         print(f"Error scraping {name}: {e}")
+        result = ('failed', str(e))
+    metrics.count('pages_saved', result=result[0])
+    return result
+
+# Function to add the options shared by the page crawlers (this script and crawl.py)
+def add_crawl_arguments(parser):
+    parser.add_argument('--output-dir', default=output_dir, help='Directory for the per-character CSV files')
+    parser.add_argument('--journal', help='Crawl journal (default CRAWL_JOURNAL or data/crawl_journal.jsonl)')
+    parser.add_argument('--workers', type=int, default=max_workers, help='Concurrent requests (SCRAPE_WORKERS)')
+    parser.add_argument('--rate', type=float, default=requests_per_second, help='Requests/sec per host, 0 for no limit (SCRAPE_RATE_PER_HOST)')
+    parser.add_argument('--retries', type=int, default=max_retries, help='Retries per page (SCRAPE_RETRIES)')
+    parser.add_argument('--timeout', type=float, default=request_timeout, help='Seconds per request (SCRAPE_TIMEOUT)')
+    parser.add_argument('--since', type=parse_duration,
+                        help='Only re-scrape pages last scraped longer ago than this (e.g. 12h, 7d)')
+    parser.add_argument('--retry-failed', action='store_true', help='Only re-scrape pages whose last attempt failed')
+    parser.add_argument('--restart', action='store_true', help='Start a new crawl even if the last one was interrupted')
 
-# Loop through each character in the CSV
-for index, row in df.iterrows():
-    character_name = row['name']
-    character_url = row['url']
+# Function to open the crawl journal and resume an interrupted crawl unless asked for a
+# new one; otherwise start a crawl (everything, pages older than --since, or only failed pages)
+def begin_crawl(args):
+    journal = CrawlJournal(args.journal)
+    if journal.resumable() and not (args.restart or args.since or args.retry_failed):
+        started = time.strftime('%Y-%m-%d %H:%M', time.localtime(journal.crawl['time']))
+        print(f"Resuming the crawl started {started} (--restart to start over)")
+    else:
+        journal.start(since=args.since, retry_failed=args.retry_failed)
+    return journal
 
-    print(f"Scraping page for {character_name}...")
-    scrape_and_save_character_page(character_name, character_url)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scrape every listed character page into one CSV file per character.')
+    parser.add_argument('--input', default='./data/cleaned_character_data.csv', help='Cleaned listing CSV from clean_data.py')
+    add_crawl_arguments(parser)
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+
+    # Load the CSV with character links
+    df = pd.read_csv(args.input)
+
+    # Ensure the directory for storing text files exists
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+
+    journal = begin_crawl(args)
+    pages = df.drop_duplicates(subset=['name', 'url'])
+    due = pages[pages['url'].map(journal.is_due)]
+    print(f"{len(due)} of {len(pages)} pages to scrape")
+
+    page_cache = page_cache_from_env()
+    fetcher = make_fetcher(page_cache, args.workers, args.rate, args.retries, args.timeout)
+
+    # Fetch every due character page concurrently and save each one as it arrives; the
+    # crawl is one trace with a fetch, parse and save span per page. The fetcher is closed
+    # (saving the page cache index) even if the crawl is interrupted.
+    try:
+        with metrics.span('crawl', pages=len(due)):
+            for character_name, character_url, response in fetch_character_pages(due, fetcher, journal):
+                status, detail = save_character_page(character_name, response, args.output_dir)
+                journal.record(character_url, character_name, status, detail)
+    finally:
+        fetcher.close()
+    failed = journal.complete()
+    journal.close()
+    if page_cache is not None:
+        print(page_cache.report())
+    if failed:
+        print(f"{len(failed)} pages failed; re-run with --retry-failed to retry only those")
+    print("Scraping complete.")
 
-print("Scraping complete.")
+if __name__ == '__main__':
+    main()
@@ -1,45 +1,80 @@
-import requests
+import argparse
+import os
+from urllib.parse import urlsplit
 from bs4 import BeautifulSoup
-import pandas as pd
 
 # URL to scrape character links from
 base_url = 'https://walkingdead.fandom.com'
 url = f'{base_url}/wiki/TV_Series_Characters'
 
-# Fetch the main page
-response = requests.get(url)
-soup = BeautifulSoup(response.content, 'html.parser')
+output_path = './data/character_data_with_images.csv'
 
-# Find the correct section containing character tables
-character_links = []
+# Function to get the scheme and host that the listing's relative links resolve against
+def base_url_of(page_url):
+    parts = urlsplit(page_url)
+    return f"{parts.scheme}://{parts.netloc}"
 
-# Find all 'td' elements that contain the character links and images
-td_elements = soup.find_all('td')
+# Function to pull (name, url, image_url) for every character from the listing page
+def parse_character_links(content, base_url=base_url):
+    soup = BeautifulSoup(content, 'html.parser')
 
-for td in td_elements:
-    # Find the link to the character page
-    a_tag = td.find('a', href=True)
-    if a_tag and '/wiki/' in a_tag['href']:
-        # Extract character link and full URL
-        character_link = base_url + a_tag['href']
-        character_name = a_tag['title']
+    # Find the correct section containing character tables
+    character_links = []
 
-        # Find the character image in the same 'td' element
-        img_tag = td.find('img')
-        if img_tag:
-            character_image_url = img_tag.get('data-src') or img_tag.get('src')
+    # Find all 'td' elements that contain the character links and images
+    td_elements = soup.find_all('td')
 
-            # Store the character data
-            character_links.append({
-                'name': character_name,
-                'url': character_link,
-                'image_url': character_image_url
-            })
+    for td in td_elements:
+        # Find the link to the character page
+        a_tag = td.find('a', href=True)
+        if a_tag and '/wiki/' in a_tag['href']:
+            # Extract character link and full URL
+            character_link = base_url + a_tag['href']
+            character_name = a_tag['title']
 
-# Convert the scraped character data into a pandas DataFrame
-df = pd.DataFrame(character_links)
+            # Find the character image in the same 'td' element
+            img_tag = td.find('img')
+            if img_tag:
+                character_image_url = img_tag.get('data-src') or img_tag.get('src')
 
-# Save to a CSV file in the 'data' directory
-df.to_csv('./data/character_data_with_images.csv', index=False)
+                # Store the character data
+                character_links.append({
+                    'name': character_name,
+                    'url': character_link,
+                    'image_url': character_image_url
+                })
+    return character_links
 
-print("Character data saved to ./data/character_data_with_images.csv")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scrape the character listing page into a CSV of names, page URLs and images.')
+    parser.add_argument('--url', default=url, help='Listing page to scrape')
+    parser.add_argument('--output', default=output_path, help='Where to write the CSV')
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    from fetcher import Fetcher
+    from page_cache import page_cache_from_env
+
+    # Fetch the main page (conditionally, if it is in the page cache)
+    page_cache = page_cache_from_env()
+    fetcher = Fetcher(max_workers=1, cache=page_cache)
+    response = fetcher.get(args.url)
+    fetcher.close()
+    if page_cache is not None:
+        print(page_cache.report())
+
+    # Nothing to do if the listing has not changed since the last crawl
+    if getattr(response, 'unchanged', False) and os.path.exists(args.output):
+        print(f"Character listing unchanged, keeping {args.output}")
+        return
+
+    # Convert the scraped character data into a pandas DataFrame
+    df = pd.DataFrame(parse_character_links(response.content, base_url=base_url_of(args.url)))
+
+    # Save to a CSV file in the 'data' directory
+    df.to_csv(args.output, index=False)
+
+    print(f"Character data saved to {args.output}")
+
+if __name__ == '__main__':
+    main()
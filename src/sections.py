@@ -0,0 +1,54 @@
+import os
+from bs4 import BeautifulSoup
+
+# Section extraction for character pages. Every <h2> under mw-parser-output starts a
+# section made of the text of the <p>, <ul> and <dl> siblings that follow it, up to
+# the next <h2>.
+
+SECTION_TAGS = ('p', 'ul', 'dl')
+
+# html.parser, as the original scraper used. HTML_PARSER=lxml builds the tree several
+# times faster, but lxml repairs broken markup differently (a <div> inside a <p> ends the
+# paragraph), so sections of such pages can differ.
+PARSER = os.getenv('HTML_PARSER') or 'html.parser'
+
+def find_content_section(content, parser=None):
+    soup = BeautifulSoup(content, parser or PARSER)
+    return soup.find('div', {'class': 'mw-parser-output'})
+
+def extract_sections(content_section):
+    # Headers can sit at any depth (the infobox and table of contents have their own
+    # <h2>), so walk the children of each header's parent once, splitting on <h2> as we go
+    headers = content_section.find_all('h2')
+    parents = {}
+    for header in headers:
+        parents.setdefault(id(header.parent), header.parent)
+
+    content = {}
+    for parent in parents.values():
+        current = None
+        for child in parent.children:
+            if child.name == 'h2':
+                current = content[id(child)] = []
+            elif current is not None and child.name in SECTION_TAGS:
+                current.append(child.get_text(separator='\n').strip())
+
+    # Insert in document order so duplicate titles behave as they always have
+    sections = {}
+    for header in headers:
+        sections[header.get_text().strip()] = '\n'.join(content[id(header)])
+    return sections
+
+def extract_sections_legacy(content_section):
+    # Original sibling scan, kept as the reference for parity checks
+    sections = {}
+    for header in content_section.find_all('h2'):
+        section_title = header.get_text().strip()
+        section_content = []
+        for sibling in header.find_next_siblings():
+            if sibling.name == 'h2':
+                break
+            if sibling.name in SECTION_TAGS:
+                section_content.append(sibling.get_text(separator='\n').strip())
+        sections[section_title] = '\n'.join(section_content)
+    return sections
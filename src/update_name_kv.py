@@ -1,26 +1,28 @@
-import os
-import json
+import argparse
+from functools import partial
+from file_runner import run_directory, transform_json_file
 
-def update_json_files(directory):
-    for filename in os.listdir(directory):
-        if filename.endswith('.json'):
-            file_path = os.path.join(directory, filename)
-            
-            # Open and load the JSON file
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-            
-            # Update the first key-value pair in each JSON object
-            for entry in data:
-                if entry:
-                    first_key = next(iter(entry))
-                    entry["Name"] = first_key
-                    entry[first_key] = first_key
-            
-            # Save the updated JSON back to the file
-            with open(file_path, 'w', encoding='utf-8') as file:
-                json.dump(data, file, ensure_ascii=False, indent=4)
+# Pipeline stage: copy the first key (the character's name) into a "Name" field
+def update_name(entry):
+    if entry:
+        first_key = next(iter(entry))
+        entry["Name"] = first_key
+        entry[first_key] = first_key
+    return entry
 
-# Specify the directory containing the JSON files
-json_directory = 'data/character_jsons'
-update_json_files(json_directory)
\ No newline at end of file
+def update_json_files(directory, workers=None):
+    # Update the first key-value pair in each JSON object, one file per task
+    report = run_directory(directory, '.json', partial(transform_json_file, transform=update_name),
+                           workers, label='Updated names')
+    print(report.summary())
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Copy the first key of every entry into a "Name" field, in place.')
+    parser.add_argument('--directory', default='data/character_jsons', help='Directory of JSON files')
+    parser.add_argument('--workers', type=int, help='Worker processes (default ETL_WORKERS or the CPU count)')
+    args = parser.parse_args(argv)
+    update_json_files(args.directory, args.workers)
+
+if __name__ == '__main__':
+    main()
@@ -1,71 +1,265 @@
+import argparse
 import os
 import json
-import unicodedata
-from pinecone import Pinecone, ServerlessSpec
-from sentence_transformers import SentenceTransformer
+import hashlib
+import queue
+import threading
 from dotenv import load_dotenv
+from character_metadata import TEXT_FIELDS, filter_fields
+from passages import passage_id, split_passages
+from corpus import Corpus, character_id, corpus_exists
+from vector_store import local_store_path, open_vector_store, vector_backend
+from embeddings import BACKENDS, DIMENSION, MODEL_NAME, load_model
+import metrics
 
-# Load environment variables from .env file
-load_dotenv()
+# Index and model settings
+index_name = "twd-fandom6"
+model_name = MODEL_NAME
+dimension = DIMENSION
 
-# Initialize Pinecone with API key from environment variable
-pinecone_api_key = os.getenv("PINECONE_API_KEY")
-pc = Pinecone(api_key=pinecone_api_key)
+# Directory containing JSON files
+json_directory = 'data/character_jsons'
 
-# Create or connect to an index
-index_name = "twd-fandom6"
-pc.create_index(
-    name=index_name,
-    dimension=384,  # Example dimension, adjust as needed
-    metric="cosine",
-    spec=ServerlessSpec(
-        cloud="aws",
-        region="us-east-1"
-    )
-)
-
-# Load a pre-trained model
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# Batching: records per model.encode call, and per-request limits for index.upsert
+# (Pinecone caps a request at 1000 vectors and 2MB)
+encode_batch_size = int(os.getenv('UPSERT_ENCODE_BATCH', 64))
+max_upsert_vectors = int(os.getenv('UPSERT_MAX_VECTORS', 100))
+max_upsert_bytes = int(os.getenv('UPSERT_MAX_BYTES', 2 * 1024 * 1024))
+queue_depth = 4
 
-# Function to encode character data
-def encode_character_data(character_data):
-    text_data = " ".join([character_data.get(field, '') for field in ['Overview[]', 'Pre-Apocalypse[]', 'Post-Apocalypse[]', 'Death[]', 'Killed Victims[]', 'Appearances[]', 'Trivia[]']])
-    vector = model.encode(text_data)
-    
-    # Truncate metadata to fit within the 40KB limit
+# Function to build the text that gets embedded for a character
+def character_text(character_data):
+    return " ".join([character_data.get(field, '') for field in TEXT_FIELDS])
+
+# Function to truncate metadata to fit within the 40KB limit
+def truncate_metadata(character_data, limit=40000):
     truncated_metadata = {}
     total_size = 0
     for key, value in character_data.items():
         item_size = len(key.encode('utf-8')) + len(str(value).encode('utf-8'))
-        if total_size + item_size > 40000:  # Leave some buffer
+        if total_size + item_size > limit:  # Leave some buffer
             break
         truncated_metadata[key] = value
         total_size += item_size
-    
-    return vector, truncated_metadata
+    return truncated_metadata
 
-# Function to ensure ASCII vector IDs
-def to_ascii(text):
-    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+# Function to build a vector's metadata: the name and filterable fields (status,
+# affiliations, traits) always go in, the character's sections fill the rest of the 40KB budget
+def character_metadata(character_data):
+    fields = filter_fields(character_data)
+    if 'Name' in character_data:
+        fields['Name'] = character_data['Name']
+    fields_size = sum(len(key) + len(str(value).encode('utf-8')) for key, value in fields.items())
+    metadata = truncate_metadata(character_data, 40000 - fields_size)
+    metadata.update(fields)
+    return metadata
 
-# Directory containing JSON files
-json_directory = 'data/character_jsons'
+# Function to encode character data
+def encode_character_data(character_data, model):
+    vector = model.encode(character_text(character_data))
+    return vector, character_metadata(character_data)
+
+# Function to build every vector for one character: a character-level vector carrying
+# the full metadata, plus one vector per passage of each long section. Passages only
+# carry what filtering and collapsing back to the character need.
+def character_records(character_id, character_data):
+    records = {character_id: (character_text(character_data), character_metadata(character_data))}
+    fields = filter_fields(character_data)
+    for section in TEXT_FIELDS:
+        for n, passage in enumerate(split_passages(character_data.get(section, ''))):
+            metadata = {'parent_id': character_id, 'section': section, 'Name': character_data.get('Name', character_id)}
+            metadata.update(fields)
+            records[passage_id(character_id, section, n)] = (passage, metadata)
+    return records
+
+# Function to build the records for every character, keyed by vector ID
+def build_records(characters):
+    records = {}
+    for character_id, character in characters.items():
+        records.update(character_records(character_id, character))
+    return records
+
+# Function to fingerprint everything that ends up in the index for one vector
+def record_hash(text, metadata):
+    payload = json.dumps([model_name, text, metadata], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+# Function to load every character from a directory of per-file JSON, keyed by vector ID
+def load_characters(directory):
+    characters = {}
+    for filename in os.listdir(directory):
+        if filename.endswith('.json'):
+            file_path = os.path.join(directory, filename)
+            with open(file_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            for character in data:
+                characters[character_id(character, filename)] = character
+    return characters
+
+# Which index a manifest describes (Pinecone index name, or the local store's path)
+def index_identity(name=index_name):
+    if vector_backend() == 'local':
+        return f"local:{local_store_path()}"
+    return name
+
+# The record of what has already been upserted; the local store keeps its own
+def manifest_path():
+    if vector_backend() == 'local':
+        return os.path.join(local_store_path(), 'manifest.json')
+    return 'data/upsert_manifest.json'
+
+def load_manifest(path, name=index_name):
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    # A manifest written for another index says nothing about this one
+    if manifest.get('index') != index_identity(name):
+        return {}
+    return manifest.get('vectors', {})
+
+def save_manifest(path, vectors, name=index_name):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({'index': index_identity(name), 'vectors': vectors}, file, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+# Function to work out which vectors need to be (re)upserted and which are stale
+def plan_sync(records, manifest):
+    hashes = {vector_id: record_hash(text, metadata) for vector_id, (text, metadata) in records.items()}
+    to_upsert = [vector_id for vector_id, digest in hashes.items() if manifest.get(vector_id) != digest]
+    to_delete = [vector_id for vector_id in manifest if vector_id not in records]
+    return hashes, to_upsert, to_delete
+
+# Function to encode records in batches, yielding [(id, vector, metadata), ...] per batch
+def encode_batches(records, vector_ids, model, batch_size=encode_batch_size):
+    for start in range(0, len(vector_ids), batch_size):
+        batch_ids = vector_ids[start:start + batch_size]
+        texts = [records[vector_id][0] for vector_id in batch_ids]
+        with metrics.span('encode', vectors=len(texts)):
+            vectors = model.encode(texts, batch_size=batch_size)
+        metrics.count('vectors_encoded', len(texts))
+        yield [(vector_id, vector.tolist(), records[vector_id][1])
+               for vector_id, vector in zip(batch_ids, vectors)]
+
+# Rough size of one vector in an upsert request body
+def request_size(record):
+    vector_id, values, metadata = record
+    return len(vector_id) + 12 * len(values) + len(json.dumps(metadata, ensure_ascii=False).encode('utf-8'))
+
+# Function to group records into upsert requests that stay under the request limits
+def upsert_requests(records, max_vectors=max_upsert_vectors, max_bytes=max_upsert_bytes):
+    chunk, chunk_bytes = [], 0
+    for record in records:
+        size = request_size(record)
+        if chunk and (len(chunk) >= max_vectors or chunk_bytes + size > max_bytes):
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(record)
+        chunk_bytes += size
+    if chunk:
+        yield chunk
+
+# Function to run encoding on a background thread so it overlaps with uploads.
+# Batches go through a bounded queue; errors are re-raised on the consumer side, and the
+# producer gives up once the consumer stops (an upload failed or the generator was closed).
+def encode_in_background(records, vector_ids, model, batch_size=encode_batch_size):
+    batches = queue.Queue(maxsize=queue_depth)
+    stopped = threading.Event()
+    done = object()
+
+    # Blocks while uploads are behind; gives up once the consumer has stopped
+    def put(item):
+        while not stopped.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for batch in encode_batches(records, vector_ids, model, batch_size):
+                if not put(batch):
+                    return
+        except Exception as e:
+            put(e)
+        put(done)
+
+    threading.Thread(target=metrics.run_in_context(produce), daemon=True).start()
+    try:
+        while True:
+            item = batches.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield from item
+    finally:
+        stopped.set()
+
+# Function to bring the index in line with the JSON directory, touching only what changed
+def sync_index(index, model, records, manifest, hashes, to_upsert, to_delete, batch_size=encode_batch_size):
+    encoded = encode_in_background(records, to_upsert, model, batch_size)
+    for request in upsert_requests(encoded):
+        with metrics.span('upsert_request', vectors=len(request)):
+            index.upsert(request)
+        metrics.count('vectors_upserted', len(request))
+        for vector_id, _, _ in request:
+            manifest[vector_id] = hashes[vector_id]
+
+    # Deletes are chunked too, since stale passages can add up to thousands of IDs
+    for start in range(0, len(to_delete), max_upsert_vectors):
+        chunk = to_delete[start:start + max_upsert_vectors]
+        with metrics.span('delete_request', vectors=len(chunk)):
+            index.delete(ids=chunk)
+        metrics.count('vectors_deleted', len(chunk))
+        for vector_id in chunk:
+            del manifest[vector_id]
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Embed the characters and sync them into the vector index.')
+    parser.add_argument('--index-name', default=index_name, help='Pinecone index name')
+    parser.add_argument('--corpus-dir', default=None, help='Corpus directory (default CORPUS_DIR or data/corpus)')
+    parser.add_argument('--json-dir', default=json_directory, help='Per-file JSON, read when there is no corpus')
+    parser.add_argument('--embedding-backend', choices=BACKENDS, default=None,
+                        help='Model inference backend (default EMBEDDING_BACKEND or torch)')
+    args = parser.parse_args(argv)
+
+    # Load environment variables from .env file
+    load_dotenv()
+
+    # Read the corpus written by the ETL; fall back to the per-file JSON if it hasn't been built
+    if corpus_exists(args.corpus_dir):
+        characters = Corpus(args.corpus_dir).characters()
+    else:
+        characters = load_characters(args.json_dir)
+    records = build_records(characters)
+    manifest = load_manifest(manifest_path(), args.index_name)
+    hashes, to_upsert, to_delete = plan_sync(records, manifest)
+    print(f"{len(characters)} characters, {len(records)} vectors: {len(to_upsert)} new or changed, {len(to_delete)} removed")
+
+    # Nothing changed - no model load and no network calls
+    if not to_upsert and not to_delete:
+        return
+
+    # Connect to the configured vector store (VECTOR_BACKEND), creating the index on first use
+    index = open_vector_store(args.index_name, dimension, create=True)
+
+    # Load a pre-trained model (EMBEDDING_BACKEND picks PyTorch or ONNX Runtime)
+    model = load_model(args.embedding_backend) if to_upsert else None
 
-# Connect to the index
-index = pc.Index(index_name)
-
-# Iterate over each JSON file
-for filename in os.listdir(json_directory):
-    if filename.endswith('.json'):
-        file_path = os.path.join(json_directory, filename)
-        
-        # Load the JSON data
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-        
-        # Upsert each character's data
-        for character in data:
-            vector, metadata = encode_character_data(character)
-            character_id = to_ascii(character.get('Name', filename))
-            index.upsert([(character_id, vector.tolist(), metadata)])
+    # Save progress even if the run is interrupted part way through
+    try:
+        with metrics.span('upsert_sync', upserts=len(to_upsert), deletes=len(to_delete)):
+            sync_index(index, model, records, manifest, hashes, to_upsert, to_delete)
+    finally:
+        index.save()
+        save_manifest(manifest_path(), manifest, args.index_name)
 
+if __name__ == '__main__':
+    main()
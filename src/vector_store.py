@@ -0,0 +1,304 @@
+import json
+import os
+import numpy as np
+
+# Vector stores used by upsert.py and the app. Every backend exposes the same small
+# interface, modelled on the Pinecone Index API:
+#
+#   upsert(vectors)                  vectors: [(id, values, metadata), ...]
+#   delete(ids)
+#   query(vector, top_k, include_metadata, filter)  -> {'matches': [{'id', 'score', 'metadata'}, ...]}
+#   fetch(ids)                       -> {'vectors': {id: {'id', 'metadata'}, ...}}
+#   describe_index_stats()
+#   save()                           persist pending writes (no-op for remote backends)
+#
+# Pick a backend with VECTOR_BACKEND=pinecone (default) or VECTOR_BACKEND=local.
+# `filter` uses Pinecone's metadata filter syntax; the local store (and the in-memory
+# index in benchmarks/fakes.py) evaluate it with matches_filter below.
+
+
+def _compare(value, op, operand):
+    # List-valued metadata matches if any element matches, as in Pinecone
+    values = value if isinstance(value, list) else [value]
+    if op == '$eq':
+        return operand in values
+    if op == '$ne':
+        return operand not in values
+    if op == '$in':
+        return any(v in operand for v in values)
+    if op == '$nin':
+        return not any(v in operand for v in values)
+    if op in ('$gt', '$gte', '$lt', '$lte'):
+        numbers = [v for v in values if isinstance(v, (int, float))]
+        if op == '$gt':
+            return any(v > operand for v in numbers)
+        if op == '$gte':
+            return any(v >= operand for v in numbers)
+        if op == '$lt':
+            return any(v < operand for v in numbers)
+        return any(v <= operand for v in numbers)
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+def matches_filter(metadata, filter):
+    for key, condition in filter.items():
+        if key == '$and':
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        else:
+            if not isinstance(condition, dict):
+                condition = {'$eq': condition}
+            if key not in metadata:
+                return False
+            for op, operand in condition.items():
+                if not _compare(metadata[key], op, operand):
+                    return False
+    return True
+
+
+class PineconeStore:
+    def __init__(self, index):
+        self.index = index
+
+    def upsert(self, vectors):
+        return self.index.upsert(vectors=vectors)
+
+    def delete(self, ids):
+        return self.index.delete(ids=ids)
+
+    def query(self, vector, top_k=10, include_metadata=False, filter=None):
+        return self.index.query(vector=vector, top_k=top_k, include_metadata=include_metadata, filter=filter)
+
+    def fetch(self, ids):
+        vectors = {}
+        for vector_id, vector in self.index.fetch(ids=ids).vectors.items():
+            metadata = vector.get('metadata') if isinstance(vector, dict) else vector.metadata
+            vectors[vector_id] = {'id': vector_id, 'metadata': metadata or {}}
+        return {'vectors': vectors}
+
+    def describe_index_stats(self):
+        return self.index.describe_index_stats()
+
+    def save(self):
+        pass
+
+
+# Storage types for the local store. float16 halves the matrix and int8 quarters it; an
+# int8 row is stored with one float32 scale, its largest absolute component / 127.
+VECTOR_DTYPES = ('float32', 'float16', 'int8')
+
+# Rows upcast to float32 at a time when scoring a compact matrix (fits in L2 cache)
+SCORE_BLOCK = 1024
+
+# Function to convert unit vectors to a storage type; returns (rows, scales or None)
+def quantize(values, dtype):
+    if dtype == 'int8':
+        scales = np.abs(values).max(axis=1) / 127
+        scales[scales == 0] = 1
+        return np.rint(values / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    return values.astype(dtype), None
+
+def dequantize(rows, scales):
+    values = np.asarray(rows, dtype=np.float32)
+    return values * scales[:, None] if scales is not None else values
+
+
+class LocalVectorStore:
+    # Embedded index: unit-normalised vectors in one contiguous (n, dimension) array saved
+    # as vectors.npy, with ids and metadata in JSON side files. Cosine similarity is then a
+    # single matrix-vector product. `dtype` picks float32, float16 or int8 storage (int8
+    # scales in scales.npy); an index saved with another dtype is converted on load.
+    def __init__(self, directory, dimension=384, mmap=False, dtype='float32'):
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector dtype {dtype!r} (expected one of {', '.join(VECTOR_DTYPES)})")
+        self.directory = directory
+        self.dimension = dimension
+        self.dtype = dtype
+        self.ids = []
+        self.positions = {}
+        self.metadata = {}
+        self.matrix = np.empty((0, dimension), dtype=dtype)
+        self.scales = np.empty(0, dtype=np.float32) if dtype == 'int8' else None
+        self.dirty = False
+        self._load(mmap)
+
+    def _paths(self):
+        return (os.path.join(self.directory, 'vectors.npy'),
+                os.path.join(self.directory, 'ids.json'),
+                os.path.join(self.directory, 'metadata.json'),
+                os.path.join(self.directory, 'scales.npy'))
+
+    def _load(self, mmap):
+        vectors_path, ids_path, metadata_path, scales_path = self._paths()
+        if not os.path.exists(vectors_path):
+            return
+        # A memory-mapped matrix is read-only; the first write copies it into memory
+        matrix = np.load(vectors_path, mmap_mode='r' if mmap else None)
+        scales = np.load(scales_path) if matrix.dtype == np.int8 else None
+        if matrix.dtype.name != self.dtype:
+            matrix, scales = quantize(dequantize(matrix, scales), self.dtype)
+            self.dirty = True
+        self.matrix, self.scales = matrix, scales
+        with open(ids_path, 'r', encoding='utf-8') as f:
+            self.ids = json.load(f)
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            self.metadata = json.load(f)
+        self.positions = {vector_id: i for i, vector_id in enumerate(self.ids)}
+
+    def upsert(self, vectors):
+        if not vectors:
+            return {'upserted_count': 0}
+        upserted_count = len(vectors)
+        # Like Pinecone, the last vector wins when a batch repeats an id
+        vectors = list({vector_id: (vector_id, values, metadata) for vector_id, values, metadata in vectors}.values())
+        values = np.asarray([v for _, v, _ in vectors], dtype=np.float32).reshape(len(vectors), self.dimension)
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        values /= np.where(norms == 0, 1, norms)
+        rows, row_scales = quantize(values, self.dtype)
+
+        positions = self.positions
+        matrix = self.matrix if self.matrix.flags.writeable else np.array(self.matrix)
+        scales = self.scales
+        new_rows = []
+        for i, (vector_id, _, metadata) in enumerate(vectors):
+            if vector_id in positions:
+                matrix[positions[vector_id]] = rows[i]
+                if scales is not None:
+                    scales[positions[vector_id]] = row_scales[i]
+            else:
+                positions[vector_id] = len(self.ids)
+                self.ids.append(vector_id)
+                new_rows.append(i)
+            self.metadata[vector_id] = metadata
+        if new_rows:
+            matrix = np.concatenate([matrix, rows[new_rows]])
+            if scales is not None:
+                scales = np.concatenate([scales, row_scales[new_rows]])
+        self.matrix, self.scales, self.positions, self.dirty = matrix, scales, positions, True
+        return {'upserted_count': upserted_count}
+
+    def delete(self, ids):
+        doomed = {self.positions[vector_id] for vector_id in ids if vector_id in self.positions}
+        if not doomed:
+            return {}
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[list(doomed)] = False
+        self.matrix = np.asarray(self.matrix)[keep]
+        if self.scales is not None:
+            self.scales = self.scales[keep]
+        self.ids = [vector_id for i, vector_id in enumerate(self.ids) if keep[i]]
+        for vector_id in ids:
+            self.metadata.pop(vector_id, None)
+        self.positions = {vector_id: i for i, vector_id in enumerate(self.ids)}
+        self.dirty = True
+        return {}
+
+    def query(self, vector, top_k=10, include_metadata=False, filter=None):
+        n = len(self.ids)
+        if n == 0:
+            return {'matches': []}
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = self._scores(query)
+        candidates = n
+        if filter:
+            allowed = np.fromiter((matches_filter(self.metadata[vector_id], filter) for vector_id in self.ids),
+                                  dtype=bool, count=n)
+            scores = np.where(allowed, scores, -np.inf)
+            candidates = int(allowed.sum())
+        top_k = min(top_k, candidates)
+        if top_k == 0:
+            return {'matches': []}
+        # argpartition finds the top k in O(n); only those k are sorted
+        top = np.argpartition(-scores, top_k - 1)[:top_k] if top_k < n else np.arange(n)
+        top = top[np.argsort(-scores[top], kind='stable')]
+        matches = []
+        for i in top:
+            match = {'id': self.ids[i], 'score': float(scores[i])}
+            if include_metadata:
+                match['metadata'] = self.metadata[self.ids[i]]
+            matches.append(match)
+        return {'matches': matches}
+
+    def _scores(self, query):
+        if self.matrix.dtype == np.float32:
+            return self.matrix @ query
+        # NumPy has no BLAS path for float16 or int8, so upcast a block of rows at a time
+        # into one reused buffer and apply the int8 scales afterwards. int8 scores at close
+        # to float32 speed; NumPy's float16 conversion is slow, so float16 trades query
+        # time for the smaller file.
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        buffer = np.empty((min(SCORE_BLOCK, len(scores)), self.dimension), dtype=np.float32)
+        for start in range(0, len(scores), SCORE_BLOCK):
+            block = self.matrix[start:start + SCORE_BLOCK]
+            rows = buffer[:len(block)]
+            rows[...] = block
+            scores[start:start + len(block)] = rows @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def fetch(self, ids):
+        return {'vectors': {vector_id: {'id': vector_id, 'metadata': self.metadata[vector_id]}
+                            for vector_id in ids if vector_id in self.positions}}
+
+    def describe_index_stats(self):
+        return {'dimension': self.dimension, 'total_vector_count': len(self.ids)}
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        vectors_path, ids_path, metadata_path, scales_path = self._paths()
+        paths = [vectors_path, ids_path, metadata_path]
+        # Write to temp files first so a crash never leaves a half-written index
+        with open(vectors_path + '.tmp', 'wb') as f:
+            np.save(f, np.ascontiguousarray(self.matrix, dtype=self.dtype))
+        if self.scales is not None:
+            with open(scales_path + '.tmp', 'wb') as f:
+                np.save(f, self.scales)
+            paths.append(scales_path)
+        with open(ids_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.ids, f, ensure_ascii=False)
+        with open(metadata_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.metadata, f, ensure_ascii=False)
+        for path in paths:
+            os.replace(path + '.tmp', path)
+        if self.scales is None and os.path.exists(scales_path):
+            os.remove(scales_path)
+        self.dirty = False
+
+
+def vector_backend():
+    return os.getenv('VECTOR_BACKEND', 'pinecone')
+
+def local_store_path():
+    return os.getenv('LOCAL_VECTOR_STORE', 'data/vector_store')
+
+# Function to open the configured vector store. With create=False a missing Pinecone
+# index raises LookupError instead of being created.
+def open_vector_store(index_name, dimension=384, create=False, backend=None):
+    backend = backend or vector_backend()
+    if backend == 'local':
+        return LocalVectorStore(local_store_path(), dimension, mmap=os.getenv('LOCAL_VECTOR_MMAP') == '1',
+                                dtype=os.getenv('LOCAL_VECTOR_DTYPE', 'float32'))
+    if backend == 'pinecone':
+        from pinecone import Pinecone, ServerlessSpec
+
+        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        if index_name not in pc.list_indexes().names():
+            if not create:
+                raise LookupError(f"Index '{index_name}' not found. Please make sure the index exists in your Pinecone account.")
+            pc.create_index(
+                name=index_name,
+                dimension=dimension,
+                metric="cosine",
+                spec=ServerlessSpec(
+                    cloud="aws",
+                    region="us-east-1"
+                )
+            )
+        return PineconeStore(pc.Index(index_name))
+    raise ValueError(f"Unknown vector backend: {backend}")